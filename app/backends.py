@@ -0,0 +1,141 @@
+import asyncio
+import collections
+import json
+import logging
+import statistics
+import time
+import urllib.parse
+
+from app import extract
+from app.connections import POOL
+from app.models import WATCH_URL, VideoEntry
+from app.ratelimit import YOUTUBE, host_of
+
+log = logging.getLogger("mpvtube.search")
+
+
+# Search backends answer (query, max_results, sort) with VideoEntry lists; `host` is what
+# the request governor limits them by.
+class YtDlpSearch:
+    name = "yt-dlp"
+    host = YOUTUBE
+
+    def __init__(self, run):
+        # `run(fn, *args)` is MediaService._extract, so the extraction pool can be swapped later.
+        self.run = run
+
+    def search(self, query, max_results, sort="RELEVANCE"):
+        return self.run(extract.search, query, max_results, sort)
+
+
+# Invidious-style JSON API (GET {base}/api/v1/search), which many YouTube front-ends and
+# self-hosted mirrors expose; any server answering that shape works, local stand-ins included.
+class ApiSearch:
+    name = "api"
+    SORTS = {"RELEVANCE": "relevance", "DATE": "upload_date", "VIEWS": "view_count", "RATING": "rating"}
+    MAX_PAGES = 5
+
+    def __init__(self, base_url, timeout=10, connections=POOL):
+        self.base_url, self.timeout = base_url.rstrip("/"), timeout
+        self.connections = connections
+        self.host = host_of(self.base_url)
+
+    def search(self, query, max_results, sort="RELEVANCE"):
+        return asyncio.to_thread(self._search, query, max_results, sort)
+
+    def _search(self, query, max_results, sort):
+        entries = []
+        for page in range(1, self.MAX_PAGES + 1):
+            params = {"q": query, "type": "video", "page": page, "sort_by": self.SORTS.get(sort, "relevance")}
+            items = self._get(f"{self.base_url}/api/v1/search?{urllib.parse.urlencode(params)}")
+            entries += [self.entry(i) for i in items if i.get("type", "video") == "video" and i.get("videoId")]
+            if not items or len(entries) >= max_results:
+                break
+        return entries[:max_results]
+
+    def _get(self, url):
+        return json.loads(self.connections.get(url, {"Accept": "application/json"}, timeout=self.timeout))
+
+    def entry(self, item):
+        # Normalised into the same flat-entry shape yt-dlp produces, then projected the same way.
+        vid = item["videoId"]
+        thumbs = [dict(t, url=urllib.parse.urljoin(self.base_url + "/", t["url"]))
+                  for t in item.get("videoThumbnails") or [] if t.get("url")]
+        return VideoEntry.from_info({
+            "id": vid,
+            "url": WATCH_URL.format(vid),
+            "title": item.get("title"),
+            "channel": item.get("author"),
+            "channel_id": item.get("authorId"),
+            "duration": item.get("lengthSeconds"),
+            "timestamp": item.get("published"),
+            "view_count": item.get("viewCount"),
+            "thumbnails": sorted(thumbs, key=lambda t: t.get("width") or 0),
+        })
+
+
+def from_settings(storage, run, connections=POOL):
+    backends = []
+    for name in storage.get_setting("search_backends", ["yt-dlp"]):
+        if name == "yt-dlp":
+            backends.append(YtDlpSearch(run))
+        elif name == "api" and storage.get_setting("search_api_url"):
+            backends.append(ApiSearch(storage.get_setting("search_api_url"), connections=connections))
+        else:
+            log.warning("ignoring search backend %r", name)
+    return backends or [YtDlpSearch(run)]
+
+
+class LatencyTracker:
+    # Recent primary latencies; the hedge fires once a request is slower than `percentile`
+    # of them, so it only costs a second request on the slow tail. The percentile comes from
+    # settings; quantiles(n=100) only has cut points 1..99, so it is clamped to those.
+    def __init__(self, percentile=90, window=50, initial=2.0, floor=0.3, min_samples=5):
+        self.percentile = min(99, max(1, int(percentile)))
+        self.initial, self.floor, self.min_samples = initial, floor, min_samples
+        self.samples = collections.deque(maxlen=window)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def deadline(self):
+        if len(self.samples) < self.min_samples:
+            return self.initial
+        return max(self.floor, statistics.quantiles(self.samples, n=100)[self.percentile - 1])
+
+
+async def hedged(calls, tracker, hedge=True):
+    # `calls` are (name, coroutine factory) in preference order. The first runs alone until
+    # the tracker's deadline (or until it fails); then the next joins and whichever answers
+    # first wins. A primary that loses keeps running so its latency is still sampled.
+    # Without `hedge` the others are only tried in turn after a failure.
+    (name, first), rest = calls[0], list(calls[1:])
+    started = time.monotonic()
+    primary = asyncio.ensure_future(first())
+
+    def sample(task):
+        if not task.cancelled() and task.exception() is None:
+            tracker.add(time.monotonic() - started)
+    primary.add_done_callback(sample)
+    names = {primary: name}
+    pending = {primary}
+    done, _ = await asyncio.wait(pending, timeout=tracker.deadline() if hedge else None)
+    error = None
+    while True:
+        for task in done:
+            pending.discard(task)
+            if task.exception() is None:
+                for loser in pending - {primary}:
+                    loser.cancel()
+                if task is not primary:
+                    log.info("hedged search answered by %s after %.2fs", names[task], time.monotonic() - started)
+                return task.result()
+            error = task.exception()
+        if rest:
+            name, make = rest.pop(0)
+            task = asyncio.ensure_future(make())
+            names[task] = name
+            pending.add(task)
+        elif not pending:
+            raise error
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
@@ -0,0 +1,129 @@
+import collections
+import http.client
+import io
+import logging
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.parse
+
+log = logging.getLogger("mpvtube.connections")
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+# Servers drop idle keep-alive connections after a while; older ones are not handed out.
+IDLE_TTL = 90.0
+MAX_IDLE = 8
+REDIRECTS = 3
+
+
+def _key(url):
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"unsupported URL: {url}")
+    return parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80)
+
+
+# Keep-alive HTTP(S) connections per host, shared by every thread that downloads through the
+# app itself (thumbnails, storyboards, API searches). urllib opens and closes a connection,
+# TLS handshake included, for every request; here a finished response leaves its connection
+# idle for the next one, and warm() opens connections ahead of the first request.
+class ConnectionPool:
+    def __init__(self, context=None, max_idle=MAX_IDLE, idle_ttl=IDLE_TTL, timeout=20):
+        self.context = context or ssl.create_default_context()
+        self.max_idle, self.idle_ttl, self.timeout = max_idle, idle_ttl, timeout
+        self._idle = collections.defaultdict(list)  # (scheme, host, port) -> [(conn, idle since)]
+        self._lock = threading.Lock()
+        self.stats = collections.Counter()  # connections "opened" / "warmed" / requests "reused"
+
+    def _open(self, key):
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self.context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _checkout(self, key):
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle[key]
+            while idle:
+                conn, since = idle.pop()
+                if now - since < self.idle_ttl:
+                    return conn
+                conn.close()
+        return None
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            idle = self._idle[key]
+            if len(idle) < self.max_idle:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def warm(self, url):
+        # DNS, TCP and TLS now, off the critical path; the connection waits idle for a request.
+        # False when the host can't be reached (offline, blocked), which is not an error here.
+        conn = None
+        try:
+            key = _key(url)
+            conn = self._open(key)
+            conn.connect()
+        except (OSError, ValueError) as e:
+            log.debug("pre-connect to %s failed: %s", url, e)
+            if conn is not None:
+                conn.close()
+            return False
+        self.stats["warmed"] += 1
+        self._checkin(key, conn)
+        return True
+
+    def get(self, url, headers=None, timeout=None, redirects=REDIRECTS):
+        # Body of a GET; HTTP errors raise urllib's HTTPError so throttling is handled the same.
+        key = _key(url)
+        parts = urllib.parse.urlsplit(url)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        while True:
+            conn = self._checkout(key)
+            reused = conn is not None
+            if conn is None:
+                conn = self._open(key)
+                self.stats["opened"] += 1
+            conn.timeout = timeout or self.timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            try:
+                conn.request("GET", target, headers=dict(HEADERS, **(headers or {})))
+                resp = conn.getresponse()
+                body = resp.read()
+            except (ConnectionError, http.client.BadStatusLine):
+                conn.close()
+                # The server closed an idle connection under us: one more try on a fresh one.
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            break
+        self.stats["reused"] += reused
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(key, conn)
+        location = resp.getheader("Location")
+        if resp.status in (301, 302, 303, 307, 308) and location and redirects:
+            return self.get(urllib.parse.urljoin(url, location), headers, timeout, redirects - 1)
+        if resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+        return body
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, collections.defaultdict(list)
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+
+POOL = ConnectionPool()
@@ -0,0 +1,118 @@
+import itertools
+import threading
+
+from yt_dlp import YoutubeDL
+from yt_dlp.networking import Request
+
+from app.models import VideoEntry
+from app.player import YTDL_CACHE_DIR
+
+SEARCH_OPTS = {"extract_flat": True, "skip_download": True, "quiet": True, "cachedir": YTDL_CACHE_DIR}
+FORMAT_OPTS = {"skip_download": True, "quiet": True, "cachedir": YTDL_CACHE_DIR}
+# Playlists and channel tabs are paged lazily: entries come out as each continuation page
+# is parsed instead of after the whole list has been walked.
+COLLECTION_OPTS = {"extract_flat": True, "lazy_playlist": True, "skip_download": True, "quiet": True,
+                   "cachedir": YTDL_CACHE_DIR}
+# Format extraction profiles. "fast-playback" only fetches what the quality dialog shows:
+# no HLS/DASH manifest expansion (progressive and adaptive formats come straight from the
+# player response), no translated caption list, no extra initial-data request, and one
+# player client instead of yt-dlp's several. visionos needs neither the JS player nor a PO
+# token, so no player download or signature solving either; if yt-dlp drops the client it
+# warns and uses its defaults. "full" is yt-dlp's defaults.
+PROFILES = {
+    "fast-playback": dict(FORMAT_OPTS, extractor_args={"youtube": {
+        "skip": ["hls", "dash", "translated_subs"], "player_skip": ["initial_data"],
+        "player_client": ["visionos"]}}),
+    "full": FORMAT_OPTS,
+}
+DEFAULT_PROFILE = "fast-playback"
+COLLECTION_MAX = 5000
+# A few bytes from YouTube, fetched through each cached YoutubeDL at start so its request
+# handler is built and, with `requests` installed (yt-dlp's pooled handler), a keep-alive
+# connection is already open when the first search or quality list needs one.
+PRECONNECT_URL = "https://www.youtube.com/generate_204"
+SORT_MAP = {"RELEVANCE": "", "DATE": "date", "VIEWS": "view_count", "RATING": "rating"}
+FORMAT_FIELDS = ("format_id", "ext", "height", "width", "fps", "vcodec", "acodec", "abr", "tbr",
+                 "dynamic_range", "format_note", "protocol")
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def call(fn, *args):
+    # yt-dlp errors carry loggers and tracebacks that cannot cross a process boundary.
+    try:
+        return fn(*args)
+    except Exception as e:
+        raise ExtractionError(str(e)) from None
+
+
+# These run either on a pool thread or inside an extraction worker process, so
+# they only return small picklable results instead of the full info dict.
+_local = threading.local()
+
+
+def _ydl(opts):
+    key = id(opts)
+    cache = _local.__dict__.setdefault("ydls", {})
+    if key not in cache:
+        cache[key] = YoutubeDL(opts)
+    return cache[key]
+
+
+def search_query(query, max_results, sort="RELEVANCE"):
+    # yt-dlp supports youtube search sorting with ytsearch<sort><N>:query
+    return f"ytsearch{SORT_MAP.get(sort, '')}{max_results}:{query}"
+
+
+def search(query, max_results, sort="RELEVANCE"):
+    info = _ydl(SEARCH_OPTS).extract_info(search_query(query, max_results, sort), download=False)
+    return [VideoEntry.from_info(e) for e in info.get("entries", []) if e]
+
+
+def iter_collection(url):
+    # A generator, so it stays in this process: the service walks it a chunk at a time from
+    # whichever executor thread is free, hence its own YoutubeDL rather than a thread-local one.
+    info = YoutubeDL(COLLECTION_OPTS).extract_info(url, download=False, process=False)
+    owner = info.get("channel") or info.get("uploader")
+    for e in itertools.islice(info.get("entries") or (), COLLECTION_MAX):
+        # Flat channel/playlist entries are video stubs; nested tabs or playlists are skipped.
+        if e and e.get("ie_key", "Youtube") == "Youtube":
+            yield VideoEntry.from_info(e, uploader=e.get("channel") or e.get("uploader") or owner or "Unknown channel")
+
+
+def take(it, n):
+    return list(itertools.islice(it, n))
+
+
+def trim_format(f):
+    trimmed = {k: f[k] for k in FORMAT_FIELDS if f.get(k) is not None}
+    if f.get("protocol") == "mhtml":
+        # Storyboard: sprite sheets of rows x columns frames, one sheet per fragment.
+        trimmed.update(rows=f.get("rows"), columns=f.get("columns"),
+                       fragments=[(fr["url"], fr.get("duration") or 0) for fr in f.get("fragments") or []])
+    return trimmed
+
+
+def formats(url, profile=DEFAULT_PROFILE):
+    info = _ydl(PROFILES.get(profile, FORMAT_OPTS)).extract_info(url, download=False)
+    found = info.get("formats") or []
+    if not found and profile != "full":
+        # Live streams and premieres are only served as manifests, which the fast profile skips.
+        return formats(url, "full")
+    return [trim_format(f) for f in found]
+
+
+def warm_up(preconnect=False):
+    done = getattr(_local, "preconnected", False)
+    for opts in (SEARCH_OPTS, PROFILES[DEFAULT_PROFILE]):
+        ydl = _ydl(opts)
+        if preconnect and not done:
+            try:
+                with ydl.urlopen(Request(PRECONNECT_URL, extensions={"timeout": 5})) as r:
+                    r.read()
+            except Exception:
+                pass  # offline or blocked: the first real request reports it
+    _local.preconnected = done or preconnect
+    return True
@@ -0,0 +1,119 @@
+CODEC_NAMES = {"avc1": "h264", "avc3": "h264", "hev1": "h265", "hvc1": "h265", "vp09": "vp9", "vp9": "vp9",
+               "av01": "av1", "mp4a": "aac", "opus": "opus"}
+HEIGHT_LABELS = ((4320, "8K"), (2160, "4K"), (1440, "1440p"), (1080, "1080p"), (720, "720p"))
+# Selections above this height are worth fast-starting; starts run at or below it.
+FAST_START_HEIGHT = 480
+
+
+def is_video(f):
+    return bool(f.get("height")) and f.get("vcodec") != "none"
+
+
+def is_audio(f):
+    return bool(f.get("abr")) and f.get("vcodec") == "none"
+
+
+def quality_options(formats):
+    # (label, format_id) lists for the quality pickers, best first, one entry per label.
+    videos, audios = [], []
+    seen_v, seen_a = set(), set()
+    for f in sorted(filter(is_video, formats), key=lambda x: x.get("height", 0), reverse=True):
+        label = f"{f.get('height')}p • {f.get('ext')}"
+        if label not in seen_v:
+            seen_v.add(label)
+            videos.append((label, f.get("format_id")))
+    for f in sorted(filter(is_audio, formats), key=lambda x: x.get("abr", 0), reverse=True):
+        label = f"{int(f.get('abr', 0))} kbps"
+        if label not in seen_a:
+            seen_a.add(label)
+            audios.append((label, f.get("format_id")))
+    return videos, audios
+
+
+def fast_start_format(formats, chosen):
+    # A cheap format that gets the first frame up quickly, or None when `chosen` is cheap already.
+    by_id = {f.get("format_id"): f for f in formats}
+    heights = [by_id[fid].get("height") or 0 for fid in (chosen or "").split("+") if fid in by_id]
+    if not heights or max(heights) <= FAST_START_HEIGHT:
+        return None
+    low = [f for f in formats if is_video(f) and 240 <= f["height"] <= FAST_START_HEIGHT]
+    # A single progressive stream (audio included) opens one connection instead of two.
+    progressive = [f for f in low if (f.get("acodec") or "none") != "none"]
+    if progressive:
+        return max(progressive, key=lambda f: f["height"])["format_id"]
+    audios = sorted(filter(is_audio, formats), key=lambda f: f["abr"])
+    if not low or not audios:
+        return None
+    return f"{min(low, key=lambda f: (f['height'], f.get('tbr') or 0))['format_id']}+{audios[0]['format_id']}"
+
+
+def fallback_format(formats, fmt, failed=()):
+    # What to try after `fmt` failed to play: the next lower video with the same audio, then
+    # the same video with the next lower audio, skipping specs already known to fail.
+    videos, audios = quality_options(formats)
+    vids, auds = [fid for _, fid in videos], [fid for _, fid in audios]
+    parts = (fmt or "").split("+")
+    video = next((p for p in parts if p in vids), None)
+    audio = next((p for p in parts if p in auds), None)
+    candidates = []
+    if video:
+        candidates += ["+".join(filter(None, [v, audio])) for v in vids[vids.index(video) + 1:]]
+    if audio:
+        candidates += ["+".join(filter(None, [video, a])) for a in auds[auds.index(audio) + 1:]]
+    return next((c for c in candidates if c != fmt and c not in failed), None)
+
+
+def storyboard(formats, min_width=160):
+    # The smallest storyboard whose frames still cover `min_width`, else the largest one.
+    boards = [f for f in formats if f.get("protocol") == "mhtml" and f.get("fragments")
+              and f.get("rows") and f.get("columns") and f.get("fps")]
+    if not boards:
+        return None
+    fitting = [f for f in boards if (f.get("width") or 0) >= min_width]
+    return min(fitting, key=lambda f: f["width"]) if fitting else max(boards, key=lambda f: f.get("width") or 0)
+
+
+def storyboard_frame(board, fraction):
+    # (sheet index, frame index within that sheet) for a position given as 0..1 of the video.
+    fragments = board["fragments"]
+    t = max(0.0, min(1.0, fraction)) * sum(d for _, d in fragments)
+    for i, (_, duration) in enumerate(fragments):
+        if t < duration or i == len(fragments) - 1:
+            return i, min(board["rows"] * board["columns"] - 1, int(min(t, duration) * board["fps"]))
+        t -= duration
+
+
+def _codec(name):
+    name = (name or "none").split(".")[0].lower()
+    return CODEC_NAMES.get(name, name)
+
+
+def summarize(formats):
+    videos = [f for f in formats if is_video(f)]
+    audios = [f for f in formats if is_audio(f)]
+    top = max((f["height"] for f in videos), default=0)
+    return {
+        "height": top,
+        "fps": int(max((f.get("fps") or 0 for f in videos if f["height"] == top), default=0)),
+        "hdr": any((f.get("dynamic_range") or "SDR") != "SDR" for f in videos),
+        "vcodecs": sorted({_codec(f.get("vcodec")) for f in videos}),
+        "abr": int(max((f.get("abr") or 0 for f in audios), default=0)),
+    }
+
+
+def badge(summary):
+    if not summary or not summary.get("height"):
+        return ""
+    h = summary["height"]
+    parts = [next((label for min_h, label in HEIGHT_LABELS if h >= min_h), f"{h}p")]
+    if summary.get("fps", 0) > 30:
+        parts.append(f"{summary['fps']}fps")
+    if summary.get("hdr"):
+        parts.append("HDR")
+    return " ".join(parts)
+
+
+def badge_details(summary):
+    if not summary:
+        return ""
+    return f"{'/'.join(summary.get('vcodecs', [])) or 'no video'} • audio up to {summary.get('abr', 0)} kbps"
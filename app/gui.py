@@ -1,48 +1,100 @@
-import subprocess
+import asyncio
+import collections
 import sys
 import argparse
-import locale
 import os
 import shutil
 import zipfile
 import tempfile
 import urllib.request
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
     QPushButton, QListWidget, QListWidgetItem, QLabel,
-    QDialog, QFrame, QMessageBox, QComboBox
+    QDialog, QFrame, QMessageBox, QComboBox, QCheckBox
 )
 
+from app import formats as fmts, player
+from app.models import EntryIndex, collection_url
+from app.results import DURATION_RANGES, SORTS, Filters, ResultSet, merge
+from app.service import MediaService
 from app.storage import StorageManager
-from app.widgets import SearchResultItem, LoadingSpinner
-from app.workers import WorkerSignals, YTSearchWorker, FormatsWorker
+from app.widgets import SearchResultItem, LoadingSpinner, ThumbnailScheduler
+from app.subscriptions import FeedIndex
+from app.workers import AsyncBridge, WorkerSignals, get_backend
 from app.themes import Themes
+from app.watchdog import StallWatchdog
+
+
+FFMPEG_URL = "https://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
+
+
+def _download_ffmpeg(url, target_path):
+    with tempfile.TemporaryDirectory() as td:
+        zip_path = os.path.join(td, "ffmpeg.zip")
+        urllib.request.urlretrieve(url, zip_path)
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            member = next((n for n in zf.namelist() if n.endswith("/bin/ffmpeg.exe")), None)
+            if not member:
+                raise RuntimeError("Could not locate ffmpeg.exe in archive")
+            with zf.open(member) as src, open(target_path, "wb") as dst:
+                dst.write(src.read())
+    return target_path
 
 
 class MainWindow(QWidget):
-    MPV_FAST_FLAGS = [
-        "--no-terminal",
-        "--msg-level=all=no",
-        "--prefetch-playlist=yes",
-        "--cache=yes",
-    ]
-    DEFAULT_LANG = ((locale.getlocale()[0] or "en_US")).split("_")[0].lower()
+    DEFAULT_LANG = player.lang_code()
+    ROWS_PER_TICK = 8
 
     def __init__(self):
         super().__init__()
         self.storage = StorageManager()
         self.current_theme = Themes.get("DEFAULT")
+        self.feed_index = FeedIndex()
+        self.entries = EntryIndex()
+        self.result_set = ResultSet()
+        self.last_query = None
+        self.rows = {}
+        self._badge_pass = None
+        self._stream = None
+        self._pending_rows = collections.deque()
+        self.bridge = AsyncBridge()
+        preconnect = self.storage.get_setting("preconnect", True)
+        self.service = MediaService(self.storage, get_backend(self.storage.get_setting("gui_backend", "process"),
+                                                              preconnect))
+        if preconnect:
+            self.bridge.submit(self.service.preconnect())
+        self._feed_refreshing = False
+        # Queries handed over by later launches (see app.instance), delivered on the GUI thread.
+        self.forwarded = WorkerSignals(self)
+        self.forwarded.results.connect(self.open_query)
         self.setWindowTitle("MpvTube")
         self.resize(1200, 800)
         self._build_ui()
+        self._start_watchdog()
+        QTimer.singleShot(2000, self._start_prewarm)
+
+    def _start_watchdog(self):
+        if not self.storage.get_setting("watchdog", True):
+            return
+        self.watchdog = StallWatchdog("gui", self.storage.get_setting("stall_threshold_ms", 250) / 1000).start()
+        self._heartbeat = QTimer(self)
+        self._heartbeat.timeout.connect(self.watchdog.beat)
+        self._heartbeat.start(int(self.watchdog.interval * 1000))
+
+    def _start_prewarm(self):
+        if not self.storage.get_setting("prewarm", True):
+            return
+        queries, urls = self.storage.prewarm_targets()
+        self.bridge.submit(self.service.prewarm(queries, urls, self.storage.get_setting("max_results", 15)))
 
     def _build_ui(self):
         if self.layout():
             # Clean up old references to avoid RuntimeError
-            attrs = ['sidebar', 'body', 'history_list', 'fav_list', 'results', 
-                     'spinner', 'search_in', 'search_btn', 'sort_sel', 'status', 'logo']
+            attrs = ['sidebar', 'body', 'history_list', 'fav_list', 'subs_list', 'results', 
+                     'spinner', 'search_in', 'search_btn', 'sort_sel', 'length_sel', 'channel_in',
+                     'unwatched_chk', 'shorts_chk', 'status', 'logo']
             for a in attrs:
                 if hasattr(self, a):
                     delattr(self, a)
@@ -85,6 +137,12 @@ class MainWindow(QWidget):
             self.fav_list.itemDoubleClicked.connect(self._play_fav)
             side_v.addWidget(self.fav_list)
 
+            side_v.addWidget(QLabel("Subscriptions"))
+            self.subs_list = QListWidget()
+            self.subs_list.setObjectName("side_list")
+            self.subs_list.itemClicked.connect(lambda it: self.show_feed(it.data(Qt.UserRole)))
+            side_v.addWidget(self.subs_list)
+
             side_v.addStretch()
             root.addWidget(self.sidebar)
 
@@ -116,13 +174,32 @@ class MainWindow(QWidget):
         search_h.addWidget(self.search_in)
         
         self.sort_sel = QComboBox()
-        self.sort_sel.addItems(["RELEVANCE", "DATE", "VIEWS", "RATING"])
+        self.sort_sel.addItems(SORTS)
+        self.sort_sel.currentTextChanged.connect(self._on_sort_changed)
         search_h.addWidget(self.sort_sel)
 
         self.search_btn = QPushButton("Search")
         self.search_btn.clicked.connect(self.start_search)
         search_h.addWidget(self.search_btn)
         search_v.addLayout(search_h)
+
+        # Filters only narrow the loaded page, so they never hit the network.
+        filter_h = QHBoxLayout()
+        self.length_sel = QComboBox()
+        self.length_sel.addItems(DURATION_RANGES)
+        self.length_sel.currentTextChanged.connect(self._render_results)
+        filter_h.addWidget(self.length_sel)
+        self.channel_in = QLineEdit()
+        self.channel_in.setPlaceholderText("Filter by channel")
+        self.channel_in.textChanged.connect(self._render_results)
+        filter_h.addWidget(self.channel_in)
+        self.unwatched_chk = QCheckBox("Hide watched")
+        self.unwatched_chk.toggled.connect(self._render_results)
+        filter_h.addWidget(self.unwatched_chk)
+        self.shorts_chk = QCheckBox("Hide shorts")
+        self.shorts_chk.toggled.connect(self._render_results)
+        filter_h.addWidget(self.shorts_chk)
+        search_v.addLayout(filter_h)
         body_v.addLayout(search_v)
 
         self.results = QListWidget()
@@ -130,6 +207,7 @@ class MainWindow(QWidget):
         self.results.itemActivated.connect(self.play_selected)
         self.results.setSpacing(8)
         body_v.addWidget(self.results)
+        self.thumb_queue = ThumbnailScheduler(self.results)
 
         footer = QHBoxLayout()
         footer.setContentsMargins(t["item_padding"], 10, t["item_padding"], 10)
@@ -149,8 +227,7 @@ class MainWindow(QWidget):
         if not actual or not os.path.exists(actual):
             self._show_error(f"mpv not found at: {mpv_path}")
             return
-        self.storage.data["mpv_path"] = mpv_path
-        self.storage.save()
+        self.storage.set_mpv_path(mpv_path)
         QMessageBox.information(self, "mpv OK", f"mpv path saved: {mpv_path}")
 
     def install_ffmpeg_auto(self):
@@ -166,22 +243,19 @@ class MainWindow(QWidget):
         target_dir = os.path.join(os.path.expanduser("~"), ".youtube_mpv", "bin")
         os.makedirs(target_dir, exist_ok=True)
         target_path = os.path.join(target_dir, "ffmpeg.exe")
-        url = "https://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
         self.status.setText("Downloading ffmpeg...")
-        try:
-            with tempfile.TemporaryDirectory() as td:
-                zip_path = os.path.join(td, "ffmpeg.zip")
-                urllib.request.urlretrieve(url, zip_path)
-                with zipfile.ZipFile(zip_path, "r") as zf:
-                    member = next((n for n in zf.namelist() if n.endswith("/bin/ffmpeg.exe")), None)
-                    if not member:
-                        raise RuntimeError("Could not locate ffmpeg.exe in archive")
-                    with zf.open(member) as src, open(target_path, "wb") as dst:
-                        dst.write(src.read())
-            self.status.setText("ffmpeg installed")
-            QMessageBox.information(self, "ffmpeg installed", f"Installed to: {target_path}")
-        except Exception as e:
-            self._show_error(f"ffmpeg install failed: {e}")
+        self.spinner.start()
+        # The download used to block the GUI thread for its whole duration.
+        sig = WorkerSignals(self)
+        sig.results.connect(self._on_ffmpeg_installed)
+        sig.error.connect(lambda e: self._show_error(f"ffmpeg install failed: {e}"))
+        sig.finished.connect(self.spinner.stop)
+        self._ffmpeg_sig = sig
+        self.bridge.submit(asyncio.to_thread(_download_ffmpeg, FFMPEG_URL, target_path), sig)
+
+    def _on_ffmpeg_installed(self, target_path):
+        self.status.setText("ffmpeg installed")
+        QMessageBox.information(self, "ffmpeg installed", f"Installed to: {target_path}")
 
     def _apply_styles(self):
         t = self.current_theme
@@ -211,6 +285,24 @@ class MainWindow(QWidget):
                 it = QListWidgetItem(f["title"])
                 it.setData(Qt.UserRole, f["url"])
                 self.fav_list.addItem(it)
+        if hasattr(self, 'subs_list'):
+            self.subs_list.clear()
+            subs = self.storage.data["subscriptions"]
+            it = QListWidgetItem(f"All uploads ({len(subs)} channels)")
+            it.setData(Qt.UserRole, None)
+            self.subs_list.addItem(it)
+            for s in subs:
+                it = QListWidgetItem(s["title"] or s["id"])
+                it.setData(Qt.UserRole, s["id"])
+                self.subs_list.addItem(it)
+
+    def open_query(self, q):
+        if q:
+            self.search_in.setText(q)
+            self.start_search()
+        self.showNormal()
+        self.raise_()
+        self.activateWindow()
 
     def _search_direct(self, q):
         self.search_in.setText(q)
@@ -223,33 +315,219 @@ class MainWindow(QWidget):
         q = self.search_in.text().strip()
         if not q:
             return
-        self.results.clear()
         self.storage.add_to_history(q)
         self._refresh_side()
+        url = collection_url(q)
+        if url:
+            self._open_collection(url)
+        else:
+            self._run_search(q)
+
+    def _open_collection(self, url):
+        # Rows are appended chunk by chunk while yt-dlp pages through the playlist/channel.
+        self._clear_results()
+        self.result_set = ResultSet(collection=url)
+        self.status.setText("Loading playlist...")
+        self.spinner.start()
+        chunks = WorkerSignals(self)
+        chunks.results.connect(self._append_entries)
+        chunks.finished.connect(chunks.deleteLater)
+        done = WorkerSignals(self)
+        done.results.connect(self._on_collection_loaded)
+        done.error.connect(self._on_worker_error)
+        done.finished.connect(self.spinner.stop)
+
+        async def run():
+            try:
+                async for batch in self.service.expand(url):
+                    chunks.results.emit(batch)
+            finally:
+                chunks.finished.emit()
+        self._stream = self.bridge.submit(run(), done)
+
+    def _run_search(self, q):
+        sort = self.sort_sel.currentText()
+        self._clear_results()
+        self.last_query = q
         self.status.setText(f"Searching: {q}")
         self.spinner.start()
-        sig = WorkerSignals()
-        sig.results.connect(self._populate)
+        # Previously seen matches are painted first; the remote page then replaces them,
+        # with any seen matches it lacks kept after it.
+        local = WorkerSignals(self)
+        local.results.connect(lambda entries: self._show_seen(q, entries))
+        sig = WorkerSignals(self)
+        sig.results.connect(lambda entries: self._populate(entries, sort))
         sig.error.connect(self._on_worker_error)
         sig.finished.connect(self.spinner.stop)
-        YTSearchWorker(q, self.storage.get_setting("max_results", 15), sig, self.sort_sel.currentText()).start()
+        sig.finished.connect(local.deleteLater)
+
+        async def run():
+            seen = await self.service.seen_search(q)
+            if seen:
+                local.results.emit(seen)
+            entries = await self.service.search(q, self.storage.get_setting("max_results", 15), sort)
+            return merge(entries, seen)
+        self._stream = self.bridge.submit(run(), sig)
+
+    def _show_seen(self, q, entries):
+        if self.last_query != q or self.result_set:
+            return
+        self._populate(entries)
+        self.status.setText(f"Searching: {q} ({len(entries)} seen before)")
+
+    def _on_sort_changed(self, sort):
+        # Re-order the loaded page in place; only orderings it can't provide (RATING, or
+        # DATE when flat results carry no upload dates) cost a new search.
+        if not self.result_set or self.result_set.supports(sort):
+            self._render_results()
+        elif self.last_query:
+            self._run_search(self.last_query)
+        else:
+            self.status.setText(f"These results can't be sorted by {sort.lower()}")
+
+    def show_feed(self, channel_id=None):
+        # Paint the locally indexed feed first, then refresh it in the background.
+        entries = self.feed_index.channel_feed(channel_id) if channel_id else self.feed_index.feed
+        self._clear_results()
+        self._populate(entries)
+        if channel_id is None:
+            self.refresh_feed()
+
+    def refresh_feed(self):
+        if self._feed_refreshing or not self.storage.data["subscriptions"]:
+            return
+        self._feed_refreshing = True
+        self.status.setText("Refreshing subscriptions...")
+        self.spinner.start()
+        sig = WorkerSignals(self)
+        sig.results.connect(self._on_feed_refreshed)
+        sig.error.connect(self._on_worker_error)
+        sig.finished.connect(self._on_feed_finished)
+        self.bridge.submit(self.service.refresh_feed(self.feed_index), sig)
+
+    def _on_feed_refreshed(self, result):
+        feed, errors = result
+        self._clear_results()
+        self._populate(feed)
+        if errors:
+            self._on_worker_error(f"{len(errors)} channel(s) failed to refresh:\n" + "\n".join(errors[:5]))
+
+    def _on_feed_finished(self):
+        self._feed_refreshing = False
+        self.spinner.stop()
+
+    def _clear_results(self):
+        if self._stream:
+            self._stream.cancel()
+            self._stream = None
+        self._clear_rows()
+        self.entries.clear()
+        self.result_set = ResultSet()
+        self.last_query = None
+
+    def _clear_rows(self):
+        if self._badge_pass:
+            self._badge_pass.cancel()
+            self._badge_pass = None
+        self._pending_rows.clear()
+        self.thumb_queue.clear()
+        self.results.clear()
+        self.rows.clear()
 
-    def _populate(self, entries):
+    def _filters(self):
+        lo, hi = DURATION_RANGES[self.length_sel.currentText()]
+        return Filters(lo, hi, self.channel_in.text().strip(), self.unwatched_chk.isChecked(),
+                       self.shorts_chk.isChecked())
+
+    def _populate(self, entries, sort="RELEVANCE"):
         if not entries:
             self.status.setText("No results found")
             return
+        self.entries.extend(self.service.attach_placeholders(entries))
+        self.result_set = ResultSet(entries, sort)
+        self._render_results()
+
+    def _render_results(self):
+        if not self.result_set:
+            return
+        sort = self.sort_sel.currentText()
+        if not self.result_set.supports(sort):
+            sort = self.result_set.sort
+        filters = self._filters()
+        entries = self.result_set.view(sort, filters, self.storage.watched_ids() if filters.hide_watched else ())
+        self._clear_rows()
+        self._add_rows(entries)
+        if filters:
+            self.status.setText(f"Showing {len(entries)} of {len(self.result_set)} result(s): {filters.describe()}")
+        else:
+            self.status.setText(f"Found {len(entries)} result(s)")
+        # Summaries are cached, so re-rendering the same page badges it again immediately.
+        if not self.result_set.collection:
+            self._start_badges(entries)
+
+    def _add_rows(self, entries):
         for e in entries:
             it = QListWidgetItem()
-            widget = SearchResultItem(e, self.current_theme)
+            widget = SearchResultItem(e, self.current_theme, self.bridge, self.service)
             it.setSizeHint(widget.container.sizeHint())
-            url = e.get("webpage_url") or e.get("url")
-            if url and not url.startswith("http"):
-                url = f"https://youtube.com/watch?v={url}"
-            it.setData(Qt.UserRole, url)
-            it.setData(Qt.UserRole + 1, e)
+            it.setData(Qt.UserRole, e.url)
             self.results.addItem(it)
             self.results.setItemWidget(it, widget)
-        self.status.setText(f"Found {len(entries)} result(s)")
+            self.rows[e.id] = widget
+            if widget.wants_thumbnail:
+                self.thumb_queue.request(widget, it)
+
+    def _append_entries(self, batch):
+        self.entries.extend(batch)
+        self.result_set.extend(batch)
+        filters = self._filters()
+        watched = self.storage.watched_ids() if filters.hide_watched else ()
+        idle = not self._pending_rows
+        self._pending_rows.extend(e for e in batch if filters.accepts(e, watched))
+        if idle:
+            QTimer.singleShot(0, self._drain_rows)
+        self.status.setText(f"Loaded {len(self.result_set)} video(s)...")
+
+    def _drain_rows(self):
+        # Row widgets are not cheap; a few per event-loop turn keeps a long playlist from
+        # freezing the window while it streams in.
+        n = min(self.ROWS_PER_TICK, len(self._pending_rows))
+        self._add_rows([self._pending_rows.popleft() for _ in range(n)])
+        if self._pending_rows:
+            QTimer.singleShot(0, self._drain_rows)
+
+    def _on_collection_loaded(self, _result):
+        self._stream = None
+        if not self.result_set:
+            self.status.setText("No videos found")
+        elif self._filters() or self.sort_sel.currentText() != self.result_set.sort:
+            self._render_results()
+        else:
+            self.status.setText(f"Loaded {len(self.result_set)} video(s)")
+
+    def _start_badges(self, entries):
+        if not self.storage.get_setting("quality_badges", True):
+            return
+        # Rows are painted first; summaries stream in one by one as they resolve.
+        sig = WorkerSignals(self)
+        sig.results.connect(self._apply_badge)
+        sig.finished.connect(sig.deleteLater)
+
+        async def run():
+            try:
+                async for entry, summary in self.service.format_summaries(entries):
+                    sig.results.emit((entry.id, summary))
+            finally:
+                sig.finished.emit()
+        if self._badge_pass:
+            self._badge_pass.cancel()
+        self._badge_pass = self.bridge.submit(run())
+
+    def _apply_badge(self, result):
+        vid, summary = result
+        widget = self.rows.get(vid)
+        if widget is not None:
+            widget.set_badge(summary)
 
     def play_selected(self, item):
         self._get_formats(item.data(Qt.UserRole))
@@ -260,11 +538,11 @@ class MainWindow(QWidget):
             return
         self.status.setText("Loading available formats...")
         self.spinner.start()
-        sig = WorkerSignals()
+        sig = WorkerSignals(self)
         sig.results.connect(lambda f: self.show_formats(url, f))
         sig.error.connect(self._on_worker_error)
         sig.finished.connect(self.spinner.stop)
-        FormatsWorker(url, sig).start()
+        self.bridge.submit(self.service.formats(url), sig)
 
     def show_formats(self, url, formats):
         dlg = QDialog(self)
@@ -279,25 +557,14 @@ class MainWindow(QWidget):
         alist = QListWidget()
         v.addWidget(alist)
         
-        v_s = [f for f in formats if f.get("height") and f.get("vcodec") != "none"]
-        a_s = [f for f in formats if f.get("abr") and f.get("vcodec") == "none"]
-        
-        seen_video, seen_audio = set(), set()
-        for f in sorted(v_s, key=lambda x: x.get("height", 0), reverse=True):
-            label = f"{f.get('height')}p • {f.get('ext')}"
-            if label in seen_video:
-                continue
-            seen_video.add(label)
+        videos, audios = fmts.quality_options(formats)
+        for label, fid in videos:
             it = QListWidgetItem(label)
-            it.setData(Qt.UserRole, f.get("format_id"))
+            it.setData(Qt.UserRole, fid)
             vlist.addItem(it)
-        for f in sorted(a_s, key=lambda x: x.get("abr", 0), reverse=True):
-            label = f"{int(f.get('abr', 0))} kbps"
-            if label in seen_audio:
-                continue
-            seen_audio.add(label)
+        for label, fid in audios:
             it = QListWidgetItem(label)
-            it.setData(Qt.UserRole, f.get("format_id"))
+            it.setData(Qt.UserRole, fid)
             alist.addItem(it)
             
         if vlist.count():
@@ -312,23 +579,30 @@ class MainWindow(QWidget):
         fb.clicked.connect(lambda: self._bookmark(url, dlg))
         row.addWidget(pb)
         row.addWidget(fb)
+        entry = self.entries.by_url(url)
+        if entry and entry.channel_id and not self.storage.is_subscribed(entry.channel_id):
+            sb = QPushButton("Subscribe")
+            sb.clicked.connect(lambda: self._subscribe(entry, dlg))
+            row.addWidget(sb)
         v.addLayout(row)
         dlg.exec()
+        dlg.deleteLater()
 
     def _bookmark(self, url, dlg):
         dlg.accept()
-        title, thumb = "Unknown video", ""
-        for i in range(self.results.count()):
-            it = self.results.item(i)
-            e = it.data(Qt.UserRole + 1)
-            if it.data(Qt.UserRole) == url:
-                title = e.get("title", title)
-                ts = e.get("thumbnails", [])
-                thumb = ts[-1].get("url", "") if ts else ""
-                break
+        e = self.entries.by_url(url)
+        title, thumb = (e.title, e.thumbnail) if e else ("Unknown video", "")
         self.storage.add_favorite(title, url, thumb)
         self._refresh_side()
 
+    def _subscribe(self, entry, dlg):
+        dlg.accept()
+        name = entry.uploader or entry.channel_id
+        if self.storage.add_subscription(entry.channel_id, name):
+            self.status.setText(f"Subscribed to {name}")
+            self._refresh_side()
+            self.refresh_feed()
+
     def _launch(self, url, vlist, alist, dlg):
         dlg.accept()
         vid = vlist.currentItem().data(Qt.UserRole) if vlist.currentItem() else None
@@ -338,21 +612,26 @@ class MainWindow(QWidget):
             self._show_error("No playable format selected.")
             return
         try:
-            cmd = [
-                self.storage.data["mpv_path"],
-                *self.MPV_FAST_FLAGS,
-                f"--alang={self.DEFAULT_LANG}",
-                f"--slang={self.DEFAULT_LANG}",
-                f"--ytdl-format={fmt}",
-                url
-            ]
-            subprocess.Popen(cmd)
-            self.status.setText("Playback started in mpv")
-            QApplication.instance().quit()
+            player.resolve_mpv(self.storage.data.get("mpv_path", "mpv"))
         except FileNotFoundError:
             self._show_error("mpv executable not found. Update your mpv path in config.")
-        except Exception as e:
-            self._show_error(f"Failed to launch mpv: {e}")
+            return
+        # The window closes once mpv is playing; a fast start is seen through to the chosen
+        # quality first, since the switch is driven from here.
+        self.status.setText("Starting mpv...")
+        self.spinner.start()
+        sig = WorkerSignals(self)
+        sig.results.connect(self._on_launched)
+        sig.error.connect(lambda msg: self._show_error(f"Failed to launch mpv: {msg}"))
+        sig.finished.connect(self.spinner.stop)
+        self.bridge.submit(self.service.launch(url, fmt, self.DEFAULT_LANG, wait_upgrade=True), sig)
+
+    def _on_launched(self, playback):
+        self.status.setText(self.service.start_report(playback))
+        if playback.error:
+            self._show_error(self.service.start_report(playback))
+            return
+        QApplication.instance().quit()
 
     def _on_worker_error(self, msg):
         self.status.setText("Operation failed")
@@ -0,0 +1,147 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+
+log = logging.getLogger("mpvtube.instance")
+
+# One running MpvTube per user. Later launches hand their query to it over a local socket
+# and exit before importing Qt, Textual or yt-dlp, so keep this module stdlib-only.
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mpvTube")
+SOCKET_PATH = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or CACHE_DIR, "mpvtube.sock")
+# Windows has no usable unix sockets here: listen on loopback and publish the port instead.
+PORT_PATH = os.path.join(CACHE_DIR, "instance.port")
+UNIX = os.name != "nt" and hasattr(socket, "AF_UNIX")
+TIMEOUT = 0.5
+
+
+def _connect():
+    if UNIX:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(TIMEOUT)
+        try:
+            sock.connect(SOCKET_PATH)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+    with open(PORT_PATH) as f:
+        port = int(f.read())
+    return socket.create_connection(("127.0.0.1", port), TIMEOUT)
+
+
+def _send(message):
+    # True once a running instance acknowledged `message`. Connection errors propagate.
+    with _connect() as sock:
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        return sock.makefile("rb").readline().strip() == b"ok"
+
+
+def _hand_off(message, attempts):
+    # True once `message` was delivered; False only when every attempt found nobody there
+    # (connection refused, no socket or port file). A live instance acknowledges from the
+    # moment it is bound, so one that times out is busy, not gone: that raises TimeoutError
+    # rather than letting this launch take its socket.
+    live = False
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(0.05)
+        try:
+            if _send(message):
+                return True
+            live = True
+        except (ConnectionRefusedError, FileNotFoundError):
+            pass
+        except (OSError, ValueError):
+            live = True
+    if live:
+        raise TimeoutError("the running MpvTube did not answer")
+    return False
+
+
+def claim(message, attempts=3):
+    # A Listener when this process is the first instance; None once `message` was
+    # delivered to the one already running.
+    if not UNIX:
+        if _hand_off(message, attempts):
+            return None
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(8)
+        listener = Listener(sock)
+        # Published only once it is accepting.
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(PORT_PATH, "w") as f:
+            f.write(str(sock.getsockname()[1]))
+        return listener
+    os.makedirs(os.path.dirname(SOCKET_PATH), exist_ok=True)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(SOCKET_PATH)
+    except OSError:
+        # Taken: either a live instance or a socket file left behind by one that crashed.
+        try:
+            delivered = _hand_off(message, attempts)
+        except TimeoutError:
+            sock.close()
+            raise
+        if delivered:
+            sock.close()
+            return None
+        os.unlink(SOCKET_PATH)
+        sock.bind(SOCKET_PATH)
+    os.chmod(SOCKET_PATH, 0o600)
+    sock.listen(8)
+    inode = os.stat(SOCKET_PATH).st_ino
+    atexit.register(_release, sock, inode)
+    return Listener(sock)
+
+
+def _release(sock, inode):
+    sock.close()
+    try:
+        # Only remove the file if a newer instance has not replaced it meanwhile.
+        if os.stat(SOCKET_PATH).st_ino == inode:
+            os.unlink(SOCKET_PATH)
+    except OSError:
+        pass
+
+
+class Listener:
+    # Accepts and acknowledges forwarded launches from the moment the socket is bound, while
+    # the UI is still importing and starting; they wait in `messages` until serve().
+    def __init__(self, sock):
+        self.sock = sock
+        self.messages = queue.Queue()
+        threading.Thread(target=self._accept, name="instance", daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(TIMEOUT)
+                    message = json.loads(conn.makefile("rb").readline())
+                    conn.sendall(b"ok\n")
+                except (OSError, ValueError):
+                    continue
+            self.messages.put(message)
+
+    def serve(self, handle):
+        # Calls handle(message) on a thread of its own for every forwarded launch, queued
+        # ones first; the senders were acknowledged long before.
+        def loop():
+            while True:
+                message = self.messages.get()
+                try:
+                    handle(message)
+                except Exception:
+                    log.exception("forwarded launch %r failed", message)
+        threading.Thread(target=loop, name="instance-handler", daemon=True).start()
@@ -0,0 +1,131 @@
+import re
+
+WATCH_URL = "https://www.youtube.com/watch?v={}"
+PLAYLIST_URL = "https://www.youtube.com/playlist?list={}"
+CHANNEL_TABS = ("videos", "shorts", "streams")
+THUMB_TARGET_WIDTH = 320
+
+_ID_RE = re.compile(r"(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([\w-]{11})")
+_BARE_ID_RE = re.compile(r"^[\w-]{11}$")
+_LIST_RE = re.compile(r"[?&]list=([\w-]+)")
+_CHANNEL_RE = re.compile(r"youtube\.com/(@[\w.-]+|channel/UC[\w-]{22}|c/[\w.-]+|user/[\w.-]+)(?:/(\w+))?")
+
+
+def video_id(url_or_id):
+    if not url_or_id:
+        return None
+    if _BARE_ID_RE.match(url_or_id):
+        return url_or_id
+    m = _ID_RE.search(url_or_id)
+    return m.group(1) if m else None
+
+
+def canonical_url(url_or_id):
+    vid = video_id(url_or_id)
+    if vid:
+        return WATCH_URL.format(vid)
+    return url_or_id or None
+
+
+def collection_url(text):
+    # Playlist and channel links typed into search; None for anything else. Channel roots
+    # map to their uploads tab, since the root page only lists the tabs themselves.
+    text = (text or "").strip()
+    if not text or " " in text or "youtu" not in text:
+        return None
+    m = _LIST_RE.search(text)
+    if m:
+        return PLAYLIST_URL.format(m.group(1))
+    m = _CHANNEL_RE.search(text)
+    if m:
+        tab = m.group(2) if m.group(2) in CHANNEL_TABS else "videos"
+        return f"https://www.youtube.com/{m.group(1)}/{tab}"
+    return None
+
+
+def best_thumbnail(thumbs, width=THUMB_TARGET_WIDTH):
+    # Smallest thumbnail that still covers the target width, else the largest one.
+    usable = [t for t in thumbs or [] if t.get("url")]
+    if not usable:
+        return ""
+    fitting = [t for t in usable if (t.get("width") or 0) >= width]
+    if fitting:
+        return min(fitting, key=lambda t: t["width"])["url"]
+    return usable[-1]["url"]
+
+
+def format_duration(seconds):
+    if not seconds:
+        return "??:??"
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+class VideoEntry:
+    __slots__ = ("id", "url", "title", "uploader", "duration", "thumbnail", "channel_id", "timestamp",
+                 "view_count", "placeholder")
+
+    def __init__(self, id, url, title="Untitled video", uploader="Unknown channel", duration=None,
+                 thumbnail="", channel_id=None, timestamp=None, view_count=None, placeholder=None):
+        self.id, self.url, self.title, self.uploader = id, url, title, uploader
+        self.duration, self.thumbnail = duration, thumbnail
+        self.channel_id, self.timestamp, self.view_count = channel_id, timestamp, view_count
+        self.placeholder = placeholder  # see app.placeholders
+
+    @classmethod
+    def from_info(cls, e, **overrides):
+        url = canonical_url(e.get("webpage_url") or e.get("url") or e.get("id"))
+        fields = {
+            "id": e.get("id") or video_id(url) or url,
+            "url": url,
+            "title": e.get("title") or "Untitled video",
+            "uploader": e.get("channel") or e.get("uploader") or "Unknown channel",
+            "duration": int(e["duration"]) if e.get("duration") else None,
+            "thumbnail": best_thumbnail(e.get("thumbnails")) or e.get("thumbnail") or "",
+            "channel_id": e.get("channel_id"),
+            "timestamp": e.get("timestamp"),
+            "view_count": e.get("view_count"),
+        }
+        fields.update(overrides)
+        return cls(**fields)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**{k: d.get(k) for k in cls.__slots__})
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    @property
+    def duration_string(self):
+        return format_duration(self.duration)
+
+    def __repr__(self):
+        return f"VideoEntry({self.id!r}, {self.title!r})"
+
+
+class EntryIndex:
+    def __init__(self, entries=()):
+        self._by_id = {}
+        self.extend(entries)
+
+    def extend(self, entries):
+        for e in entries:
+            self._by_id[e.id] = e
+
+    def get(self, vid):
+        return self._by_id.get(vid)
+
+    def by_url(self, url):
+        return self._by_id.get(video_id(url) or url)
+
+    def clear(self):
+        self._by_id.clear()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
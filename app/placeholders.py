@@ -0,0 +1,44 @@
+import importlib.util
+
+# A placeholder is the thumbnail averaged down to a 4x3 grid of RGB cells: 36 bytes, kept
+# as hex on the entry so it survives the search caches and feed.json, and painted before
+# (or instead of) the real thumbnail.
+GRID = (4, 3)
+STORE_PREFIX = "placeholder:"
+
+
+def available():
+    # Decoding goes through QImage, which terminal-only installs may not have.
+    return importlib.util.find_spec("PySide6") is not None
+
+
+def from_image(img):
+    from PySide6.QtCore import Qt
+    w, h = GRID
+    # Smooth downscaling is an area average, i.e. exactly the per-cell mean colour.
+    small = img.scaled(w, h, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    return "".join(f"{small.pixel(x, y) & 0xFFFFFF:06x}" for y in range(h) for x in range(w))
+
+
+def from_bytes(data):
+    try:
+        from PySide6.QtGui import QImage
+    except ImportError:
+        return None
+    img = QImage.fromData(bytes(data))
+    return None if img.isNull() else from_image(img)
+
+
+def colours(ph):
+    # Row-major "#rrggbb" strings.
+    return [f"#{ph[i:i + 6]}" for i in range(0, len(ph), 6)]
+
+
+def to_image(ph, size):
+    from PySide6.QtCore import Qt
+    from PySide6.QtGui import QImage
+    w, h = GRID
+    data = bytes.fromhex(ph)  # QImage borrows this buffer; keep it alive until scaled() copies
+    img = QImage(data, w, h, w * 3, QImage.Format_RGB888)
+    # Bilinear upscaling turns the cells into a soft gradient rather than a mosaic.
+    return img.scaled(*size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
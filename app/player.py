@@ -0,0 +1,340 @@
+import asyncio
+import itertools
+import json
+import locale
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+
+log = logging.getLogger("mpvtube.player")
+
+# yt-dlp's player/signature cache, shared by our extraction and mpv's ytdl hook so a
+# player JS solved once serves both, across runs.
+YTDL_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mpvTube", "yt-dlp")
+
+MPV_FAST_FLAGS = [
+    "--no-terminal",
+    "--msg-level=all=no",
+    "--prefetch-playlist=yes",
+    "--cache=yes",
+]
+
+
+def lang_code():
+    loc = locale.getlocale()[0] or "en_US"
+    return loc.split("_")[0].lower()
+
+
+def resolve_mpv(mpv_path):
+    mpv_path = mpv_path or "mpv"
+    actual = shutil.which(mpv_path)
+    if not actual and os.path.basename(mpv_path) != mpv_path and os.path.exists(mpv_path):
+        actual = mpv_path
+    if not actual:
+        raise FileNotFoundError(f"Could not find mpv at '{mpv_path}'")
+    return actual
+
+
+def mpv_command(mpv_path, url, fmt, lang=None, ipc=None):
+    lang = lang or lang_code()
+    return [
+        mpv_path, *MPV_FAST_FLAGS, f"--ytdl-raw-options-append=cache-dir={YTDL_CACHE_DIR}",
+        *([f"--input-ipc-server={ipc}"] if ipc else []),
+        f"--alang={lang}", f"--slang={lang}", f"--ytdl-format={fmt}", url,
+    ]
+
+
+def spawn(cmd):
+    return subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+# Fast start: mpv opens a cheap format first and is moved to the chosen one over IPC once
+# this much of the cheap stream is buffered, or after UPGRADE_DEADLINE regardless.
+FAST_START_CUSHION = 8.0
+UPGRADE_DEADLINE = 30.0
+FIRST_FRAME_TIMEOUT = 60.0
+_ipc_ids = itertools.count()
+
+
+def ipc_path():
+    name = f"mpvtube-{os.getpid()}-{next(_ipc_ids)}"
+    return rf"\\.\pipe\{name}" if os.name == "nt" else os.path.join(tempfile.gettempdir(), name + ".sock")
+
+
+class PlaybackError(EOFError):
+    # mpv gave up on the stream itself (unavailable, expired, unsupported format), as
+    # opposed to the player being closed.
+    pass
+
+
+# mpv's exit status when the file could not be played.
+EXIT_UNPLAYABLE = 2
+
+
+def _pipe_available(f):
+    # Bytes waiting in a Windows named pipe, or None once mpv has closed its end.
+    import ctypes
+    import msvcrt
+    available = ctypes.c_ulong(0)
+    handle = msvcrt.get_osfhandle(f.fileno())
+    if not ctypes.windll.kernel32.PeekNamedPipe(handle, None, 0, None, ctypes.byref(available), None):
+        return None
+    return available.value
+
+
+def exit_error(proc, wait=2.0):
+    # Why an mpv that went away before its first frame did so, when it was the stream's fault.
+    try:
+        code = proc.wait(wait)
+    except subprocess.TimeoutExpired:
+        return None
+    return f"mpv could not open the stream (exit status {code})" if code == EXIT_UNPLAYABLE else None
+
+
+class MpvIPC:
+    # Blocking JSON IPC client; runs on a worker thread, one conversation at a time.
+    def __init__(self, path, proc=None, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self._connect(path)
+                break
+            except OSError:
+                if time.monotonic() > deadline or (proc is not None and proc.poll() is not None):
+                    raise
+                time.sleep(0.05)
+        self._ids = itertools.count(1)
+        self._events = []
+        self._buf = b""
+
+    def _connect(self, path):
+        if os.name == "nt":
+            self._sock = None
+            self._w = self._r = open(path, "r+b", buffering=0)
+        else:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(path)
+            self._r, self._w = self._sock.makefile("rb"), self._sock.makefile("wb", buffering=0)
+
+    def _read(self, deadline=None):
+        if self._sock is None:
+            line = self._pipe_readline(deadline)
+        else:
+            self._sock.settimeout(None if deadline is None else max(0.01, deadline - time.monotonic()))
+            try:
+                line = self._r.readline()
+            except socket.timeout:
+                raise TimeoutError("mpv did not answer in time") from None
+        if not line:
+            raise EOFError("mpv exited")
+        return json.loads(line)
+
+    def _pipe_readline(self, deadline):
+        # A read on the pipe blocks with no timeout, and one blocked on a reader thread would
+        # hold up our writes on the same handle, so only what has already arrived is read.
+        while b"\n" not in self._buf:
+            available = _pipe_available(self._r)
+            if available is None:
+                return b""
+            if available:
+                self._buf += self._r.read(available)
+            elif deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("mpv did not answer in time")
+            else:
+                time.sleep(0.01)
+        line, _, self._buf = self._buf.partition(b"\n")
+        return line + b"\n"
+
+    def command(self, *args):
+        rid = next(self._ids)
+        self._w.write(json.dumps({"command": list(args), "request_id": rid}).encode() + b"\n")
+        while True:
+            msg = self._read(time.monotonic() + 10)
+            if msg.get("request_id") == rid:
+                if msg.get("error") != "success":
+                    raise RuntimeError(f"mpv {args[0]}: {msg.get('error')}")
+                return msg.get("data")
+            if "event" in msg:
+                self._events.append(msg)
+
+    def event(self, deadline=None):
+        if self._events:
+            return self._events.pop(0)
+        while True:
+            msg = self._read(deadline)
+            if "event" in msg:
+                return msg
+
+    def wait_for(self, name, deadline=None):
+        while (msg := self.event(deadline))["event"] != name:
+            if msg["event"] == "end-file" and msg.get("reason") == "error":
+                raise PlaybackError(msg.get("file_error") or "playback failed")
+            if msg["event"] in ("end-file", "shutdown"):
+                raise EOFError("mpv stopped before playback started")
+        return msg
+
+    def close(self):
+        for f in {self._r, self._w}:
+            f.close()
+        if self._sock is not None:
+            self._sock.close()
+
+
+def wait_first_frame(ipc, spawned):
+    # Seconds from spawn until mpv reports playback running, i.e. the first frame is up.
+    ipc.wait_for("playback-restart", spawned + FIRST_FRAME_TIMEOUT)
+    return time.monotonic() - spawned
+
+
+def upgrade(ipc, url, fmt, cushion=FAST_START_CUSHION, deadline=UPGRADE_DEADLINE):
+    # Moves a fast-started player onto `fmt` at the current position; returns how long the
+    # switch held playback, or None when mpv went away first.
+    try:
+        ipc.command("observe_property", 1, "demuxer-cache-duration")
+        ipc.command("observe_property", 2, "demuxer-cache-idle")
+        until = time.monotonic() + deadline
+        buffered = idle = False
+        while not (buffered or idle):
+            try:
+                msg = ipc.event(until)
+            except TimeoutError:
+                break
+            if msg["event"] in ("end-file", "shutdown"):
+                return None
+            if msg["event"] == "property-change":
+                if msg["id"] == 1:
+                    buffered = (msg.get("data") or 0) >= cushion
+                elif msg["id"] == 2:
+                    idle = bool(msg.get("data"))  # short video: nothing left to buffer
+        pos = ipc.command("get_property", "time-pos") or 0
+        # Set globally rather than as loadfile options: the position of that argument
+        # changed across mpv releases.
+        ipc.command("set_property", "ytdl-format", fmt)
+        ipc.command("set_property", "start", f"{pos:.3f}")
+        switched = time.monotonic()
+        ipc.command("loadfile", url, "replace")
+        ipc.wait_for("playback-restart", switched + FIRST_FRAME_TIMEOUT)
+        stall = time.monotonic() - switched
+        ipc.command("set_property", "start", "none")
+        log.info("fast start switched to %s at %.1fs, playback held for %.2fs", fmt, pos, stall)
+        return stall
+    except (OSError, EOFError, TimeoutError, RuntimeError) as e:
+        log.info("fast start upgrade to %s abandoned: %s", fmt, e)
+        return None
+    finally:
+        ipc.close()
+
+
+class Playback:
+    def __init__(self, proc, strategy, url=None, fmt=None, spawned=None):
+        self.proc, self.strategy = proc, strategy
+        self.url, self.fmt = url, fmt
+        self.spawned = spawned or time.monotonic()
+        self.first_frame = None  # seconds from spawn, when it could be measured
+        self.upgrade = None  # task resolving to the switch stall while a fast start moves up
+        self.exited = None  # future resolving to the exit status, set by PlayerSupervisor.track
+        self.returncode = self.ended = None
+        self.stopped = False  # closed by the supervisor to make room
+        self.error = None  # why mpv gave up on the stream before its first frame
+        self.fallbacks = []  # (format spec, error) tried and failed before this one
+
+    def describe(self, other=None, other_median=None):
+        if self.error:
+            tried = ", ".join([spec for spec, _ in self.fallbacks] + [self.fmt])
+            return f"Playback failed: {self.error} (tried {tried})"
+        if self.first_frame is None:
+            text = "Playback started in mpv"
+        else:
+            text = f"First frame after {self.first_frame:.1f}s ({self.strategy}"
+            if other_median is not None:
+                text += f"; {other} launches median {other_median:.1f}s"
+            text += ")"
+        if self.fallbacks:
+            text += f". {', '.join(spec for spec, _ in self.fallbacks)} failed, playing {self.fmt}"
+        return text
+
+    def uptime(self):
+        return (self.ended or time.monotonic()) - self.spawned
+
+    def describe_exit(self):
+        played = format_uptime(self.uptime())
+        if self.stopped:
+            return f"mpv closed to make room after {played}"
+        if self.returncode == 0:
+            return f"mpv closed after {played}"
+        if self.returncode is not None and self.returncode < 0:
+            return f"mpv was stopped (signal {-self.returncode}) after {played}"
+        return f"mpv exited with status {self.returncode} after {played}"
+
+
+def format_uptime(seconds):
+    m, s = divmod(int(seconds), 60)
+    return f"{m}:{s:02d}"
+
+
+# Exit statuses are polled from the event loop rather than waited on from threads, so a
+# long-lived player never pins an executor thread.
+REAP_INTERVAL = 0.5
+TERMINATE_GRACE = 5.0
+POLICIES = ("replace", "queue")
+
+
+class PlayerSupervisor:
+    # Every mpv this process started. Exits are reaped as they happen and at most
+    # `max_players` (0 = no limit) run at once: past that a launch either closes the oldest
+    # player ("replace") or waits for one to exit ("queue").
+    def __init__(self, max_players=2, policy="replace"):
+        self.max_players = max_players
+        self.policy = policy if policy in POLICIES else "replace"
+        self.players = []
+        # Held from making room until the new player is tracked, so launches can't overshoot.
+        self.lock = asyncio.Lock()
+        self._changed = asyncio.Condition()
+        self._reapers = set()
+
+    def running(self):
+        # poll() also reaps, so a player that just exited frees its slot before _reap runs.
+        return [p for p in self.players if p.proc.poll() is None]
+
+    def full(self):
+        return 0 < self.max_players <= len(self.running())
+
+    async def make_room(self):
+        while self.full():
+            if self.policy == "queue":
+                async with self._changed:
+                    await self._changed.wait_for(lambda: not self.full())
+            else:
+                await self.stop(self.running()[0])
+
+    async def stop(self, playback):
+        log.info("closing mpv %s (%d of %d playing)", playback.url, len(self.running()), self.max_players)
+        playback.stopped = True
+        playback.proc.terminate()
+        deadline = time.monotonic() + TERMINATE_GRACE
+        while playback.proc.poll() is None:
+            if time.monotonic() > deadline:
+                playback.proc.kill()
+                deadline = float("inf")
+            await asyncio.sleep(0.02)
+
+    def track(self, playback):
+        playback.exited = asyncio.get_running_loop().create_future()
+        self.players.append(playback)
+        task = asyncio.ensure_future(self._reap(playback))
+        self._reapers.add(task)
+        task.add_done_callback(self._reapers.discard)
+
+    async def _reap(self, playback):
+        while (code := playback.proc.poll()) is None:
+            await asyncio.sleep(REAP_INTERVAL)
+        playback.returncode, playback.ended = code, time.monotonic()
+        self.players.remove(playback)
+        log.info("%s (%s)", playback.describe_exit(), playback.url)
+        playback.exited.set_result(code)
+        async with self._changed:
+            self._changed.notify_all()
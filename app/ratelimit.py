@@ -0,0 +1,153 @@
+import asyncio
+import collections
+import logging
+import random
+import re
+import threading
+import time
+import urllib.error
+from urllib.parse import urlparse
+
+log = logging.getLogger("mpvtube.ratelimit")
+
+YOUTUBE = "www.youtube.com"
+# Subscription feed refreshes get a budget of their own: one page per channel, hundreds of
+# channels at once, would otherwise take minutes behind the interactive reserve of YOUTUBE.
+YOUTUBE_FEEDS = "www.youtube.com/feeds"
+# host -> (tokens per second, burst). Thumbnail CDNs take far more than the API does.
+LIMITS = {YOUTUBE: (3.0, 10), YOUTUBE_FEEDS: (10.0, 20), "i.ytimg.com": (20.0, 30)}
+DEFAULT_LIMIT = (5.0, 10)
+
+_HTTP_STATUS_RE = re.compile(r"HTTP Error (429|5\d\d)")
+
+
+def host_of(url):
+    host = urlparse(url).hostname or YOUTUBE
+    # i1..i9.ytimg.com and friends share one bucket.
+    return "i.ytimg.com" if host.endswith("ytimg.com") else host
+
+
+def throttle_delay(err):
+    # None when `err` is not a throttle/overload response, else the server's Retry-After
+    # in seconds (0.0 when it gave none and our own backoff applies).
+    if isinstance(err, urllib.error.HTTPError):
+        if err.code != 429 and err.code < 500:
+            return None
+        try:
+            return float(err.headers.get("Retry-After") or 0)
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0 if _HTTP_STATUS_RE.search(str(err)) else None
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate, self.burst = rate, burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+
+    def take(self, now, reserve=0):
+        # Seconds until a token is free, or 0 after taking one. `reserve` tokens stay
+        # untouched so that background callers can't drain what interactive ones need.
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens - reserve >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 + reserve - self.tokens) / self.rate
+
+
+class _Host:
+    def __init__(self, rate, burst):
+        self.bucket = TokenBucket(rate, burst)
+        self.blocked_until = 0.0
+        self.strikes = 0
+        self.interactive_waiting = 0
+
+
+# Process-wide request governor: every request to YouTube, whether made from the
+# service loop, the feed refresh threads or a thumbnail download, takes a token here first.
+class RateLimiter:
+    def __init__(self, limits=LIMITS, background_reserve=2, base_backoff=1.0, max_backoff=120.0):
+        self.limits, self.background_reserve = limits, background_reserve
+        self.base_backoff, self.max_backoff = base_backoff, max_backoff
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.metrics = collections.defaultdict(lambda: {"requests": 0, "throttled_s": 0.0, "backoffs": 0})
+
+    def _host(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = _Host(*self.limits.get(host, DEFAULT_LIMIT))
+        return self._hosts[host]
+
+    def _reserve(self, host, background):
+        with self._lock:
+            h = self._host(host)
+            now = time.monotonic()
+            if h.blocked_until > now:
+                return h.blocked_until - now
+            if background and h.interactive_waiting:
+                return 1 / h.bucket.rate
+            return h.bucket.take(now, self.background_reserve if background else 0)
+
+    def _waiting(self, host, background, delta):
+        if not background:
+            with self._lock:
+                self._host(host).interactive_waiting += delta
+
+    def _record(self, host, background, waited):
+        with self._lock:
+            m = self.metrics[(host, "background" if background else "interactive")]
+            m["requests"] += 1
+            m["throttled_s"] += waited
+
+    async def acquire(self, host=YOUTUBE, background=False):
+        started = time.monotonic()
+        self._waiting(host, background, 1)
+        try:
+            while (delay := self._reserve(host, background)) > 0:
+                await asyncio.sleep(delay)
+        finally:
+            self._waiting(host, background, -1)
+        self._record(host, background, time.monotonic() - started)
+
+    def wait(self, host=YOUTUBE, background=False):
+        # Blocking twin of acquire() for plain worker threads.
+        started = time.monotonic()
+        self._waiting(host, background, 1)
+        try:
+            while (delay := self._reserve(host, background)) > 0:
+                time.sleep(delay)
+        finally:
+            self._waiting(host, background, -1)
+        self._record(host, background, time.monotonic() - started)
+
+    def penalize(self, host, retry_after=0.0):
+        # Exponential backoff with jitter; a server-sent Retry-After always wins.
+        with self._lock:
+            h = self._host(host)
+            h.strikes += 1
+            delay = min(self.max_backoff, self.base_backoff * 2 ** (h.strikes - 1))
+            delay = retry_after or delay / 2 + random.uniform(0, delay / 2)
+            h.blocked_until = max(h.blocked_until, time.monotonic() + delay)
+            self.metrics[(host, "backoff")]["backoffs"] += 1
+            self.metrics[(host, "backoff")]["throttled_s"] += delay
+        log.warning("%s is throttling us (strike %d), pausing requests for %.1fs", host, h.strikes, delay)
+        return delay
+
+    def success(self, host):
+        with self._lock:
+            self._host(host).strikes = 0
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "hosts": {host: {"tokens": round(h.bucket.tokens, 2), "strikes": h.strikes,
+                                 "blocked_for": round(max(0.0, h.blocked_until - now), 2)}
+                          for host, h in self._hosts.items()},
+                "metrics": {f"{host}/{kind}": dict(m) for (host, kind), m in self.metrics.items()},
+            }
+
+
+GOVERNOR = RateLimiter()
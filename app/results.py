@@ -0,0 +1,103 @@
+SORTS = ("RELEVANCE", "DATE", "VIEWS", "DURATION", "CHANNEL", "RATING")
+DURATION_RANGES = {
+    "Any length": (None, None),
+    "Under 4 min": (None, 240),
+    "4-20 min": (240, 1200),
+    "Over 20 min": (1200, None),
+}
+SHORTS_MAX = 60
+# A local ordering is only trusted when most of the page actually carries the field.
+MIN_COVERAGE = 0.8
+
+# Sort name -> (key, descending). RELEVANCE is simply the order a search returned, and
+# RATING is never present in flat results, so neither has a local key.
+SORT_KEYS = {
+    "DATE": (lambda e: e.timestamp, True),
+    "VIEWS": (lambda e: e.view_count, True),
+    "DURATION": (lambda e: e.duration, False),
+    "CHANNEL": (lambda e: (e.uploader or "").casefold(), False),
+}
+
+
+def merge(remote, seen):
+    # A fresh page in its own order, followed by previously seen matches it did not include.
+    ids = {e.id for e in remote}
+    return list(remote) + [e for e in seen if e.id not in ids]
+
+
+class Filters:
+    __slots__ = ("min_duration", "max_duration", "uploader", "hide_watched", "hide_shorts")
+
+    def __init__(self, min_duration=None, max_duration=None, uploader="", hide_watched=False, hide_shorts=False):
+        self.min_duration, self.max_duration = min_duration, max_duration
+        self.uploader, self.hide_watched, self.hide_shorts = uploader, hide_watched, hide_shorts
+
+    def __bool__(self):
+        return any(getattr(self, k) for k in self.__slots__)
+
+    def describe(self):
+        parts = []
+        if self.min_duration or self.max_duration:
+            parts.append(next((name for name, r in DURATION_RANGES.items()
+                               if r == (self.min_duration, self.max_duration)), "custom length"))
+        if self.uploader:
+            parts.append(f"channel ~ {self.uploader}")
+        if self.hide_watched:
+            parts.append("unwatched")
+        if self.hide_shorts:
+            parts.append("no shorts")
+        return ", ".join(parts)
+
+    def accepts(self, entry, watched=()):
+        d = entry.duration
+        # Unknown durations (live streams, premieres) only pass when no range is set.
+        if self.min_duration is not None and (d is None or d < self.min_duration):
+            return False
+        if self.max_duration is not None and (d is None or d > self.max_duration):
+            return False
+        if self.hide_shorts and d is not None and d <= SHORTS_MAX:
+            return False
+        if self.uploader and self.uploader.casefold() not in (entry.uploader or "").casefold():
+            return False
+        return not (self.hide_watched and entry.id in watched)
+
+
+# One fetched page, kept in the order it arrived. Each local ordering is computed once
+# and cached, so flipping between sorts or filters never touches the network.
+class ResultSet:
+    def __init__(self, entries=(), sort="RELEVANCE", collection=None):
+        self.entries = list(entries)
+        self.sort = sort
+        # Playlist/channel URL the page was expanded from; those pages can run to thousands
+        # of entries, so nothing is resolved per entry until one is opened.
+        self.collection = collection
+        self._orders = {sort: self.entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def extend(self, entries):
+        self.entries.extend(entries)
+        self._orders = {self.sort: self.entries}
+
+    def supports(self, sort):
+        if sort in self._orders:
+            return True
+        if sort not in SORT_KEYS or not self.entries:
+            return False
+        key = SORT_KEYS[sort][0]
+        return sum(key(e) is not None for e in self.entries) >= MIN_COVERAGE * len(self.entries)
+
+    def ordered(self, sort):
+        if sort not in self._orders:
+            key, descending = SORT_KEYS[sort]
+            known = [e for e in self.entries if key(e) is not None]
+            unknown = [e for e in self.entries if key(e) is None]
+            self._orders[sort] = sorted(known, key=key, reverse=descending) + unknown
+        return self._orders[sort]
+
+    def view(self, sort, filters=None, watched=()):
+        entries = self.ordered(sort)
+        if not filters:
+            return entries
+        return [e for e in entries if filters.accepts(e, watched)]
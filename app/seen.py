@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from app.models import VideoEntry
+
+log = logging.getLogger("mpvtube.seen")
+
+SEEN_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mpvTube", "seen.db")
+# Relevance is divided by 1 + age / RECENCY_DAYS, so a result seen a month ago needs twice
+# the text match of one seen today.
+RECENCY_DAYS = 30
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries(
+    rowid INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, title TEXT, uploader TEXT,
+    entry TEXT NOT NULL, seen REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS entries_seen ON entries(seen);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    title, uploader, content='entries', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2');
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, title, uploader) VALUES (new.rowid, new.title, new.uploader);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, title, uploader) VALUES ('delete', old.rowid, old.title, old.uploader);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, title, uploader) VALUES ('delete', old.rowid, old.title, old.uploader);
+    INSERT INTO entries_fts(rowid, title, uploader) VALUES (new.rowid, new.title, new.uploader);
+END;
+"""
+
+
+def match_query(text):
+    # User text -> FTS5 query: every word must match, the last one as a prefix (still typing).
+    words = re.findall(r"\w+", text.casefold())
+    if not words:
+        return None
+    return " ".join(f'"{w}"' for w in words[:-1]) + f' "{words[-1]}"*'
+
+
+# Every search result ever shown, full-text indexed on title and channel, so a query can be
+# answered from what was already seen while the network request runs. SQLite without FTS5
+# leaves the index disabled rather than failing searches.
+class SeenIndex:
+    def __init__(self, path=SEEN_PATH, max_rows=50000):
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._adds = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            log.warning("local result index disabled: %s", e)
+            self._db = None
+
+    def add(self, entries):
+        if self._db is None:
+            return
+        now = time.time()
+        rows = [(e.id, e.title, e.uploader, json.dumps(dict(e.to_dict(), placeholder=None)), now)
+                for e in entries if e.id]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO entries(id, title, uploader, entry, seen) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET title=excluded.title, uploader=excluded.uploader, "
+                "entry=excluded.entry, seen=excluded.seen", rows)
+            self._adds += 1
+            if self._adds % 64 == 0:
+                self._trim()
+
+    def _trim(self):
+        excess = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_rows
+        if excess > 0:
+            self._db.execute("DELETE FROM entries WHERE rowid IN "
+                             "(SELECT rowid FROM entries ORDER BY seen LIMIT ?)", (excess,))
+
+    def search(self, text, limit=20, candidates=200):
+        query = match_query(text)
+        if self._db is None or query is None:
+            return []
+        # Title hits weigh more than channel hits; the best `candidates` by text are then
+        # re-ranked with recency. bm25 scores are negative, lower is better.
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT e.entry, e.seen, bm25(entries_fts, 4.0, 1.0) FROM entries_fts "
+                "JOIN entries e ON e.rowid = entries_fts.rowid WHERE entries_fts MATCH ? "
+                "ORDER BY bm25(entries_fts, 4.0, 1.0) LIMIT ?", (query, candidates)).fetchall()
+        now = time.time()
+        rows.sort(key=lambda r: r[2] / (1 + (now - r[1]) / 86400 / RECENCY_DAYS))
+        return [VideoEntry.from_dict(json.loads(r[0])) for r in rows[:limit]]
+
+    def __len__(self):
+        if self._db is None:
+            return 0
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
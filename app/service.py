@@ -0,0 +1,370 @@
+import asyncio
+import time
+from contextlib import contextmanager
+
+from app import backends, extract, formats as fmts, placeholders, player
+from app.cache import TTLCache
+from app.connections import POOL
+from app.models import canonical_url, video_id
+from app.ratelimit import GOVERNOR, YOUTUBE, host_of, throttle_delay
+from app.seen import SeenIndex
+from app.subscriptions import refresh_feed
+from app.thumbstore import ThumbStore
+
+# Search result thumbnails and storyboard sheets are served from here.
+THUMB_ORIGIN = "https://i.ytimg.com"
+# Launches retried on another format after mpv fails to open one.
+FALLBACK_ATTEMPTS = 2
+
+
+async def _as_completed(coros):
+    # asyncio.as_completed whose tasks go away with the consumer: a pass that is cancelled
+    # or abandoned cancels whatever has not finished instead of leaving it queued.
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        for done in asyncio.as_completed(tasks):
+            yield await done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# Single front door for everything that touches the network or spawns mpv.
+# Textual awaits these coroutines on its own loop and the Qt GUI runs them on an
+# AsyncBridge loop, so limits, timeouts, de-duplication and caching live here only.
+class MediaService:
+    def __init__(self, storage, backend, search_limit=2, format_limit=3, thumb_limit=6,
+                 search_timeout=30, format_timeout=45, thumb_timeout=20, retries=3, governor=GOVERNOR,
+                 connections=POOL):
+        self.storage, self.backend = storage, backend
+        self.governor, self.retries = governor, retries
+        self.connections, self.thumb_limit = connections, thumb_limit
+        self.limits = {
+            "search": asyncio.Semaphore(search_limit),
+            "formats": asyncio.Semaphore(format_limit),
+            "thumbs": asyncio.Semaphore(thumb_limit),
+            "badges": asyncio.Semaphore(2),
+            "previews": asyncio.Semaphore(1),
+        }
+        self.timeouts = {"search": search_timeout, "formats": format_timeout, "thumbs": thumb_timeout,
+                         "previews": thumb_timeout}
+        self.search_cache = TTLCache(ttl=600)
+        self.format_cache = TTLCache(ttl=3 * 3600)
+        self.summary_cache = TTLCache(ttl=7 * 86400, max_items=4096)
+        self.collection_cache = TTLCache(ttl=1800, max_items=16)
+        self._inflight = {}
+        self._interactive = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.thumbs = ThumbStore()
+        self.seen = SeenIndex()
+        self.players = player.PlayerSupervisor(storage.get_setting("max_players", 2),
+                                               storage.get_setting("player_policy", "replace"))
+        self.searchers = backends.from_settings(storage, self._extract, connections)
+        self.search_latency = backends.LatencyTracker(storage.get_setting("search_hedge_percentile", 90))
+
+    @contextmanager
+    def _activity(self, background):
+        # Background jobs wait on _idle, so any user-driven request pauses them.
+        if background:
+            yield
+            return
+        self._interactive += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._interactive -= 1
+            if not self._interactive:
+                self._idle.set()
+
+    async def _limited(self, kind, make, background=False, host=YOUTUBE, retries=None):
+        # 429/5xx answers pause the whole host and are retried here instead of surfacing.
+        retries = self.retries if retries is None else retries
+        async with self.limits[kind]:
+            for attempt in range(retries + 1):
+                await self.governor.acquire(host, background)
+                try:
+                    result = await asyncio.wait_for(make(), self.timeouts[kind])
+                except asyncio.TimeoutError:
+                    raise extract.ExtractionError(f"{kind} timed out after {self.timeouts[kind]}s") from None
+                except Exception as e:
+                    retry_after = throttle_delay(e)
+                    if retry_after is None or attempt == retries:
+                        raise
+                    self.governor.penalize(host, retry_after)
+                    continue
+                self.governor.success(host)
+                return result
+
+    async def _once(self, key, make, orphan_grace=None):
+        # Callers asking for the same thing share one request. With `orphan_grace`, a request
+        # whose callers were all cancelled is dropped unless someone asks again within that
+        # many seconds (a re-rendered page picks its downloads back up).
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make())
+            task.waiters = 0
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        task.waiters += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            task.waiters -= 1
+            if orphan_grace is not None and not task.waiters and not task.done():
+                asyncio.get_running_loop().call_later(orphan_grace, self._drop_orphan, task)
+
+    @staticmethod
+    def _drop_orphan(task):
+        if not task.waiters:
+            task.cancel()
+
+    def _extract(self, fn, *args):
+        return asyncio.wrap_future(self.backend.submit(fn, *args))
+
+    async def search(self, query, max_results=15, sort="RELEVANCE", background=False):
+        key = (query, max_results, sort)
+        hit = self.search_cache.get(key)
+        if hit is not None:
+            return hit
+
+        async def run():
+            calls = [(b.name, lambda b=b: self._limited("search", lambda: b.search(query, max_results, sort),
+                                                        background, host=b.host))
+                     for b in self.searchers]
+            entries = await backends.hedged(calls, self.search_latency, self.storage.get_setting("search_hedge", True))
+            self.attach_placeholders(entries)
+            self.search_cache.put(key, entries)
+            await asyncio.to_thread(self.seen.add, entries)
+            return entries
+        with self._activity(background):
+            return await self._once(("search",) + key, run)
+
+    async def seen_search(self, query, limit=20):
+        # Previously seen results matching `query`, answered locally before the network.
+        if not self.storage.get_setting("local_results", True):
+            return []
+        return self.attach_placeholders(await asyncio.to_thread(self.seen.search, query, limit))
+
+    async def formats(self, url, background=False):
+        url = canonical_url(url)
+        hit = self.format_cache.get(url)
+        if hit is not None:
+            return hit
+
+        async def run():
+            profile = self.storage.get_setting("extract_profile", extract.DEFAULT_PROFILE)
+            formats = await self._limited("formats", lambda: self._extract(extract.formats, url, profile), background)
+            self.format_cache.put(url, formats)
+            return formats
+        with self._activity(background):
+            # A background lookup nobody waits for any more (a cancelled badge pass) is dropped.
+            return await self._once(("formats", url), run, orphan_grace=0.5 if background else None)
+
+    async def expand(self, url, chunk=50):
+        # Streams a playlist or channel as chunks of flat entries while yt-dlp pages through
+        # it. Nothing is resolved per entry here; formats are fetched once one is opened.
+        hit = self.collection_cache.get(url)
+        if hit is not None:
+            yield hit
+            return
+        # Generators can't cross into the extraction processes, so this one is walked from
+        # a thread; each step is a single page parse.
+        entries = extract.iter_collection(url)
+        loaded = []
+        while True:
+            # No retries: a generator that raised is finished.
+            batch = await self._limited("search", lambda: asyncio.to_thread(extract.call, extract.take, entries, chunk),
+                                        retries=0)
+            if not batch:
+                break
+            self.attach_placeholders(batch)
+            await asyncio.to_thread(self.seen.add, batch)
+            loaded.extend(batch)
+            yield batch
+        self.collection_cache.put(url, loaded)
+
+    async def format_summary(self, url):
+        url = canonical_url(url)
+        hit = self.summary_cache.get(url)
+        if hit is None:
+            hit = fmts.summarize(await self.formats(url, background=True))
+            self.summary_cache.put(url, hit)
+        return hit
+
+    async def format_summaries(self, entries):
+        # Background pass for a result page: yields (entry, summary) as each one resolves.
+        async def one(entry):
+            async with self.limits["badges"]:
+                try:
+                    return entry, await self.format_summary(entry.url)
+                except Exception:
+                    return entry, None
+        async for done in _as_completed(one(e) for e in entries if e.url):
+            yield done
+
+    async def prewarm(self, queries, urls, max_results=15, interval=2.0):
+        # Low-priority warm-up after start: one request every `interval` seconds, and only
+        # while no interactive request is running.
+        jobs = [lambda q=q: self.search(q, max_results, background=True) for q in queries]
+        jobs += [lambda u=u: self.format_summary(u) for u in urls]
+        warmed = 0
+        for job in jobs:
+            await asyncio.sleep(interval)
+            await self._idle.wait()
+            try:
+                await job()
+                warmed += 1
+            except Exception:
+                continue
+        return warmed
+
+    async def preconnect(self, targets=None):
+        # DNS, TCP and TLS for the hosts the first thumbnails and API searches go to, done at
+        # start instead of on those requests. yt-dlp's connections are warmed by its backend.
+        if targets is None:
+            targets = [(THUMB_ORIGIN, self.thumb_limit)]
+            targets += [(b.base_url, 1) for b in self.searchers if isinstance(b, backends.ApiSearch)]
+        warmed = await asyncio.gather(*(asyncio.to_thread(self.connections.warm, url)
+                                        for url, n in targets for _ in range(n)))
+        return sum(warmed)
+
+    async def thumbnail(self, url, kind="thumbs", background=False):
+        # Images land in the on-disk thumbnail pack, storyboard sheets included.
+        data = self.thumbs.get(url)
+        if data is not None:
+            return data
+
+        async def run():
+            data = await self._limited(kind, lambda: asyncio.to_thread(self.connections.get, url), background,
+                                       host=host_of(url))
+            return await asyncio.to_thread(self.thumbs.put, url, data)
+        return await self._once(("thumb", url), run, orphan_grace=0.5)
+
+    async def storyboard(self, url):
+        # Scrub-preview spec for `url`. Formats are usually cached by the badge pass already;
+        # otherwise they are fetched as background work, behind anything the user asked for.
+        await self._idle.wait()
+        return fmts.storyboard(await self.formats(url, background=True))
+
+    async def storyboard_sheet(self, url):
+        if url not in self.thumbs:
+            await self._idle.wait()
+        return await self.thumbnail(url, "previews", background=True)
+
+    def attach_placeholders(self, entries):
+        # Previews derived from earlier thumbnail downloads, so a page paints them with its text.
+        entries = list(entries)
+        for e in entries:
+            if e.placeholder is None:
+                data = self.thumbs.get(placeholders.STORE_PREFIX + e.id)
+                if data is not None:
+                    e.placeholder = bytes(data).hex()
+        return entries
+
+    async def put_placeholder(self, entry, ph):
+        entry.placeholder = ph
+        if ph:
+            await asyncio.to_thread(self.thumbs.put, placeholders.STORE_PREFIX + entry.id, bytes.fromhex(ph))
+
+    async def placeholder(self, entry):
+        if entry.placeholder is None and entry.thumbnail:
+            data = await self.thumbnail(entry.thumbnail, background=True)
+            await self.put_placeholder(entry, await asyncio.to_thread(placeholders.from_bytes, data))
+        return entry.placeholder
+
+    async def previews(self, entries):
+        # Background pass for terminals: yields (entry, placeholder) as each thumbnail is fetched.
+        async def one(entry):
+            try:
+                return entry, await self.placeholder(entry)
+            except Exception:
+                return entry, None
+        async for done in _as_completed(one(e) for e in entries if e.placeholder is None and e.thumbnail):
+            yield done
+
+    async def refresh_feed(self, index):
+        return await self._once(("feed",), lambda: asyncio.to_thread(refresh_feed, self.storage, index,
+                                                                     governor=self.governor))
+
+    async def launch(self, url, fmt, lang=None, wait_upgrade=False):
+        # Returns once mpv shows its first frame. With fast start the switch to `fmt` carries
+        # on in playback.upgrade; callers about to exit pass wait_upgrade to see it through.
+        # A format mpv can't open is remembered for the video and replaced by the next best
+        # one from the cached list, without extracting again.
+        mpv_path = player.resolve_mpv(self.storage.data.get("mpv_path", "mpv"))
+        vid = video_id(url)
+        formats = self.format_cache.get(canonical_url(url)) or []
+        failed = self.storage.failed_formats(vid)
+        if fmt in failed:
+            fmt = fmts.fallback_format(formats, fmt, failed) or fmt
+        start = None
+        if self.storage.get_setting("fast_start", False):
+            start = fmts.fast_start_format(formats, fmt)
+            start = None if start in failed else start
+        self.storage.mark_watched(vid)
+        tried = []
+        for _ in range(FALLBACK_ATTEMPTS + 1):
+            playback, ipc = await self._start(mpv_path, url, fmt, start, lang)
+            playback.fallbacks = list(tried)
+            if not playback.error:
+                break
+            bad = start or fmt
+            player.log.info("mpv could not play %s as %s: %s", url, bad, playback.error)
+            self.storage.record_failed_format(vid, bad)
+            failed.add(bad)
+            tried.append((bad, playback.error))
+            if playback.proc.poll() is None:
+                await self.players.stop(playback)
+            # A failed fast start is retried straight on the chosen format.
+            if start:
+                start = None
+            elif (fmt := fmts.fallback_format(formats, fmt, failed)) is None:
+                break
+        if ipc is None:
+            return playback
+        self.storage.record_first_frame(playback.strategy, playback.first_frame)
+        player.log.info("first frame after %.2fs (%s, %s)", playback.first_frame, playback.strategy, start or fmt)
+        if not start:
+            ipc.close()
+            return playback
+        playback.upgrade = asyncio.ensure_future(asyncio.to_thread(player.upgrade, ipc, url, fmt))
+        if wait_upgrade:
+            await playback.upgrade
+        return playback
+
+    async def _start(self, mpv_path, url, fmt, start, lang):
+        # One mpv launch up to its first frame. The IPC connection comes back open only once
+        # that frame is up; playback.error is set when mpv gave up on the stream before it.
+        ipc_path = player.ipc_path()
+        async with self.players.lock:
+            await self.players.make_room()
+            spawned = time.monotonic()
+            proc = await asyncio.to_thread(player.spawn, player.mpv_command(mpv_path, url, start or fmt, lang, ipc_path))
+            playback = player.Playback(proc, "fast start" if start else "direct", url, fmt, spawned)
+            self.players.track(playback)
+        try:
+            ipc = await asyncio.to_thread(player.MpvIPC, ipc_path, proc)
+        except OSError as e:
+            playback.error = await asyncio.to_thread(player.exit_error, proc)
+            if not playback.error:
+                player.log.info("no IPC connection to mpv, not measuring start-up: %s", e)
+            return playback, None
+        try:
+            playback.first_frame = await asyncio.to_thread(player.wait_first_frame, ipc, spawned)
+            return playback, ipc
+        except player.PlaybackError as e:
+            playback.error = str(e)
+        except EOFError as e:
+            playback.error = await asyncio.to_thread(player.exit_error, proc)
+            if not playback.error:
+                player.log.info("mpv closed before its first frame: %s", e)
+        except (OSError, TimeoutError) as e:
+            player.log.info("mpv never reached its first frame: %s", e)
+        ipc.close()
+        return playback, None
+
+    def start_report(self, playback):
+        other = "direct" if playback.strategy == "fast start" else "fast start"
+        return playback.describe(other, self.storage.first_frame_median(other))
@@ -1,54 +1,194 @@
 import json
 import os
+import statistics
+import tempfile
+import threading
+import time
 
 class StorageManager:
+    # The UI thread, the service's event loop and the feed refresh threads all change
+    # `data`; every change and every save holds this lock. Re-entrant, since the mutators
+    # save while holding it.
+    lock = threading.RLock()
+
     def __init__(self):
         self.config_path = os.path.join(os.path.expanduser("~"), ".config", "mpvTube", "config.json")
         os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
         self.data = self._load()
 
     def _load(self):
+        data = self._defaults()
         if os.path.exists(self.config_path):
             try:
                 with open(self.config_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
+                    loaded = json.load(f)
+                # Key by key, so settings added since the file was written keep their defaults.
+                data["settings"].update(loaded.pop("settings", None) or {})
+                data.update(loaded)
             except Exception:
                 pass
+        return data
+
+    def _defaults(self):
         return {
             "mpv_path": "mpv",
             "history": [],
             "favorites": [],
+            "subscriptions": [],
+            "search_counts": {},
+            "watched": [],
+            "first_frames": {},
+            "failed_formats": {},
             "settings": {
                 "theme": "DEFAULT",
-                "max_results": 15
+                "max_results": 15,
+                "gui_backend": "process",
+                "tui_backend": "process",
+                "quality_badges": True,
+                "prewarm": True,
+                "preconnect": True,
+                "watchdog": True,
+                "stall_threshold_ms": 250,
+                "extract_profile": "fast-playback",
+                "tui_previews": True,
+                "fast_start": False,
+                "search_backends": ["yt-dlp"],
+                "search_api_url": "",
+                "search_hedge": True,
+                "local_results": True,
+                "max_players": 2,
+                "player_policy": "replace",
             },
         }
 
     def save(self):
-        with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, indent=2)
+        # Serialised under the lock, then written to a temp file that replaces config.json
+        # in one step, so a crash never leaves half a file behind.
+        with self.lock:
+            text = json.dumps(self.data, indent=2)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.config_path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp, self.config_path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
 
     def set_theme(self, theme_name):
-        self.data["settings"]["theme"] = theme_name
-        self.save()
+        with self.lock:
+            self.data["settings"]["theme"] = theme_name
+            self.save()
+
+    def set_mpv_path(self, mpv_path):
+        with self.lock:
+            self.data["mpv_path"] = mpv_path
+            self.save()
 
     def add_to_history(self, query):
-        if query in self.data["history"]:
-            self.data["history"].remove(query)
-        self.data["history"].insert(0, query)
-        self.data["history"] = self.data["history"][:25]
-        self.save()
+        with self.lock:
+            if query in self.data["history"]:
+                self.data["history"].remove(query)
+            self.data["history"].insert(0, query)
+            self.data["history"] = self.data["history"][:25]
+            counts = self.data["search_counts"]
+            counts[query] = counts.get(query, 0) + 1
+            self.data["search_counts"] = {q: counts[q] for q in self.data["history"] if q in counts}
+            self.save()
+
+    def prewarm_targets(self, n_queries=5, n_bookmarks=5):
+        # Rank recent searches by how often they are repeated, recency breaking ties.
+        with self.lock:
+            history, counts = list(self.data["history"]), dict(self.data["search_counts"])
+            bookmarks = [f["url"] for f in self.data["favorites"][:n_bookmarks]]
+        ranked = sorted(range(len(history)), key=lambda i: (counts.get(history[i], 1) + (len(history) - i) / len(history)),
+                        reverse=True)
+        queries = [history[i] for i in ranked[:n_queries]]
+        return queries, bookmarks
 
     def add_favorite(self, title, url, thumb):
-        if any(f["url"] == url for f in self.data["favorites"]):
-            return
-        self.data["favorites"].insert(0, {"title": title, "url": url, "thumb": thumb})
-        self.data["favorites"] = self.data["favorites"][:50]
-        self.save()
+        with self.lock:
+            if any(f["url"] == url for f in self.data["favorites"]):
+                return
+            self.data["favorites"].insert(0, {"title": title, "url": url, "thumb": thumb})
+            self.data["favorites"] = self.data["favorites"][:50]
+            self.save()
 
     def remove_favorite(self, url):
-        self.data["favorites"] = [f for f in self.data["favorites"] if f["url"] != url]
-        self.save()
+        with self.lock:
+            self.data["favorites"] = [f for f in self.data["favorites"] if f["url"] != url]
+            self.save()
+
+    def add_subscription(self, channel_id, title):
+        with self.lock:
+            if any(s["id"] == channel_id for s in self.data["subscriptions"]):
+                return False
+            self.data["subscriptions"].append({"id": channel_id, "title": title, "last_seen": None})
+            self.save()
+            return True
+
+    def remove_subscription(self, channel_id):
+        with self.lock:
+            self.data["subscriptions"] = [s for s in self.data["subscriptions"] if s["id"] != channel_id]
+            self.save()
+
+    def subscriptions(self):
+        # A copy: feed refresh threads work on it while the UI may (un)subscribe.
+        with self.lock:
+            return [dict(s) for s in self.data["subscriptions"]]
+
+    def set_last_seen(self, seen):
+        # channel id -> newest video id, after a feed refresh.
+        with self.lock:
+            for sub in self.data["subscriptions"]:
+                if sub["id"] in seen:
+                    sub["last_seen"] = seen[sub["id"]]
+            self.save()
+
+    def is_subscribed(self, channel_id):
+        with self.lock:
+            return any(s["id"] == channel_id for s in self.data["subscriptions"])
+
+    def mark_watched(self, vid):
+        with self.lock:
+            if not vid or vid in self.data["watched"][:50]:
+                return
+            self.data["watched"] = [vid] + [w for w in self.data["watched"] if w != vid][:1999]
+            self.save()
+
+    def watched_ids(self):
+        with self.lock:
+            return set(self.data["watched"])
+
+    def record_first_frame(self, strategy, seconds):
+        # Recent time-to-first-frame per launch strategy, so the two can be compared.
+        with self.lock:
+            times = self.data.setdefault("first_frames", {}).setdefault(strategy, [])
+            times[:] = [round(seconds, 3)] + times[:19]
+            self.save()
+
+    def first_frame_median(self, strategy):
+        with self.lock:
+            times = list(self.data.get("first_frames", {}).get(strategy) or [])
+        return statistics.median(times) if times else None
+
+    def record_failed_format(self, vid, fmt):
+        # Format specs mpv could not open for a video, most recently failed videos last.
+        with self.lock:
+            failed = self.data.setdefault("failed_formats", {})
+            specs = failed.pop(vid, {})
+            specs[fmt] = time.time()
+            failed[vid] = specs
+            while len(failed) > 500:
+                failed.pop(next(iter(failed)))
+            self.save()
+
+    def failed_formats(self, vid, ttl=7 * 86400):
+        # Geo-blocks and codec support change, so a failure is only trusted for a week.
+        now = time.time()
+        with self.lock:
+            specs = dict(self.data.get("failed_formats", {}).get(vid, {}))
+        return {fmt for fmt, at in specs.items() if now - at < ttl}
 
     def get_setting(self, k, d=None):
         return self.data["settings"].get(k, d)
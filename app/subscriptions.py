@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from yt_dlp import YoutubeDL
+
+from app.models import VideoEntry
+from app.player import YTDL_CACHE_DIR
+from app.ratelimit import GOVERNOR, YOUTUBE, YOUTUBE_FEEDS, throttle_delay
+
+FEED_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mpvTube", "feed.json")
+CHANNEL_URL = "https://www.youtube.com/channel/{}/videos"
+PER_CHANNEL = 30
+FEED_SIZE = 500
+
+# Flat, lazily paged extraction: we stop iterating as soon as the last seen
+# video shows up, so an up-to-date channel costs a single page request.
+FLAT_OPTS = {
+    "extract_flat": True,
+    "lazy_playlist": True,
+    "skip_download": True,
+    "quiet": True,
+    "cachedir": YTDL_CACHE_DIR,
+    "playlistend": PER_CHANNEL,
+    "extractor_args": {"youtubetab": {"approximate_date": [""]}},
+}
+
+_local = threading.local()
+
+
+def _ydl():
+    # One YoutubeDL per pool thread; building it is not free.
+    if not hasattr(_local, "ydl"):
+        _local.ydl = YoutubeDL(FLAT_OPTS)
+    return _local.ydl
+
+
+def fetch_new_entries(channel_id, last_seen=None):
+    info = _ydl().extract_info(CHANNEL_URL.format(channel_id), download=False, process=False)
+    fresh = []
+    for idx, e in enumerate(info.get("entries") or []):
+        if not e or idx >= PER_CHANNEL:
+            break
+        if e.get("id") == last_seen:
+            break
+        fresh.append(VideoEntry.from_info(
+            e,
+            uploader=e.get("channel") or e.get("uploader") or info.get("channel") or info.get("title") or "Unknown channel",
+            channel_id=channel_id,
+            # No made-up date for entries without one: "now" would put them above every
+            # dated upload on each refresh. rebuild() sorts them last, in channel order.
+            timestamp=e.get("timestamp"),
+        ))
+    return fresh
+
+
+class FeedIndex:
+    def __init__(self, path=FEED_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.channels, self.feed = self._load()
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                channels = {cid: [VideoEntry.from_dict(d) for d in entries]
+                            for cid, entries in data.get("channels", {}).items()}
+                by_id = {e.id: e for entries in channels.values() for e in entries}
+                return channels, [by_id[vid] for vid in data.get("feed", []) if vid in by_id]
+            except Exception:
+                pass
+        return {}, []
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "channels": {cid: [e.to_dict() for e in entries] for cid, entries in self.channels.items()},
+                "feed": [e.id for e in self.feed],
+            }, f)
+        os.replace(tmp, self.path)
+
+    def merge(self, channel_id, entries):
+        known = self.channels.get(channel_id, [])
+        seen = {e.id for e in entries}
+        self.channels[channel_id] = (entries + [e for e in known if e.id not in seen])[:PER_CHANNEL]
+
+    def drop(self, channel_ids):
+        for cid in list(self.channels):
+            if cid not in channel_ids:
+                del self.channels[cid]
+
+    def rebuild(self):
+        merged = [e for entries in self.channels.values() for e in entries]
+        # Stable, so entries with equal (or no) timestamps keep their channel order.
+        merged.sort(key=lambda e: e.timestamp or 0, reverse=True)
+        self.feed = merged[:FEED_SIZE]
+        return self.feed
+
+    def channel_feed(self, channel_id):
+        return list(self.channels.get(channel_id, []))
+
+
+def refresh_feed(storage, index=None, max_workers=16, governor=GOVERNOR):
+    index = index or FeedIndex()
+    subs = storage.subscriptions()
+    index.drop({s["id"] for s in subs})
+    errors = []
+    seen = {}
+
+    def job(sub):
+        # A feed refresh draws on its own budget, so it neither waits behind searches nor
+        # eats their tokens. Throttling pauses all of YouTube, and the channel is retried once.
+        for attempt in range(2):
+            governor.wait(YOUTUBE_FEEDS, background=True)
+            try:
+                fresh = fetch_new_entries(sub["id"], sub.get("last_seen"))
+            except Exception as e:
+                retry_after = throttle_delay(e)
+                if retry_after is None or attempt:
+                    return sub, [], e
+                governor.penalize(YOUTUBE_FEEDS, retry_after)
+                governor.penalize(YOUTUBE, retry_after)
+                continue
+            governor.success(YOUTUBE_FEEDS)
+            return sub, fresh, None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(subs) or 1))) as pool:
+        for sub, fresh, err in pool.map(job, subs):
+            if err:
+                errors.append(f"{sub.get('title') or sub['id']}: {err}")
+                continue
+            if fresh:
+                index.merge(sub["id"], fresh)
+                seen[sub["id"]] = fresh[0].id
+
+    feed = index.rebuild()
+    index.save()
+    storage.set_last_seen(seen)
+    return feed, errors
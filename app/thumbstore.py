@@ -0,0 +1,156 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mpvTube")
+LEGACY_DIR = os.path.join(CACHE_DIR, "thumbs")
+
+# Index records: 8-byte url key, pack offset, length. A length of 0 is a tombstone.
+RECORD = struct.Struct("<QQI")
+
+
+def url_key(url):
+    # First 8 bytes of md5(url): the legacy file names are the full md5 hex, so they migrate 1:1.
+    return int.from_bytes(hashlib.md5(url.encode()).digest()[:8], "big")
+
+
+# Append-only pack of thumbnail bytes with a compact hash index, read through mmap so
+# callers get a memoryview onto the page cache instead of a per-file open + read.
+class ThumbStore:
+    COMPACT_EVERY = 256
+
+    def __init__(self, root=CACHE_DIR, max_bytes=192 * 1024 * 1024, compact_ratio=0.4):
+        os.makedirs(root, exist_ok=True)
+        self.pack_path = os.path.join(root, "thumbs.pack")
+        self.idx_path = os.path.join(root, "thumbs.idx")
+        self.max_bytes, self.compact_ratio = max_bytes, compact_ratio
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # key -> (offset, length), oldest first
+        self.live_bytes = 0
+        self._map = None
+        self._puts = 0
+        self._load()
+        self._pack = open(self.pack_path, "ab")
+        self._idx = open(self.idx_path, "ab")
+        if os.path.isdir(LEGACY_DIR):
+            self.migrate(LEGACY_DIR)
+        self.maybe_compact()
+
+    def _load(self):
+        if not os.path.exists(self.pack_path) or not os.path.exists(self.idx_path):
+            open(self.pack_path, "wb").close()
+            open(self.idx_path, "wb").close()
+            return
+        pack_size = os.path.getsize(self.pack_path)
+        with open(self.idx_path, "rb") as f:
+            raw = f.read()
+        usable = len(raw) - len(raw) % RECORD.size  # ignore a torn trailing record
+        for key, offset, length in RECORD.iter_unpack(raw[:usable]):
+            self._drop(key)
+            if length and offset + length <= pack_size:
+                self._entries[key] = (offset, length)
+                self.live_bytes += length
+
+    def _drop(self, key):
+        old = self._entries.pop(key, None)
+        if old:
+            self.live_bytes -= old[1]
+
+    def _view(self, offset, length):
+        if self._map is None or offset + length > len(self._map):
+            # The pack only grows between compactions; remap to cover the new tail. Views
+            # handed out earlier keep the previous mapping alive until they are released.
+            with open(self.pack_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._map)[offset:offset + length]
+
+    def get(self, url):
+        with self._lock:
+            hit = self._entries.get(url_key(url))
+            if hit is None:
+                return None
+            return self._view(*hit)
+
+    def __contains__(self, url):
+        return url_key(url) in self._entries
+
+    def put(self, url, data):
+        with self._lock:
+            self._append(url_key(url), data)
+            self._evict()
+            self._puts += 1
+            if self._puts % self.COMPACT_EVERY == 0:
+                self.maybe_compact()
+            return self.get(url)
+
+    def _append(self, key, data):
+        self._pack.seek(0, os.SEEK_END)
+        offset = self._pack.tell()
+        self._pack.write(data)
+        self._pack.flush()
+        self._drop(key)
+        self._entries[key] = (offset, len(data))
+        self.live_bytes += len(data)
+        self._idx.write(RECORD.pack(key, offset, len(data)))
+
+    def _evict(self):
+        while self.live_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._drop(key)
+            self._idx.write(RECORD.pack(key, 0, 0))
+        self._idx.flush()
+
+    def maybe_compact(self):
+        with self._lock:
+            size = os.path.getsize(self.pack_path)
+            dead = size - self.live_bytes
+            if size and dead > 4 * 1024 * 1024 and dead / size > self.compact_ratio:
+                self.compact()
+
+    def compact(self):
+        with self._lock:
+            tmp_pack, tmp_idx = self.pack_path + ".tmp", self.idx_path + ".tmp"
+            entries = OrderedDict()
+            with open(tmp_pack, "wb") as pack, open(tmp_idx, "wb") as idx:
+                for key, (offset, length) in self._entries.items():
+                    entries[key] = (pack.tell(), length)
+                    pack.write(self._view(offset, length))
+                    idx.write(RECORD.pack(key, *entries[key]))
+            self._pack.close()
+            self._idx.close()
+            try:
+                os.replace(tmp_pack, self.pack_path)
+                os.replace(tmp_idx, self.idx_path)
+                self._entries, self._map = entries, None
+            except OSError:
+                # e.g. Windows refuses to replace a file that is still mapped; retry next start.
+                for p in (tmp_pack, tmp_idx):
+                    if os.path.exists(p):
+                        os.remove(p)
+            self._pack = open(self.pack_path, "ab")
+            self._idx = open(self.idx_path, "ab")
+
+    def migrate(self, legacy_dir):
+        with self._lock:
+            for name in os.listdir(legacy_dir):
+                path = os.path.join(legacy_dir, name)
+                stem, ext = os.path.splitext(name)
+                if ext != ".jpg" or len(stem) != 32:
+                    continue
+                try:
+                    key = int(stem[:16], 16)
+                    if key not in self._entries:
+                        with open(path, "rb") as f:
+                            self._append(key, f.read())
+                    os.remove(path)
+                except (OSError, ValueError):
+                    continue
+            self._idx.flush()
+            self._evict()
+            try:
+                os.rmdir(legacy_dir)
+            except OSError:
+                pass
@@ -1,31 +1,64 @@
-import locale
-import subprocess
-from typing import Dict, Any
+import asyncio
 
-from yt_dlp import YoutubeDL
+from rich.markup import escape
 from textual.app import App, ComposeResult
 from textual.widgets import Header, Footer, Input, ListItem, ListView, Static, Label
 from textual.containers import Container, Vertical, Horizontal
-from textual.screen import ModalScreen
+from textual.screen import ModalScreen, Screen
 from textual.binding import Binding
 
+from app import formats as fmts, placeholders, player
+from app.models import VideoEntry, EntryIndex, collection_url
+from app.results import DURATION_RANGES, SORTS, Filters, ResultSet, merge
+from app.service import MediaService
 from app.storage import StorageManager
-
-def _lang_code():
-    loc = locale.getlocale()[0] or "en_US"
-    return loc.split("_")[0].lower()
-
-class ResultItem(ListItem):
-    def __init__(self, entry: Dict[str, Any]):
-        super().__init__()
+from app.subscriptions import FeedIndex
+from app.virtual_list import VirtualList
+from app.watchdog import StallWatchdog
+from app.workers import ThreadBackend, get_backend
+
+class AppFooter(Footer):
+    # Footer recomposes its keys on every focus change, and Textual only prunes the
+    # keys' data_bind watchers when `compact` changes, so every old key stayed alive.
+    async def recompose(self) -> None:
+        await super().recompose()
+        for watchers in getattr(self, "__watchers", {}).values():
+            watchers[:] = [(node, callback) for node, callback in watchers if node.is_attached]
+
+# Rows for VirtualList: plain data rendered line by line, and only while on screen.
+class ResultItem:
+    height = 3
+
+    def __init__(self, entry: VideoEntry, previews=False):
         self.entry = entry
-
-    def compose(self) -> ComposeResult:
-        title = self.entry.get("title", "Untitled")
-        uploader = self.entry.get("uploader", "Unknown channel")
-        duration = self.entry.get("duration_string", "??:??")
-        yield Label(f"[b]{title}[/b]")
-        yield Label(f"[dim]{uploader} • {duration}[/dim]")
+        self.summary = None
+        self.previews = previews
+
+    def line(self, i):
+        lead = self._preview(i) if self.previews else " "
+        if i == 0:
+            return f"{lead}[b]{escape(self.entry.title)}[/b]"
+        if i == 1:
+            return lead + self._meta()
+        return lead
+
+    def _preview(self, i):
+        # One placeholder grid row per line, two cells wide per colour.
+        w = placeholders.GRID[0]
+        if not self.entry.placeholder:
+            return " " * (2 * w + 2)
+        cells = placeholders.colours(self.entry.placeholder)[i * w:(i + 1) * w]
+        return " " + "".join(f"[on {c}]  [/]" for c in cells) + " "
+
+    def _meta(self):
+        meta = f"[dim]{escape(self.entry.uploader)} • {self.entry.duration_string}[/dim]"
+        text = fmts.badge(self.summary)
+        if text:
+            meta += f"  [reverse] {text} [/reverse] [dim]{fmts.badge_details(self.summary)}[/dim]"
+        return meta
+
+    def set_badge(self, summary):
+        self.summary = summary
 
 class FormatItem(ListItem):
     def __init__(self, label: str, format_id: str):
@@ -37,13 +70,14 @@ class FormatItem(ListItem):
         yield Label(self.label)
 
 
-class HistoryItem(ListItem):
+class HistoryItem:
+    height = 1
+
     def __init__(self, query: str):
-        super().__init__()
         self.query = query
 
-    def compose(self) -> ComposeResult:
-        yield Label(self.query)
+    def line(self, i):
+        return f" {escape(self.query)}"
 
 class FormatSelectionModal(ModalScreen):
     BINDINGS = [
@@ -77,39 +111,29 @@ class FormatSelectionModal(ModalScreen):
         )
 
     async def on_mount(self) -> None:
-        self.run_worker(self.fetch_formats(), thread=True)
+        self.run_worker(self.fetch_formats(), exclusive=True)
 
     async def fetch_formats(self):
         try:
-            with YoutubeDL({"skip_download": True, "quiet": True}) as ydl:
-                info = ydl.extract_info(self.url, download=False)
-                self.formats = info.get("formats", [])
-            
-            seen_v, seen_a = set(), set()
-            for f in sorted([x for x in self.formats if x.get("height") and x.get("vcodec") != "none"], key=lambda x: x.get("height", 0), reverse=True):
-                label = f"{f.get('height')}p • {f.get('ext')}"
-                if label not in seen_v:
-                    seen_v.add(label)
-                    self.videos.append((label, f.get("format_id")))
-            
-            for f in sorted([x for x in self.formats if x.get("abr") and x.get("vcodec") == "none"], key=lambda x: x.get("abr", 0), reverse=True):
-                label = f"{int(f.get('abr', 0))} kbps"
-                if label not in seen_a:
-                    seen_a.add(label)
-                    self.audios.append((label, f.get("format_id")))
-
-            self.call_from_thread(self.update_lists)
+            self.formats = await self.app.service.formats(self.url)
         except Exception as e:
-            self.app.notify(f"Error fetching formats: {e}", severity="error")
-            self.dismiss(None)
+            if self in self.app.screen_stack:
+                self.app.notify(f"Error fetching formats: {e}", severity="error")
+                self.dismiss(None)
+            return
+        # Escape while a throttled lookup was pending: the modal is off the stack, and its
+        # lists may already be removed before its workers are cancelled.
+        if self not in self.app.screen_stack:
+            return
+        self.videos, self.audios = fmts.quality_options(self.formats)
+        self.update_lists()
 
     def update_lists(self):
         v_list = self.query_one("#video-list", ListView)
         a_list = self.query_one("#audio-list", ListView)
-        for label, fid in self.videos:
-            v_list.append(FormatItem(label, fid))
-        for label, fid in self.audios:
-            a_list.append(FormatItem(label, fid))
+        # One mount per list rather than one layout pass per format.
+        v_list.extend(FormatItem(label, fid) for label, fid in self.videos)
+        a_list.extend(FormatItem(label, fid) for label, fid in self.audios)
         if self.videos:
             v_list.index = 0
             v_list.focus()
@@ -132,6 +156,47 @@ class FormatSelectionModal(ModalScreen):
             return
         self.dismiss(fmt)
 
+class FeedScreen(Screen):
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back"),
+        Binding("r", "refresh_feed", "Refresh"),
+    ]
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield Static("", id="feed-status")
+        yield VirtualList(id="feed-list")
+        yield AppFooter()
+
+    def on_mount(self) -> None:
+        # The local index paints immediately; the network refresh follows.
+        self.show_entries(self.app.feed_index.feed)
+        self.action_refresh_feed()
+
+    def show_entries(self, entries):
+        feed_list = self.query_one("#feed-list", VirtualList)
+        feed_list.set_rows(self.app.result_rows(entries))
+        subs = len(self.app.storage.data["subscriptions"])
+        self.query_one("#feed-status", Static).update(f"{len(entries)} video(s) from {subs} channel(s)")
+        if entries:
+            feed_list.focus()
+
+    def action_refresh_feed(self):
+        if not self.app.storage.data["subscriptions"]:
+            self.query_one("#feed-status", Static).update("No subscriptions yet • press [b]a[/b] on a result to subscribe")
+            return
+        self.query_one("#feed-status", Static).update("Refreshing subscriptions...")
+        self.run_worker(self._refresh_worker(), exclusive=True)
+
+    async def _refresh_worker(self):
+        try:
+            feed, errors = await self.app.service.refresh_feed(self.app.feed_index)
+            self.show_entries(feed)
+            if errors:
+                self.app.notify(f"{len(errors)} channel(s) failed to refresh", severity="warning")
+        except Exception as e:
+            self.app.notify(f"Feed refresh failed: {e}", severity="error")
+
 class MpvTubeApp(App):
     CSS = """
     Screen {
@@ -145,12 +210,12 @@ class MpvTubeApp(App):
         border: round $accent;
         margin: 1 2;
     }
-    ResultItem {
-        padding: 1 1;
-        height: auto;
+    #feed-status {
+        padding: 0 2;
     }
-    ResultItem Label {
-        width: 100%;
+    #feed-list {
+        border: round $accent;
+        margin: 1 2;
     }
     #modal-dialog {
         background: $surface;
@@ -172,7 +237,7 @@ class MpvTubeApp(App):
         text-align: center;
         width: 100%;
     }
-    ListView {
+    ListView, VirtualList {
         background: $surface;
         border: solid $primary;
         height: 1fr;
@@ -185,13 +250,59 @@ class MpvTubeApp(App):
         Binding("/", "focus_search", "Search", show=True),
         Binding("h", "show_history", "History", show=True),
         Binding("b", "show_bookmarks", "Bookmarks", show=True),
+        Binding("s", "show_feed", "Subscriptions", show=True),
+        Binding("a", "subscribe", "Subscribe", show=True),
+        Binding("o", "cycle_sort", "Sort", show=True),
+        Binding("l", "cycle_length", "Length", show=True),
+        Binding("c", "filter_channel", "Channel", show=True),
+        Binding("w", "toggle_watched", "Hide watched", show=True),
+        Binding("x", "toggle_shorts", "Hide shorts", show=True),
+        Binding("p", "show_players", "Players", show=True),
     ]
 
-    def __init__(self):
+    def __init__(self, query="", server=None):
         super().__init__()
+        self.initial_query = query
+        self.server = server
         self.storage = StorageManager()
-        self.lang = _lang_code()
-        self.results = []
+        self.lang = player.lang_code()
+        self.results = EntryIndex()
+        self.result_set = ResultSet()
+        self.sort = "RELEVANCE"
+        self.filters = Filters()
+        self.last_query = None
+        self.feed_index = FeedIndex()
+        self.service = MediaService(self.storage, get_backend(self.storage.get_setting("tui_backend", "process"),
+                                                              self.storage.get_setting("preconnect", True)))
+        self.previews = self.storage.get_setting("tui_previews", True) and placeholders.available()
+
+    def on_mount(self) -> None:
+        if self.storage.get_setting("watchdog", True):
+            self.watchdog = StallWatchdog("tui", self.storage.get_setting("stall_threshold_ms", 250) / 1000).start()
+            self.set_interval(self.watchdog.interval, self.watchdog.beat)
+        if self.storage.get_setting("preconnect", True):
+            self.run_worker(self.service.preconnect(), group="preconnect")
+        if self.storage.get_setting("prewarm", True):
+            self.set_timer(2, self._start_prewarm)
+        if self.initial_query:
+            self.run_worker(self.open_query(self.initial_query))
+        if self.server is not None:
+            # Launches forwarded while we were starting have been queued until now.
+            self.server.serve(lambda msg: self.call_from_thread(self.open_query, msg.get("query", "")))
+
+    async def open_query(self, query):
+        # From the command line, or handed over by a later launch (see app.instance).
+        if not query:
+            self.bell()
+            self.notify("MpvTube is already running here", title="MpvTube")
+            return
+        self.storage.add_to_history(query)
+        self.query_one("#search-input", Input).value = query
+        await self.perform_search(query)
+
+    def _start_prewarm(self):
+        queries, urls = self.storage.prewarm_targets()
+        self.run_worker(self.service.prewarm(queries, urls, self.storage.get_setting("max_results", 15)), group="prewarm")
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -199,8 +310,11 @@ class MpvTubeApp(App):
             Input(placeholder="Search YouTube...", id="search-input"),
             id="search-container"
         )
-        yield ListView(id="results-list")
-        yield Footer()
+        yield VirtualList(id="results-list")
+        yield AppFooter()
+
+    def result_rows(self, entries):
+        return [ResultItem(e, self.previews) for e in self.service.attach_placeholders(entries)]
 
     def action_focus_search(self):
         self.query_one("#search-input").focus()
@@ -213,108 +327,218 @@ class MpvTubeApp(App):
 
     async def perform_search(self, query: str):
         self.query_one("#results-list").clear()
+        url = collection_url(query)
+        if url:
+            self.notify("Loading playlist...")
+            self.last_query = None
+            self.run_worker(self.stream_collection(url), group="search", exclusive=True)
+            return
         self.notify(f"Searching for: {query}")
-        self.run_worker(self.fetch_results(query), thread=True)
+        self.last_query = query
+        self.run_worker(self.fetch_results(query, self.sort), group="search", exclusive=True)
+
+    async def stream_collection(self, url: str):
+        # Rows are appended as each chunk arrives; the sorted/filtered view is rebuilt once at the end.
+        self.results = EntryIndex()
+        self.result_set = ResultSet(collection=url)
+        results_list = self.query_one("#results-list", VirtualList)
+        watched = self.storage.watched_ids() if self.filters.hide_watched else ()
+        try:
+            async for batch in self.service.expand(url):
+                self.results.extend(batch)
+                self.result_set.extend(batch)
+                results_list.extend(self.result_rows(e for e in batch if self.filters.accepts(e, watched)))
+                self.sub_title = f"{len(self.result_set)} videos loaded..."
+        except Exception as e:
+            self.notify(f"Loading playlist failed: {e}", severity="error")
+        if not self.result_set:
+            self.notify("No videos found", severity="warning")
+        elif self.filters or self.sort != self.result_set.sort:
+            self.render_results()
+        else:
+            self.sub_title = f"{len(self.result_set)} videos"
+            results_list.focus()
 
-    async def fetch_results(self, query: str):
+    async def fetch_results(self, query: str, sort: str = "RELEVANCE"):
+        # Previously seen matches show while the search runs; the remote page then takes
+        # over, followed by whichever seen matches it did not return.
+        seen = await self.service.seen_search(query)
+        if seen:
+            self.update_results(seen)
+            self.sub_title = f"{len(seen)} seen before • searching..."
         try:
-            with YoutubeDL({"extract_flat": True, "skip_download": True, "quiet": True}) as ydl:
-                info = ydl.extract_info(f"ytsearch15:{query}", download=False)
-            entries = info.get("entries", [])[:15]
-            self.call_from_thread(self.update_results, entries)
+            entries = await self.service.search(query, self.storage.get_setting("max_results", 15), sort)
+            self.update_results(merge(entries, seen), sort)
         except Exception as e:
             self.app.notify(f"Search failed: {e}", severity="error")
 
-    def update_results(self, entries):
-        results_list = self.query_one("#results-list", ListView)
-        results_list.clear()
-        self.results = entries
-        for entry in entries:
-            results_list.append(ResultItem(entry))
+    def update_results(self, entries, sort="RELEVANCE"):
+        self.results = EntryIndex(entries)
+        self.result_set = ResultSet(entries, sort)
+        self.render_results()
+
+    def render_results(self):
+        # Sorting and filtering re-render the loaded page; nothing here waits on the network.
+        sort = self.sort if self.result_set.supports(self.sort) else self.result_set.sort
+        watched = self.storage.watched_ids() if self.filters.hide_watched else ()
+        entries = self.result_set.view(sort, self.filters, watched)
+        self.sub_title = " • ".join(filter(None, [f"sorted by {sort.lower()}", self.filters.describe()]))
+        results_list = self.query_one("#results-list", VirtualList)
+        rows = {row.entry.id: row for row in self.result_rows(entries)}
+        results_list.set_rows(rows.values())
         if entries:
             results_list.focus()
+            if self.storage.get_setting("quality_badges", True) and not self.result_set.collection:
+                self.run_worker(self.resolve_badges(entries, rows, results_list), group="badges", exclusive=True)
+            if self.previews and not self.result_set.collection:
+                self.run_worker(self.resolve_previews(entries, rows, results_list), group="previews", exclusive=True)
+
+    async def resolve_badges(self, entries, rows, results_list):
+        async for entry, summary in self.service.format_summaries(entries):
+            rows[entry.id].set_badge(summary)
+            results_list.refresh_row(rows[entry.id])
+
+    async def resolve_previews(self, entries, rows, results_list):
+        async for entry, _ in self.service.previews(entries):
+            results_list.refresh_row(rows[entry.id])
 
     def _on_format_selected(self, url: str, fmt: str | None):
         if fmt:
-            self.launch_mpv(url, fmt)
+            self.run_worker(self.launch_mpv(url, fmt))
 
-    def on_list_view_selected(self, event: ListView.Selected):
-        item = event.item
+    def on_virtual_list_selected(self, event: VirtualList.Selected):
+        item = event.row
         if isinstance(item, ResultItem):
-            entry = item.entry
-            url = entry.get("webpage_url") or entry.get("url")
-            if url and not url.startswith("http"):
-                url = f"https://youtube.com/watch?v={url}"
-            
+            url = item.entry.url
             if url:
                 self.push_screen(
-                    FormatSelectionModal(url, entry.get("title", "Unknown")),
+                    FormatSelectionModal(url, item.entry.title),
                     callback=lambda fmt: self._on_format_selected(url, fmt),
                 )
         elif isinstance(item, HistoryItem):
             self.query_one("#search-input", Input).value = item.query
             self.query_one("#search-input", Input).focus()
 
+    def action_cycle_sort(self):
+        self.sort = SORTS[(SORTS.index(self.sort) + 1) % len(SORTS)]
+        if not self.result_set or self.result_set.supports(self.sort):
+            self.notify(f"Sorted by {self.sort.lower()}")
+            if self.result_set:
+                self.render_results()
+        elif self.last_query:
+            # Only orderings the loaded page can't provide go back to the network.
+            self.notify(f"Searching again by {self.sort.lower()}")
+            self.run_worker(self.fetch_results(self.last_query, self.sort), group="search", exclusive=True)
+        else:
+            self.notify(f"These results can't be sorted by {self.sort.lower()}", severity="warning")
+
+    def _refilter(self, **changes):
+        for k, v in changes.items():
+            setattr(self.filters, k, v)
+        self.notify(f"Filter: {self.filters.describe() or 'none'}")
+        if self.result_set:
+            self.render_results()
+
+    def action_cycle_length(self):
+        ranges = list(DURATION_RANGES.values())
+        current = (self.filters.min_duration, self.filters.max_duration)
+        lo, hi = ranges[(ranges.index(current) + 1) % len(ranges)] if current in ranges else ranges[0]
+        self._refilter(min_duration=lo, max_duration=hi)
+
+    def action_filter_channel(self):
+        if self.filters.uploader:
+            self._refilter(uploader="")
+            return
+        item = self.query_one("#results-list", VirtualList).highlighted_row
+        if not isinstance(item, ResultItem):
+            self.notify("Highlight a search result to filter by its channel", severity="warning")
+            return
+        self._refilter(uploader=item.entry.uploader or "")
+
+    def action_toggle_watched(self):
+        self._refilter(hide_watched=not self.filters.hide_watched)
+
+    def action_toggle_shorts(self):
+        self._refilter(hide_shorts=not self.filters.hide_shorts)
+
     def action_show_history(self):
-        results_list = self.query_one("#results-list", ListView)
-        results_list.clear()
-        for h in self.storage.data["history"]:
-            results_list.append(HistoryItem(h))
+        self.result_set = ResultSet()
+        results_list = self.query_one("#results-list", VirtualList)
+        results_list.set_rows(HistoryItem(h) for h in self.storage.data["history"])
         results_list.focus()
 
     def action_show_bookmarks(self):
-        results_list = self.query_one("#results-list", ListView)
-        results_list.clear()
-        for f in self.storage.data["favorites"]:
-            item = ResultItem({"title": f["title"], "url": f["url"], "uploader": "Bookmark"})
-            results_list.append(item)
+        self.result_set = ResultSet()
+        results_list = self.query_one("#results-list", VirtualList)
+        results_list.set_rows(self.result_rows([VideoEntry.from_info(f, uploader="Bookmark", thumbnail=f.get("thumb", ""))
+                                                for f in self.storage.data["favorites"]]))
         results_list.focus()
 
-    def launch_mpv(self, url: str, fmt: str):
-        self.notify("Preparing playback...", title="MpvTube", severity="information")
-        
-        # Use storage path if set, otherwise fallback to system mpv
-        mpv_path = self.storage.data.get("mpv_path", "mpv")
-        
-        cmd = [
-            mpv_path, "--no-terminal", "--msg-level=all=no",
-            "--prefetch-playlist=yes", "--cache=yes",
-            f"--alang={self.lang}", f"--slang={self.lang}", f"--ytdl-format={fmt}", url,
-        ]
-        
+    def action_show_feed(self):
+        self.push_screen(FeedScreen())
+
+    def action_subscribe(self):
+        item = self.query_one("#results-list", VirtualList).highlighted_row
+        channel_id = item.entry.channel_id if isinstance(item, ResultItem) else None
+        if not channel_id:
+            self.notify("Highlight a search result to subscribe to its channel", severity="warning")
+            return
+        name = item.entry.uploader or channel_id
+        if self.storage.add_subscription(channel_id, name):
+            self.notify(f"Subscribed to {name}")
+        else:
+            self.notify(f"Already subscribed to {name}")
+
+    async def launch_mpv(self, url: str, fmt: str):
+        players = self.service.players
+        if not players.full():
+            self.notify("Preparing playback...", title="MpvTube", severity="information")
+        elif players.policy == "queue":
+            self.notify(f"{len(players.players)} players open, playback starts when one closes",
+                        title="MpvTube", severity="information")
+        else:
+            self.notify("Closing the oldest player...", title="MpvTube", severity="information")
         try:
-            import shutil
-            # Verify executable exists
-            actual_path = shutil.which(mpv_path)
-            if not actual_path and mpv_path and "/" in mpv_path:
-                actual_path = mpv_path if subprocess.os.path.exists(mpv_path) else None
-            if not actual_path:
-                raise FileNotFoundError(f"Could not find mpv at '{mpv_path}'")
-
-            # Launch in background without closing TUI
-            subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            self.notify("Playback started in mpv", title="Success", severity="information")
-            
+            # Launch in background without closing TUI; the worker lives as long as the player.
+            playback = await self.service.launch(url, fmt, self.lang)
+            if playback.error:
+                self.notify(self.service.start_report(playback), title="Launch Failed", severity="error", timeout=10)
+                return
+            self.notify(self.service.start_report(playback), title="Success", severity="information")
+            if playback.upgrade and await playback.upgrade is not None:
+                self.notify("Switched to the chosen quality", title="MpvTube", severity="information")
+            code = await playback.exited
+            self.notify(f"{self.title_of(url)}: {playback.describe_exit()}", title="MpvTube",
+                        severity="information" if code == 0 or playback.stopped else "warning")
+
         except FileNotFoundError as e:
             self.notify(f"[b]Error:[/b] {str(e)}\nPlease install mpv or update path in settings.", 
                         title="Launch Failed", severity="error", timeout=10)
         except Exception as e:
             self.notify(f"Unexpected error: {str(e)}", title="Launch Failed", severity="error", timeout=10)
 
-def run_tui():
-    app = MpvTubeApp()
-    app.run()
+    def title_of(self, url):
+        entry = self.results.by_url(url)
+        return entry.title if entry else url
+
+    def action_show_players(self):
+        players = self.service.players.players
+        if not players:
+            self.notify("No players open", title="Players")
+            return
+        lines = []
+        for p in players:
+            started = f", first frame {p.first_frame:.1f}s" if p.first_frame is not None else ""
+            lines.append(f"{self.title_of(p.url)} ({player.format_uptime(p.uptime())}{started})")
+        limit = self.service.players.max_players
+        self.notify("\n".join(lines), title=f"Players {len(players)}/{limit or '∞'}", timeout=8)
+
+def run_tui(query="", server=None):
+    MpvTubeApp(query, server).run()
 
 def run_tui_min():
     # Keep the minimal version as a simple line-based fallback
     from app.storage import StorageManager
-    from yt_dlp import YoutubeDL
-    import subprocess
-    import locale
-
-    def _lang_code():
-        loc = locale.getlocale()[0] or "en_US"
-        return loc.split("_")[0].lower()
 
     def _pick(prompt, options):
         print(f"\n{prompt}")
@@ -328,43 +552,26 @@ def run_tui_min():
             print("Invalid selection, try again.")
 
     storage = StorageManager()
-    lang = _lang_code()
+    lang = player.lang_code()
     print("MpvTube TUI (Minimal)")
     query = input("Search YouTube: ").strip()
     if not query or query.lower() == "q": return
 
-    with YoutubeDL({"extract_flat": True, "skip_download": True, "quiet": True}) as ydl:
-        info = ydl.extract_info(f"ytsearch15:{query}", download=False)
-    entries = info.get("entries", [])
+    # Same search backends (and hedging) as the full UIs; extraction stays in-process here.
+    service = MediaService(storage, ThreadBackend())
+    entries = asyncio.run(service.search(query, 15))
     if not entries:
         print("No results found.")
         return
 
-    labels = [f"{e.get('title', 'Untitled')} — {e.get('uploader', 'Unknown channel')}" for e in entries[:15]]
+    labels = [f"{e.title} — {e.uploader}" for e in entries]
     pick_idx = _pick("Search results", labels)
     if pick_idx is None: return
-    entry = entries[pick_idx]
-    url = entry.get("webpage_url") or entry.get("url")
-    if url and not url.startswith("http"):
-        url = f"https://youtube.com/watch?v={url}"
+    url = entries[pick_idx].url
     
-    with YoutubeDL({"skip_download": True, "quiet": True}) as ydl:
-        formats = ydl.extract_info(url, download=False).get("formats", [])
-
-    videos, audios = [], []
-    seen = set()
-    for f in sorted([x for x in formats if x.get("height") and x.get("vcodec") != "none"], key=lambda x: x.get("height", 0), reverse=True):
-        label = f"{f.get('height')}p • {f.get('ext')}"
-        if label in seen: continue
-        seen.add(label)
-        videos.append((label, f.get("format_id")))
-
-    seen = set()
-    for f in sorted([x for x in formats if x.get("abr") and x.get("vcodec") == "none"], key=lambda x: x.get("abr", 0), reverse=True):
-        label = f"{int(f.get('abr', 0))} kbps"
-        if label in seen: continue
-        seen.add(label)
-        audios.append((label, f.get("format_id")))
+    # Through the service so launch() finds them in its format cache for fast start and fallback.
+    formats = asyncio.run(service.formats(url))
+    videos, audios = fmts.quality_options(formats)
 
     vid_idx = _pick("Video quality", [v[0] for v in videos]) if videos else None
     aid_idx = _pick("Audio quality", [a[0] for a in audios]) if audios else None
@@ -373,10 +580,10 @@ def run_tui_min():
     aid = audios[aid_idx][1] if aid_idx is not None else None
     fmt = f"{vid}+{aid}" if (vid and aid) else (vid or aid)
     
-    cmd = [
-        storage.data["mpv_path"], "--no-terminal", "--msg-level=all=no",
-        "--prefetch-playlist=yes", "--cache=yes",
-        f"--alang={lang}", f"--slang={lang}", f"--ytdl-format={fmt}", url,
-    ]
-    subprocess.Popen(cmd)
-    print("Playback launched.")
+    async def play():
+        playback = await service.launch(url, fmt, lang)
+        print(service.start_report(playback))
+        if not playback.error:
+            await playback.exited
+            print(playback.describe_exit())
+    asyncio.run(play())
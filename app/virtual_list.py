@@ -0,0 +1,138 @@
+from bisect import bisect_right
+
+from rich.text import Text
+from textual.binding import Binding
+from textual.geometry import Region, Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+
+# Line-API list for the TUI. Rows are plain objects with a `height` and a `line(i)`
+# returning markup; only the lines inside the viewport are ever rendered, so setting
+# 10k rows costs one layout pass instead of 10k mounted widgets.
+class VirtualList(ScrollView, can_focus=True):
+    BINDINGS = [
+        Binding("enter", "select", "Select", show=False),
+        Binding("up", "cursor_up", show=False),
+        Binding("down", "cursor_down", show=False),
+        Binding("pageup", "cursor_page_up", show=False),
+        Binding("pagedown", "cursor_page_down", show=False),
+        Binding("home", "cursor_first", show=False),
+        Binding("end", "cursor_last", show=False),
+    ]
+    COMPONENT_CLASSES = {"virtual-list--highlight"}
+    DEFAULT_CSS = """
+    VirtualList {
+        overflow-x: hidden;
+    }
+    VirtualList > .virtual-list--highlight {
+        background: $accent 30%;
+    }
+    VirtualList:focus > .virtual-list--highlight {
+        background: $accent;
+    }
+    """
+
+    class Selected(Message):
+        def __init__(self, virtual_list, row):
+            super().__init__()
+            self.virtual_list, self.row = virtual_list, row
+
+        @property
+        def control(self):
+            return self.virtual_list
+
+    def __init__(self, *, id=None, classes=None):
+        super().__init__(id=id, classes=classes)
+        self.rows = []
+        self.index = None
+        self._tops = []  # first virtual line of each row
+        self._positions = {}  # id(row) -> index
+        self._height = 0
+
+    @property
+    def highlighted_row(self):
+        return self.rows[self.index] if self.index is not None else None
+
+    def set_rows(self, rows):
+        self.rows, self._tops, self._positions, self._height = [], [], {}, 0
+        self.index = None
+        self.scroll_to(0, 0, animate=False)
+        self.extend(rows)
+
+    def clear(self):
+        self.set_rows(())
+
+    def extend(self, rows):
+        for row in rows:
+            self._positions[id(row)] = len(self.rows)
+            self._tops.append(self._height)
+            self._height += row.height
+            self.rows.append(row)
+        if self.index is None and self.rows:
+            self.index = 0
+        self.virtual_size = Size(0, self._height)
+        self.refresh()
+
+    def refresh_row(self, row):
+        i = self._positions.get(id(row))
+        if i is not None:
+            self.refresh_lines(self._tops[i], row.height)
+
+    def render_line(self, y):
+        line = self.scroll_offset.y + y
+        width = self.size.width
+        style = self.rich_style
+        i = bisect_right(self._tops, line) - 1
+        if i < 0 or line >= self._height:
+            return Strip.blank(width, style)
+        if i == self.index:
+            style += self.get_component_rich_style("virtual-list--highlight")
+        text = Text.from_markup(self.rows[i].line(line - self._tops[i]), style=style, end="")
+        text.truncate(width, overflow="ellipsis")
+        return Strip(text.render(self.app.console)).adjust_cell_length(width, style)
+
+    def _move(self, index):
+        if not self.rows:
+            return
+        old, self.index = self.index, max(0, min(len(self.rows) - 1, index))
+        for i in {old, self.index} - {None}:
+            self.refresh_lines(self._tops[i], self.rows[i].height)
+        self.scroll_to_region(Region(0, self._tops[self.index], 1, self.rows[self.index].height), animate=False)
+
+    def _row_at(self, line):
+        return max(0, bisect_right(self._tops, line) - 1)
+
+    def action_cursor_up(self):
+        self._move((self.index or 0) - 1)
+
+    def action_cursor_down(self):
+        self._move(-1 if self.index is None else self.index + 1)
+
+    def action_cursor_page_up(self):
+        if self.rows:
+            self._move(self._row_at(self._tops[self.index or 0] - self.size.height))
+
+    def action_cursor_page_down(self):
+        if self.rows:
+            self._move(self._row_at(self._tops[self.index or 0] + self.size.height))
+
+    def action_cursor_first(self):
+        self._move(0)
+
+    def action_cursor_last(self):
+        self._move(len(self.rows) - 1)
+
+    def action_select(self):
+        if self.highlighted_row is not None:
+            self.post_message(self.Selected(self, self.highlighted_row))
+
+    def on_click(self, event):
+        offset = event.get_content_offset(self)
+        if offset is None or not self.rows:
+            return
+        line = offset.y + self.scroll_offset.y
+        if line < self._height:
+            self._move(self._row_at(line))
+            self.action_select()
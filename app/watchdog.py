@@ -0,0 +1,57 @@
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+
+log = logging.getLogger("mpvtube.watchdog")
+
+
+# The UI loop calls beat() from a timer; a sampling thread notices when beats stop
+# arriving, samples the UI thread's stack until they resume and logs the stall.
+class StallWatchdog:
+    def __init__(self, name, threshold=0.25, interval=0.05, sample_every=0.02):
+        self.name, self.threshold, self.interval, self.sample_every = name, threshold, interval, sample_every
+        self.ui_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-watchdog", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def beat(self):
+        now = time.monotonic()
+        self.max_lag = max(self.max_lag, now - self.last_beat - self.interval)
+        self.last_beat = now
+
+    def _stack(self):
+        frame = sys._current_frames().get(self.ui_thread)
+        return tuple(traceback.format_stack(frame)) if frame else ()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            started = self.last_beat
+            if time.monotonic() - started < self.threshold:
+                continue
+            samples = collections.Counter()
+            while self.last_beat == started and not self._stop.is_set():
+                samples[self._stack()] += 1
+                time.sleep(self.sample_every)
+            self._report(time.monotonic() - started if self.last_beat == started else self.last_beat - started,
+                         samples)
+
+    def _report(self, duration, samples):
+        self.stalls += 1
+        if not samples:
+            return
+        stack, hits = samples.most_common(1)[0]
+        log.warning("%s UI thread stalled for %.0f ms (%d/%d samples in this stack):\n%s",
+                    self.name, duration * 1000, hits, sum(samples.values()), "".join(stack[-12:]))
@@ -1,15 +1,109 @@
-import hashlib
-import os
-from PySide6.QtCore import Qt, QTimer
-from PySide6.QtGui import QPixmap
+import asyncio
+import heapq
+from collections import OrderedDict
+
+from PySide6.QtCore import QEvent, Qt, QTimer
+from PySide6.QtGui import QImage, QPixmap
 from PySide6.QtWidgets import QWidget, QHBoxLayout, QLabel, QVBoxLayout, QFrame
 
-from app.workers import WorkerSignals, ThumbnailWorker
+from app import placeholders
+from app.formats import badge, badge_details, storyboard_frame
+from app.workers import WorkerSignals
+
+THUMB_SIZE = (160, 90)
+# A row has to stay under the cursor this long before its storyboard is fetched.
+PREVIEW_DELAY_MS = 350
+
+
+class PixmapCache:
+    # Display-ready pixmaps keyed by (url, width, height), bounded by pixel bytes.
+    def __init__(self, max_bytes=48 * 1024 * 1024):
+        self.max_bytes, self.bytes = max_bytes, 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        pix = self._items.get(key)
+        if pix is not None:
+            self._items.move_to_end(key)
+        return pix
+
+    def put(self, key, pix):
+        if key in self._items:
+            self.bytes -= self._cost(self._items.pop(key))
+        self._items[key] = pix
+        self.bytes += self._cost(pix)
+        while self.bytes > self.max_bytes and len(self._items) > 1:
+            _, old = self._items.popitem(last=False)
+            self.bytes -= self._cost(old)
+
+    @staticmethod
+    def _cost(pix):
+        return pix.width() * pix.height() * max(pix.depth(), 8) // 8
+
+
+PIXMAPS = PixmapCache()
+
+
+def decode_thumbnail(data, size):
+    # Runs on a worker thread: QImage (unlike QPixmap) is safe to build off the GUI thread.
+    # PySide6 rejects memoryview arguments, so the mmap slice is copied once at this boundary.
+    img = QImage.fromData(bytes(data))
+    if img.isNull():
+        return None
+    w, h = size
+    img = img.scaled(w, h, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+    img = img.copy((img.width() - w) // 2, (img.height() - h) // 2, w, h)
+    return img.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+
+
+async def load_thumbnail(service, entry, size):
+    data = await service.thumbnail(entry.thumbnail)
+    img = await asyncio.to_thread(decode_thumbnail, data, size)
+    if img is not None and entry.placeholder is None:
+        # First download of this thumbnail: keep its tiny preview for the next paint.
+        await service.put_placeholder(entry, await asyncio.to_thread(placeholders.from_image, img))
+    return img
+
+
+def slice_sheet(data, board, size):
+    # Worker thread: one storyboard sprite sheet -> its frames, row-major, cropped like thumbnails.
+    # The last sheet of a video is usually only partly filled, so cells outside it are skipped.
+    sheet = QImage.fromData(bytes(data))
+    if sheet.isNull():
+        return []
+    fw, fh = board.get("width") or sheet.width() // board["columns"], board.get("height") or sheet.height() // board["rows"]
+    frames = []
+    for r in range(board["rows"]):
+        for c in range(board["columns"]):
+            if (c + 1) * fw > sheet.width() or (r + 1) * fh > sheet.height():
+                return frames
+            frame = sheet.copy(c * fw, r * fh, fw, fh).scaled(*size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+            frame = frame.copy((frame.width() - size[0]) // 2, (frame.height() - size[1]) // 2, *size)
+            frames.append(frame.convertToFormat(QImage.Format_ARGB32_Premultiplied))
+    return frames
+
+
+async def load_sheet(service, url, board, size):
+    return await asyncio.to_thread(slice_sheet, await service.storyboard_sheet(url), board, size)
+
+
+def placeholder_pixmap(ph, size):
+    pix = PIXMAPS.get((ph, *size))
+    if pix is None:
+        pix = QPixmap.fromImage(placeholders.to_image(ph, size))
+        PIXMAPS.put((ph, *size), pix)
+    return pix
+
 
 class SearchResultItem(QWidget):
-    def __init__(self, entry, theme):
+    def __init__(self, entry, theme, bridge, service):
         super().__init__()
         self.entry, self.theme = entry, theme
+        self.bridge, self.service = bridge, service
+        self.wants_thumbnail = False
+        # Scrub preview state: None = storyboard not looked up yet, False = video has none.
+        self.storyboard = None
+        self._hovering, self._scrub, self._preview_futs = False, 0.0, {}
         self._init_ui()
 
     def _init_ui(self):
@@ -27,15 +121,20 @@ class SearchResultItem(QWidget):
         root.addWidget(self.container)
 
         self.thumb = QLabel()
-        t_size = (160, 90)
-        self.thumb.setFixedSize(*t_size)
+        self.thumb.setFixedSize(*THUMB_SIZE)
         self.thumb.setStyleSheet(f"background: #000; border: {t['border_width']} solid {t['border_color']};")
+        self.thumb.setMouseTracking(True)
+        self.thumb.installEventFilter(self)
         layout.addWidget(self.thumb)
+        self._hover_timer = QTimer(self)
+        self._hover_timer.setSingleShot(True)
+        self._hover_timer.setInterval(PREVIEW_DELAY_MS)
+        self._hover_timer.timeout.connect(self._start_preview)
 
         text_v = QVBoxLayout()
         text_v.setSpacing(5)
         
-        self.title_lbl = QLabel(self.entry.get("title", "Untitled video"))
+        self.title_lbl = QLabel(self.entry.title)
         self.title_lbl.setWordWrap(True)
         self.title_lbl.setStyleSheet(f"""
             color: {t['text']};
@@ -47,7 +146,7 @@ class SearchResultItem(QWidget):
         """)
         text_v.addWidget(self.title_lbl)
 
-        meta_str = f"{self.entry.get('uploader', 'Unknown channel')} • {self.entry.get('duration_string', '0:00')}"
+        meta_str = f"{self.entry.uploader} • {self.entry.duration_string}"
         self.meta_lbl = QLabel(meta_str)
         self.meta_lbl.setStyleSheet(f"""
             color: {t['accent']};
@@ -57,33 +156,181 @@ class SearchResultItem(QWidget):
             text-transform: uppercase;
         """)
         text_v.addWidget(self.meta_lbl)
+
+        self.badge_lbl = QLabel()
+        self.badge_lbl.setStyleSheet(f"""
+            color: {t['bg']};
+            background: {t['accent']};
+            font-family: {t['font']};
+            font-size: 8pt;
+            font-weight: 800;
+            padding: 1px 6px;
+        """)
+        policy = self.badge_lbl.sizePolicy()
+        policy.setRetainSizeWhenHidden(True)  # the row height is fixed when it is added to the list
+        self.badge_lbl.setSizePolicy(policy)
+        self.badge_lbl.hide()
+        text_v.addWidget(self.badge_lbl, 0, Qt.AlignLeft)
         
         layout.addLayout(text_v)
         self._load_thumbnail()
 
     def _load_thumbnail(self):
-        thumbs = self.entry.get("thumbnails", [])
-        if not thumbs: return
-        url = thumbs[-1].get("url")
+        url = self.entry.thumbnail
         if not url: return
 
-        cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "mpvTube", "thumbs")
-        os.makedirs(cache_dir, exist_ok=True)
-        path = os.path.join(cache_dir, hashlib.md5(url.encode()).hexdigest() + ".jpg")
+        pix = PIXMAPS.get((url, *THUMB_SIZE))
+        if pix is not None:
+            self.thumb.setPixmap(pix)
+            return
+        if self.entry.placeholder:
+            self.thumb.setPixmap(placeholder_pixmap(self.entry.placeholder, THUMB_SIZE))
+
+        # The download itself is left to the list's ThumbnailScheduler.
+        self.wants_thumbnail = True
+
+    def fetch_thumbnail(self):
+        self.wants_thumbnail = False
+        sig = WorkerSignals(self)
+        sig.results.connect(self._apply_thumbnail)
+        return self.bridge.submit(load_thumbnail(self.service, self.entry, THUMB_SIZE), sig), sig
+
+    def set_badge(self, summary):
+        text = badge(summary)
+        if not text: return
+        self.badge_lbl.setText(text)
+        self.badge_lbl.setToolTip(badge_details(summary))
+        self.badge_lbl.show()
+
+    def _apply_thumbnail(self, img):
+        if img is None: return
+        pix = QPixmap.fromImage(img)
+        PIXMAPS.put((self.entry.thumbnail, *THUMB_SIZE), pix)
+        if not self._hovering:
+            self.thumb.setPixmap(pix)
+
+    # Hover previews: the thumbnail scrubs through the video's storyboard with the cursor.
+    # Only the row under the cursor fetches anything, and leaving it cancels what is in flight.
+    def eventFilter(self, obj, event):
+        if obj is self.thumb:
+            kind = event.type()
+            if kind == QEvent.Enter:
+                self._hovering = True
+                self._scrub = event.position().x() / max(1, self.thumb.width())
+                self._hover_timer.start()
+            elif kind == QEvent.MouseMove and self._hovering:
+                self._scrub = event.position().x() / max(1, self.thumb.width())
+                if self.storyboard:
+                    self._show_frame()
+            elif kind == QEvent.Leave:
+                self._end_preview()
+        return super().eventFilter(obj, event)
+
+    def _start_preview(self):
+        if not self._hovering or self.storyboard is False: return
+        if self.storyboard:
+            self._show_frame()
+        elif "board" not in self._preview_futs:
+            sig = WorkerSignals(self)
+            sig.results.connect(self._on_storyboard)
+            self._preview_futs["board"] = self.bridge.submit(self.service.storyboard(self.entry.url), sig)
 
-        if os.path.exists(path):
-            self._apply_thumbnail(path)
+    def _on_storyboard(self, board):
+        self._preview_futs.pop("board", None)
+        self.storyboard = board or False
+        if board and self._hovering:
+            self._show_frame()
+
+    def _show_frame(self):
+        sheet, frame = storyboard_frame(self.storyboard, self._scrub)
+        url = self.storyboard["fragments"][sheet][0]
+        pix = PIXMAPS.get((url, frame, *THUMB_SIZE))
+        if pix is not None:
+            self.thumb.setPixmap(pix)
+        elif PIXMAPS.get((url, 0, *THUMB_SIZE)) is None and sheet not in self._preview_futs:
+            sig = WorkerSignals(self)
+            sig.results.connect(lambda frames, url=url, sheet=sheet: self._on_sheet(url, sheet, frames))
+            self._preview_futs[sheet] = self.bridge.submit(
+                load_sheet(self.service, url, self.storyboard, THUMB_SIZE), sig)
+
+    def _on_sheet(self, url, sheet, frames):
+        self._preview_futs.pop(sheet, None)
+        for i, img in enumerate(frames):
+            PIXMAPS.put((url, i, *THUMB_SIZE), QPixmap.fromImage(img))
+        if frames and self._hovering:
+            self._show_frame()
+
+    def _end_preview(self):
+        self._hovering = False
+        self._hover_timer.stop()
+        for fut in self._preview_futs.values():
+            fut.cancel()
+        self._preview_futs.clear()
+        pix = PIXMAPS.get((self.entry.thumbnail, *THUMB_SIZE)) if self.entry.thumbnail else None
+        if pix is None and self.entry.placeholder:
+            pix = placeholder_pixmap(self.entry.placeholder, THUMB_SIZE)
+        if pix is not None:
+            self.thumb.setPixmap(pix)
+
+# Thumbnail downloads for one result list, nearest-to-the-viewport first: visible rows top to
+# bottom, then rows further and further away. Only `slots` run at once, so a row scrolled
+# into view waits for at most one download to finish instead of the whole page. Order is
+# worked out afresh whenever a slot frees or the view scrolls; clear() cancels everything.
+class ThumbnailScheduler:
+    def __init__(self, view, slots=6):
+        self.view, self.slots = view, slots
+        self._pending = {}  # row widget -> its QListWidgetItem
+        self._running = {}  # row widget -> future
+        self._timer = QTimer(view, singleShot=True, interval=30)
+        self._timer.timeout.connect(self._pump)
+        view.verticalScrollBar().valueChanged.connect(self._timer.start)
+        view.verticalScrollBar().rangeChanged.connect(self._timer.start)
+
+    def request(self, row, item):
+        self._pending[row] = item
+        row.destroyed.connect(lambda *_: self._forget(row))
+        self._timer.start()
+
+    def _distance(self, item):
+        # 0 for rows on screen (top first), otherwise pixels away; rows below the fold come
+        # before rows the same distance above, where the user is less likely heading.
+        rect, port = self.view.visualItemRect(item), self.view.viewport().rect()
+        if rect.bottom() < port.top():
+            return (1, port.top() - rect.bottom() + port.height() // 2)
+        if rect.top() > port.bottom():
+            return (1, rect.top() - port.bottom())
+        return (0, rect.top())
+
+    def _pump(self):
+        free = self.slots - len(self._running)
+        if free <= 0 or not self._pending:
             return
+        for row, item in heapq.nsmallest(free, self._pending.items(), key=lambda kv: self._distance(kv[1])):
+            del self._pending[row]
+            fut, sig = row.fetch_thumbnail()
+            self._running[row] = fut
+            sig.finished.connect(lambda row=row: self._done(row))
+
+    def _done(self, row):
+        if self._running.pop(row, None) is not None:
+            self._pump()
+
+    def _forget(self, row):
+        self._pending.pop(row, None)
+        fut = self._running.pop(row, None)
+        if fut is not None:
+            fut.cancel()
+
+    def clear(self):
+        # Cancelling reports `finished` straight away, so detach everything first.
+        running, self._running = self._running, {}
+        self._pending.clear()
+        for fut in running.values():
+            fut.cancel()
 
-        self.thumb_signals = WorkerSignals()
-        self.thumb_signals.results.connect(self._apply_thumbnail)
-        ThumbnailWorker(url, path, self.thumb_signals).start()
+    def __len__(self):
+        return len(self._pending) + len(self._running)
 
-    def _apply_thumbnail(self, path):
-        pix = QPixmap(path)
-        if pix.isNull(): return
-        pix = pix.scaled(self.thumb.size(), Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-        self.thumb.setPixmap(pix)
 
 class LoadingSpinner(QLabel):
     def __init__(self, theme):
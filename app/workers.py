@@ -1,52 +1,126 @@
+import asyncio
+import ctypes
+import multiprocessing
+import sys
 import threading
-import urllib.request
-from yt_dlp import YoutubeDL
-from PySide6.QtCore import Signal, QObject
-
-class WorkerSignals(QObject):
-    results = Signal(object)
-    error = Signal(str)
-    finished = Signal()
-
-class ThumbnailWorker(threading.Thread):
-    def __init__(self, url, path, signals):
-        super().__init__(daemon=True)
-        self.url, self.path, self.signals = url, path, signals
-    def run(self):
-        try:
-            req = urllib.request.Request(self.url, headers={"User-Agent": "Mozilla/5.0"})
-            with urllib.request.urlopen(req) as r, open(self.path, "wb") as f:
-                f.write(r.read())
-            self.signals.results.emit(self.path)
-        except Exception as e: self.signals.error.emit(str(e))
-        finally: self.signals.finished.emit()
-
-class YTSearchWorker(threading.Thread):
-    def __init__(self, query, max_results, signals, sort="relevance"):
-        super().__init__(daemon=True)
-        self.query, self.max_results, self.signals, self.sort = query, max_results, signals, sort
-    def run(self):
-        try:
-            sort_map = {"RELEVANCE": "", "DATE": "date", "VIEWS": "view_count", "RATING": "rating"}
-            s_val = sort_map.get(self.sort, "")
-            opts = {"extract_flat": True, "skip_download": True, "quiet": True}
-            with YoutubeDL(opts) as ydl:
-                # yt-dlp supports youtube search sorting with ytsearch<sort><N>:query
-                query = f"ytsearch{s_val}{self.max_results}:{self.query}" if s_val else f"ytsearch{self.max_results}:{self.query}"
-                info = ydl.extract_info(query, download=False)
-                entries = info.get("entries", [])
-                self.signals.results.emit(entries)
-        except Exception as e: self.signals.error.emit(str(e))
-        finally: self.signals.finished.emit()
-
-class FormatsWorker(threading.Thread):
-    def __init__(self, url, signals):
-        super().__init__(daemon=True)
-        self.url, self.signals = url, signals
-    def run(self):
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app import extract
+
+try:
+    import PySide6
+    from PySide6.QtCore import Signal, SignalInstance, QObject
+except ImportError:  # terminal-only installs still use the extraction backends
+    QObject = None
+
+if QObject is not None:
+    # PySide6 6.12.0 returns True from SignalInstance.emit() without a new reference, so
+    # every emit drops one from True and long sessions abort in bool_dealloc. Python 3.12+
+    # bools are immortal and unaffected. Put the missing reference back until a fixed
+    # release is out (Qt for Python tracker: https://bugreports.qt.io/projects/PYSIDE).
+    if PySide6.__version__ == "6.12.0" and sys.version_info < (3, 12):
+        _emit = SignalInstance.emit
+
+        def _emit_with_ref(self, *args):
+            result = _emit(self, *args)
+            ctypes.pythonapi.Py_IncRef(ctypes.py_object(result))
+            return result
+
+        SignalInstance.emit = _emit_with_ref
+
+    class WorkerSignals(QObject):
+        results = Signal(object)
+        error = Signal(str)
+        finished = Signal()
+
+
+class ThreadBackend:
+    name = "thread"
+
+    def __init__(self, max_workers=4, preconnect=False):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extract")
+        self.preconnect = preconnect
+
+    def submit(self, fn, *args):
+        return self.pool.submit(fn, *args)
+
+    def warm(self):
+        # yt-dlp is already imported in-process; only its connection is worth opening early.
+        # Idle pool threads are reused, so the first extraction usually lands on this one.
+        if self.preconnect:
+            self.pool.submit(extract.warm_up, True)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Persistent worker processes: yt-dlp's JSON/regex/signature work never holds the UI's GIL.
+class ProcessBackend:
+    name = "process"
+
+    def __init__(self, max_workers=2, preconnect=False):
+        self.max_workers, self.preconnect = max_workers, preconnect
+        # spawn: forking a process that already runs Qt/Textual threads is unsafe.
+        self.pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=extract.warm_up, initargs=(preconnect,))
+
+    def submit(self, fn, *args):
+        return self.pool.submit(extract.call, fn, *args)
+
+    def warm(self):
+        # Start every worker now so the first search does not pay interpreter + yt-dlp import time.
+        for _ in range(self.max_workers):
+            self.pool.submit(extract.warm_up, self.preconnect)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+BACKENDS = {"thread": ThreadBackend, "process": ProcessBackend}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name="process", preconnect=False):
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS.get(name, ProcessBackend)(preconnect=preconnect)
+            _backends[name].warm()
+        return _backends[name]
+
+# Runs MediaService coroutines on a private asyncio loop and reports back through Qt signals.
+class AsyncBridge:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-bridge", daemon=True)
+        self.thread.start()
+
+    def submit(self, coro, signals=None):
+        fut = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if signals is not None:
+            # Parented signals are freed by Qt once `finished` has been delivered, never while
+            # queued emissions still reference them.
+            signals.finished.connect(signals.deleteLater)
+            # Emitting from the loop thread is fine: Qt queues delivery to the receiver's thread.
+            fut.add_done_callback(lambda f: self._report(f, signals))
+        return fut
+
+    def _report(self, fut, signals):
         try:
-            with YoutubeDL({"skip_download": True, "quiet": True}) as ydl:
-                info = ydl.extract_info(self.url, download=False)
-                self.signals.results.emit(info.get("formats", []))
-        except Exception as e: self.signals.error.emit(str(e))
-        finally: self.signals.finished.emit()
+            if fut.cancelled():
+                return
+            err = fut.exception()
+            if err is not None:
+                signals.error.emit(str(err) or type(err).__name__)
+            else:
+                signals.results.emit(fut.result())
+        except RuntimeError:
+            return  # receiver already deleted
+        finally:
+            try:
+                signals.finished.emit()
+            except RuntimeError:
+                pass
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,65 @@
+"""Retained memory of raw yt-dlp flat search entries vs projected VideoEntry records.
+
+    python bench/bench_entries.py [count]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import VideoEntry
+
+
+def fake_flat_entry(i):
+    # Same shape as an entry from ytsearch with extract_flat=True.
+    vid = f"{i:011d}"[-11:]
+    return {
+        "_type": "url",
+        "ie_key": "Youtube",
+        "id": vid,
+        "url": f"https://www.youtube.com/watch?v={vid}",
+        "title": f"Some reasonably long video title number {i} (official)",
+        "description": None,
+        "duration": 200.0 + i % 900,
+        "channel_id": f"UC{i % 500:022d}",
+        "channel": f"Channel {i % 500}",
+        "channel_url": f"https://www.youtube.com/channel/UC{i % 500:022d}",
+        "uploader": f"Channel {i % 500}",
+        "uploader_id": f"@channel{i % 500}",
+        "uploader_url": f"https://www.youtube.com/@channel{i % 500}",
+        "thumbnails": [
+            {"url": f"https://i.ytimg.com/vi/{vid}/hq720.jpg?sqp=-oaymwEcCOgCEMoBSFXyq4qpAw4IARUAAIhCGAFwAcABBg==&rs=AOn4CLB", "height": 202, "width": 360},
+            {"url": f"https://i.ytimg.com/vi/{vid}/hq720.jpg?sqp=-oaymwEcCNAFEJQDSFXyq4qpAw4IARUAAIhCGAFwAcABBg==&rs=AOn4CLC", "height": 404, "width": 720},
+        ],
+        "timestamp": None,
+        "release_timestamp": None,
+        "availability": None,
+        "view_count": 1000 * i,
+        "live_status": None,
+        "channel_is_verified": None,
+        "__x_forwarded_for_ip": None,
+    }
+
+
+def measure(build):
+    tracemalloc.start()
+    data = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, size
+
+
+def main(count=10000):
+    raw, raw_size = measure(lambda: [fake_flat_entry(i) for i in range(count)])
+    del raw
+    # Projection happens once, straight from yt-dlp output; the raw dicts are dropped.
+    slim, slim_size = measure(lambda: [VideoEntry.from_info(fake_flat_entry(i)) for i in range(count)])
+    print(f"{count} entries")
+    print(f"  raw dicts    {raw_size / 1024:10.1f} KiB  {raw_size / count:7.0f} B/entry")
+    print(f"  VideoEntry   {slim_size / 1024:10.1f} KiB  {slim_size / count:7.0f} B/entry")
+    print(f"  ratio        {raw_size / slim_size:10.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
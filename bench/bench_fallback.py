@@ -0,0 +1,68 @@
+"""Launch time when the chosen format can't be played, with automatic fallback.
+
+bench/fake_mpv.py stands in for mpv and refuses the format specs in --fail. The first
+launch of each video hits them and falls back through the cached format list; the second
+launch of the same video skips the formats recorded as failed. Before, every failure meant
+reopening the quality dialog (a fresh extraction) and picking again by hand. POSIX only.
+
+    python bench/bench_fallback.py [--videos 5] [--fail 137+140,136+140] [--first-frame 0.3]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FORMATS = [
+    {"format_id": "137", "height": 1080, "vcodec": "avc1", "ext": "mp4"},
+    {"format_id": "136", "height": 720, "vcodec": "avc1", "ext": "mp4"},
+    {"format_id": "135", "height": 480, "vcodec": "avc1", "ext": "mp4"},
+    {"format_id": "140", "abr": 128, "vcodec": "none", "acodec": "mp4a", "ext": "m4a"},
+    {"format_id": "139", "abr": 48, "vcodec": "none", "acodec": "mp4a", "ext": "m4a"},
+]
+
+
+async def run(videos):
+    from app.service import MediaService
+    from app.storage import StorageManager
+    from app.workers import ThreadBackend
+
+    storage = StorageManager()
+    storage.data["mpv_path"] = os.path.join(ROOT, "bench", "fake_mpv.py")
+    storage.data["settings"].update(fast_start=False, max_players=0)
+    service = MediaService(storage, ThreadBackend())
+    rounds = {"first launch": [], "repeat launch": []}
+    for i in range(videos):
+        url = f"https://www.youtube.com/watch?v=fallback{i:03d}"
+        service.format_cache.put(url, FORMATS)
+        for label, times in rounds.items():
+            started = time.monotonic()
+            playback = await service.launch(url, "137+140")
+            times.append(time.monotonic() - started)
+            playback.proc.terminate()
+            await playback.exited
+            print(f"{url[-11:]}  {label:<13} {times[-1]:5.2f}s  "
+                  f"{len(playback.fallbacks)} failed  playing {playback.fmt}{'  ERROR' if playback.error else ''}")
+    print()
+    for label, times in rounds.items():
+        print(f"{label:<13} median {statistics.median(times):5.2f}s to first frame")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--videos", type=int, default=5)
+    ap.add_argument("--fail", default="137+140,136+140", help="format specs the fake mpv can't open")
+    ap.add_argument("--first-frame", type=float, default=0.3, help="fake mpv's time to first frame (s)")
+    args = ap.parse_args()
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="mpvtube-bench-")
+    os.environ.update(FAKE_MPV_FAIL=args.fail, FAKE_MPV_FIRST_FRAME=str(args.first_frame))
+    asyncio.run(run(args.videos))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Time to first frame for direct vs fast-start mpv launches.
+
+Launches the real mpv for every URL with both strategies, measures spawn -> first frame
+over mpv's IPC, and for fast starts also how long the switch to the chosen quality held
+playback. Needs mpv and network access; each player is closed after its measurement.
+
+    python bench/bench_fast_start.py URL [URL ...] [--height 1080] [--rounds 3] [--mpv PATH]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def chosen_format(formats, height):
+    from app import formats as fmts
+    videos, audios = fmts.quality_options(formats)
+    fits = [fid for label, fid in videos if int(label.split("p")[0]) <= height] or [fid for _, fid in videos]
+    return "+".join(filter(None, [fits[0] if fits else None, audios[0][1] if audios else None]))
+
+
+async def run(urls, height, rounds, mpv):
+    from app.service import MediaService
+    from app.storage import StorageManager
+    from app.workers import ThreadBackend
+
+    storage = StorageManager()
+    storage.data["mpv_path"] = mpv
+    service = MediaService(storage, ThreadBackend())
+    results = {"direct": [], "fast start": []}
+    stalls = []
+    print(f"{'video':<44} {'strategy':<11} {'first frame':>11} {'switch':>8}")
+    for url in urls:
+        fmt = chosen_format(await service.formats(url), height)
+        for _ in range(rounds):
+            for fast in (False, True):
+                storage.data["settings"]["fast_start"] = fast
+                playback = await service.launch(url, fmt, wait_upgrade=True)
+                stall = await playback.upgrade if playback.upgrade else None
+                playback.proc.terminate()
+                await asyncio.to_thread(playback.proc.wait)
+                if playback.first_frame is not None:
+                    results[playback.strategy].append(playback.first_frame)
+                if stall is not None:
+                    stalls.append(stall)
+                print(f"{url[-44:]:<44} {playback.strategy:<11} "
+                      f"{'-' if playback.first_frame is None else f'{playback.first_frame:.2f}s':>11} "
+                      f"{'-' if stall is None else f'{stall:.2f}s':>8}", flush=True)
+    print()
+    for strategy, times in results.items():
+        if times:
+            print(f"{strategy:<11} median first frame {statistics.median(times):.2f}s over {len(times)} launches")
+    if stalls:
+        print(f"fast start  median switch stall {statistics.median(stalls):.2f}s")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("urls", nargs="+")
+    ap.add_argument("--height", type=int, default=1080, help="chosen quality: best video at or below this height")
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--mpv", default="mpv")
+    args = ap.parse_args()
+    # Keep the run's first-frame stats and watch history out of the real config.
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="mpvtube-bench-")
+    asyncio.run(run(args.urls, args.height, args.rounds, args.mpv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Search latency with and without hedging, against local stand-in API servers.
+
+Two stand-ins answer the Invidious-style /api/v1/search route with fake results. The
+primary is usually quick but sometimes stalls (a long tail); the secondary is a bit slower
+but steady. Unique queries go through MediaService.search once with the primary alone and
+once hedged, and the latency percentiles plus the share of searches that fired a second
+request are printed.
+
+    python bench/bench_hedging.py [--searches 200] [--tail 0.05] [--tail-s 2.0]
+    python bench/bench_hedging.py --serve 8790 [--tail 0.05]   # stand-in for search_api_url
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def fake_item(query, i):
+    vid = f"{abs(hash((query, i))) % 10 ** 11:011d}"
+    return {"type": "video", "title": f"{query} result {i}", "videoId": vid, "author": f"Channel {i % 7}",
+            "authorId": f"UC{i % 7:022d}", "lengthSeconds": 60 + 37 * i, "published": 1700000000 + i * 3600,
+            "viewCount": 1000 * (i + 1),
+            "videoThumbnails": [{"quality": "medium", "url": f"/vi/{vid}/mqdefault.jpg", "width": 320, "height": 180}]}
+
+
+def stand_in(median, tail, tail_s, port=0):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/api/v1/search":
+                self.send_error(404)
+                return
+            # Log-normal service time around `median`, plus an occasional stall.
+            time.sleep(random.lognormvariate(0, 0.25) * median + (tail_s if random.random() < tail else 0))
+            q = parse_qs(url.query)
+            page, query = int(q.get("page", ["1"])[0]), q.get("q", [""])[0]
+            body = json.dumps([fake_item(query, (page - 1) * 20 + i) for i in range(20)]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentiles(times):
+    q = statistics.quantiles(times, n=100)
+    return f"p50 {q[49] * 1000:6.0f} ms  p90 {q[89] * 1000:6.0f} ms  p99 {q[98] * 1000:6.0f} ms"
+
+
+async def run(searches, primary_url, secondary_url):
+    from app.backends import ApiSearch, LatencyTracker
+    from app.ratelimit import RateLimiter
+    from app.service import MediaService
+    from app.storage import StorageManager
+    from app.workers import ThreadBackend
+
+    for hedge in (False, True):
+        service = MediaService(StorageManager(), ThreadBackend(), search_limit=4,
+                               governor=RateLimiter({"127.0.0.1": (1e6, 1e6)}))
+        service.storage.data["settings"]["search_hedge"] = hedge
+        service.searchers = [ApiSearch(primary_url)] + ([ApiSearch(secondary_url)] if hedge else [])
+        service.search_latency = LatencyTracker()
+        hedges = 0
+        times = []
+        for i in range(searches):
+            deadline = service.search_latency.deadline()
+            started = time.perf_counter()
+            await service.search(f"query {i}", 15)
+            times.append(time.perf_counter() - started)
+            hedges += hedge and times[-1] > deadline
+        label = "hedged" if hedge else "primary only"
+        print(f"{label:<13} {percentiles(times)}  second request on {hedges * 100 / searches:4.1f}% of searches")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--searches", type=int, default=200)
+    ap.add_argument("--median", type=float, default=0.15, help="primary's typical response time (s)")
+    ap.add_argument("--tail", type=float, default=0.05, help="share of primary responses that stall")
+    ap.add_argument("--tail-s", type=float, default=2.0, help="length of a stall (s)")
+    ap.add_argument("--serve", type=int, metavar="PORT", help="only run a stand-in on PORT")
+    args = ap.parse_args()
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="mpvtube-bench-")
+
+    if args.serve:
+        stand_in(args.median, args.tail, args.tail_s, args.serve)
+        print(f"stand-in search API on http://127.0.0.1:{args.serve}")
+        threading.Event().wait()
+    primary = stand_in(args.median, args.tail, args.tail_s)
+    secondary = stand_in(args.median * 1.5, 0, 0)
+    asyncio.run(run(args.searches, f"http://127.0.0.1:{primary.server_port}",
+                    f"http://127.0.0.1:{secondary.server_port}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Player supervision against a fake mpv: reaping, the concurrency cap and its policies.
+
+A burst of launches goes through MediaService.launch with bench/fake_mpv.py standing in for
+mpv (every player plays for --play seconds). For each policy it prints the most players
+seen at once, how long launches waited for a slot, time to first frame, the exit statuses
+and how many exited players were left as zombies. The unsupervised row spawns the same
+burst without ever waiting on the processes, which is how launches worked before. Exits
+non-zero when a policy lets more than --max-players run at once or leaves a zombie. POSIX only.
+
+    python bench/bench_players.py [--launches 6] [--max-players 2] [--play 1.0]
+"""
+import argparse
+import asyncio
+import collections
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+FAKE_MPV = os.path.join(ROOT, "bench", "fake_mpv.py")
+
+
+def zombies(pids):
+    # Exited but never waited on: still in the process table as state Z.
+    count = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                count += f.read().rsplit(")", 1)[1].split()[0] == "Z"
+        except OSError:
+            pass
+    return count
+
+
+async def supervised(policy, launches, max_players, play):
+    from app.service import MediaService
+    from app.storage import StorageManager
+    from app.workers import ThreadBackend
+
+    storage = StorageManager()
+    storage.data["mpv_path"] = FAKE_MPV
+    storage.data["settings"].update(max_players=max_players, player_policy=policy, fast_start=False)
+    service = MediaService(storage, ThreadBackend())
+    peak = 0
+
+    async def watch():
+        nonlocal peak
+        while True:
+            peak = max(peak, len(service.players.running()))
+            await asyncio.sleep(0.02)
+
+    async def one(i):
+        started = time.monotonic()
+        playback = await service.launch(f"https://www.youtube.com/watch?v=fake{i:07d}", "18")
+        waited = playback.spawned - started
+        return playback, waited, await playback.exited
+
+    watcher = asyncio.ensure_future(watch())
+    results = await asyncio.gather(*(one(i) for i in range(launches)))
+    watcher.cancel()
+    pids = [p.proc.pid for p, _, _ in results]
+    codes = collections.Counter("closed" if p.stopped else code for p, _, code in results)
+    frames = [p.first_frame for p, _, _ in results if p.first_frame is not None]
+    left = zombies(pids)
+    ok = peak <= max_players and left == 0
+    print(f"{policy:<12} peak {peak:>2}  slot wait max {max(w for _, w, _ in results):5.2f}s  "
+          f"first frame median {statistics.median(frames):5.2f}s  exits {dict(codes)}  zombies {left}  "
+          f"{'OK' if ok else 'FAIL'}")
+    return ok
+
+
+def unsupervised(launches, play):
+    from app import player
+    procs = [player.spawn([FAKE_MPV, f"https://www.youtube.com/watch?v=fake{i:07d}"]) for i in range(launches)]
+    time.sleep(play + 1.0)
+    print(f"{'unsupervised':<12} peak {launches:>2}  {'':>64}zombies {zombies(p.pid for p in procs)}")
+    for p in procs:
+        p.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--launches", type=int, default=6)
+    ap.add_argument("--max-players", type=int, default=2)
+    ap.add_argument("--play", type=float, default=1.0, help="seconds each fake player plays")
+    args = ap.parse_args()
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="mpvtube-bench-")
+    os.environ["FAKE_MPV_PLAY"] = str(args.play)
+    ok = True
+    for policy in ("replace", "queue"):
+        ok &= asyncio.run(supervised(policy, args.launches, args.max_players, args.play))
+    unsupervised(args.launches, args.play)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
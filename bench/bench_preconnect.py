@@ -0,0 +1,154 @@
+"""First search and thumbnail batches against a local TLS stand-in, with and without pre-connecting.
+
+A local HTTPS server answers the Invidious-style /api/v1/search route and serves fake
+thumbnails. It waits --handshake seconds before every TLS handshake, standing in for the DNS,
+TCP and TLS round trips to a far-away host. Each mode runs one API search and then a few
+batches of thumbnails, six at a time like a result page, through MediaService:
+
+- "urllib" opens a connection per request, which is how downloads worked before.
+- "pool, cold" keeps connections alive between requests.
+- "pool, warmed" also pre-connects first, as the app does at start.
+
+Needs the openssl command line tool for the throwaway certificate.
+
+    python bench/bench_preconnect.py [--handshake 0.15] [--batches 3] [--runs 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_hedging import fake_item
+
+THUMB = os.urandom(12000)
+
+
+def certificate(tmp):
+    cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+                    "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    return cert, key
+
+
+def stand_in(cert, key, handshake):
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        # Headers and body go out as two writes; with Nagle on, every kept-alive response
+        # would stall on the client's delayed ACK.
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/api/v1/search":
+                query = parse_qs(url.query).get("q", [""])[0]
+                body = json.dumps([fake_item(query, i) for i in range(20)]).encode()
+            else:
+                body = THUMB
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def finish_request(self, request, client_address):
+            # On the connection's own thread, so slow handshakes don't queue behind each other.
+            time.sleep(handshake)
+            try:
+                request = ctx.wrap_socket(request, server_side=True)
+            except (ssl.SSLError, OSError):
+                return
+            super().finish_request(request, client_address)
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class PerRequest:
+    # urllib's behaviour: a new connection, handshake included, for every request.
+    def __init__(self, context):
+        self.context = context
+
+    def get(self, url, headers=None, timeout=None):
+        req = urllib.request.Request(url, headers=dict({"User-Agent": "Mozilla/5.0"}, **(headers or {})))
+        with urllib.request.urlopen(req, timeout=timeout or 20, context=self.context) as r:
+            return r.read()
+
+    def warm(self, url):
+        return False
+
+
+async def run(base, connections, warm, batches, tag):
+    from app.backends import ApiSearch
+    from app.ratelimit import RateLimiter
+    from app.service import MediaService
+    from app.storage import StorageManager
+    from app.workers import ThreadBackend
+
+    service = MediaService(StorageManager(), ThreadBackend(), governor=RateLimiter({"127.0.0.1": (1e6, 1e6)}),
+                           connections=connections)
+    service.searchers = [ApiSearch(base, connections=connections)]
+    if warm:
+        await service.preconnect([(base, service.thumb_limit)])
+    started = time.perf_counter()
+    await service.search(f"query {tag}", 15)
+    times = [time.perf_counter() - started]
+    for b in range(batches):
+        started = time.perf_counter()
+        await asyncio.gather(*(service.thumbnail(f"{base}/vi/{tag}-{b}-{i}/mqdefault.jpg") for i in range(6)))
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--handshake", type=float, default=0.15, help="delay before every TLS handshake (s)")
+    ap.add_argument("--batches", type=int, default=3, help="thumbnail batches of six after the search")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="mpvtube-bench-")
+
+    from app.connections import ConnectionPool
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = certificate(tmp)
+        server = stand_in(cert, key, args.handshake)
+        base = f"https://127.0.0.1:{server.server_port}"
+        context = ssl.create_default_context(cafile=cert)
+        modes = (("urllib", lambda: PerRequest(context), False),
+                 ("pool, cold", lambda: ConnectionPool(context), False),
+                 ("pool, warmed", lambda: ConnectionPool(context), True))
+        for m, (label, make, warm) in enumerate(modes):
+            runs = []
+            for r in range(args.runs):
+                connections = make()
+                runs.append(asyncio.run(run(base, connections, warm, args.batches, f"{m}-{r}")))
+                getattr(connections, "close", lambda: None)()
+            cols = [statistics.median(col) * 1000 for col in zip(*runs)]
+            batches = "  ".join(f"{t:5.0f}" for t in cols[1:])
+            print(f"{label:<13} search {cols[0]:5.0f} ms  thumbnail batches {batches} ms")
+
+
+if __name__ == "__main__":
+    main()
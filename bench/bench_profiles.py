@@ -0,0 +1,149 @@
+"""Format extraction time per extraction profile, replayed from recorded responses.
+
+Recording needs the network once and stores every HTTP exchange yt-dlp makes per video
+and profile. Replays are offline and deterministic, so the timings only reflect the work
+yt-dlp does for each profile: cold runs start from an empty cache directory (player JS
+is downloaded and solved), warm runs reuse one the way the shared cache dir does.
+
+    python bench/bench_profiles.py --record https://www.youtube.com/watch?v=... [URL ...]
+    python bench/bench_profiles.py [--rounds 5] [--fixtures DIR]
+"""
+import argparse
+import base64
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from yt_dlp import YoutubeDL
+from yt_dlp.networking import Request, Response
+from yt_dlp.networking.exceptions import TransportError
+
+from app.extract import PROFILES
+from app.models import video_id
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "profiles")
+
+
+def _request(req):
+    return Request(req) if isinstance(req, str) else req
+
+
+def _key(req):
+    data = req.data if isinstance(req.data, bytes) else b""
+    return f"{req.method} {req.url} {hashlib.sha1(data).hexdigest()}"
+
+
+def _loose_key(url, method):
+    # Fallback match that ignores the query string (cache busters, client versions).
+    parts = urlsplit(url)
+    return f"{method} {parts.scheme}://{parts.netloc}{parts.path}"
+
+
+class RecordingYDL(YoutubeDL):
+    def __init__(self, params):
+        super().__init__(params)
+        self.exchanges = []
+
+    def urlopen(self, req):
+        req = _request(req)
+        res = super().urlopen(req)
+        body = res.read()
+        self.exchanges.append({"key": _key(req), "loose": _loose_key(req.url, req.method), "url": res.url,
+                               "status": res.status, "headers": dict(res.headers),
+                               "body": base64.b64encode(body).decode()})
+        return Response(io.BytesIO(body), res.url, res.headers, res.status, res.reason)
+
+
+class ReplayYDL(YoutubeDL):
+    def __init__(self, params, exchanges):
+        super().__init__(params)
+        self.exact, self.loose = {}, {}
+        for ex in exchanges:
+            self.exact.setdefault(ex["key"], ex)
+            self.loose.setdefault(ex["loose"], ex)
+        self.requests = 0
+
+    def urlopen(self, req):
+        req = _request(req)
+        ex = self.exact.get(_key(req)) or self.loose.get(_loose_key(req.url, req.method))
+        if ex is None:
+            raise TransportError(f"not recorded: {req.method} {req.url}")
+        self.requests += 1
+        return Response(io.BytesIO(base64.b64decode(ex["body"])), ex["url"], ex["headers"], ex["status"])
+
+
+def fixture_path(fixtures, url, profile):
+    return os.path.join(fixtures, f"{video_id(url) or hashlib.sha1(url.encode()).hexdigest()[:11]}.{profile}.json.gz")
+
+
+def record(urls, fixtures):
+    os.makedirs(fixtures, exist_ok=True)
+    for url in urls:
+        for profile, opts in PROFILES.items():
+            # A fresh cache dir, so the recording includes the player JS a cold run fetches.
+            with tempfile.TemporaryDirectory() as cachedir:
+                ydl = RecordingYDL(dict(opts, cachedir=cachedir))
+                ydl.extract_info(url, download=False)
+            path = fixture_path(fixtures, url, profile)
+            with gzip.open(path, "wt") as f:
+                json.dump({"url": url, "profile": profile, "exchanges": ydl.exchanges}, f)
+            print(f"recorded {len(ydl.exchanges):3d} requests  {os.path.relpath(path)}")
+
+
+def extract_once(fixture, cachedir):
+    ydl = ReplayYDL(dict(PROFILES[fixture["profile"]], cachedir=cachedir), fixture["exchanges"])
+    started = time.perf_counter()
+    info = ydl.extract_info(fixture["url"], download=False)
+    return time.perf_counter() - started, len(info.get("formats") or []), ydl.requests
+
+
+def replay(fixtures, rounds):
+    paths = sorted(glob.glob(os.path.join(fixtures, "*.json.gz")))
+    if not paths:
+        sys.exit(f"no fixtures in {fixtures}; record some first with --record URL")
+    totals = {}
+    print(f"{'video':<12} {'profile':<14} {'cold':>9} {'warm':>9} {'requests':>9} {'formats':>8}")
+    for path in paths:
+        with gzip.open(path, "rt") as f:
+            fixture = json.load(f)
+        cold = []
+        for _ in range(rounds):
+            with tempfile.TemporaryDirectory() as cachedir:
+                cold.append(extract_once(fixture, cachedir))
+        with tempfile.TemporaryDirectory() as cachedir:
+            extract_once(fixture, cachedir)
+            warm = [extract_once(fixture, cachedir) for _ in range(rounds)]
+        c, w = statistics.median(r[0] for r in cold), statistics.median(r[0] for r in warm)
+        totals.setdefault(fixture["profile"], []).append((c, w))
+        print(f"{video_id(fixture['url']) or '-':<12} {fixture['profile']:<14} {c * 1000:7.0f}ms {w * 1000:7.0f}ms "
+              f"{cold[0][2]:>9} {cold[0][1]:>8}")
+    print()
+    for profile, runs in totals.items():
+        print(f"{profile:<14} mean cold {statistics.mean(r[0] for r in runs) * 1000:7.0f}ms"
+              f"  warm {statistics.mean(r[1] for r in runs) * 1000:7.0f}ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--record", nargs="+", metavar="URL", help="record fixtures for these videos (needs network)")
+    ap.add_argument("--fixtures", default=FIXTURES)
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+    if args.record:
+        record(args.record, args.fixtures)
+    else:
+        replay(args.fixtures, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
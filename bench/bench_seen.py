@@ -0,0 +1,59 @@
+"""Lookup latency of the local seen-results index at a few sizes.
+
+Fills a throwaway index with fake search results, 15 per add like a result page, then times
+queries made of words from random titles, the way a repeated or related search would look.
+
+    python bench/bench_seen.py [--sizes 1000 10000 50000] [--queries 500]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_entries import fake_flat_entry
+
+from app.models import VideoEntry
+from app.seen import SeenIndex
+
+WORDS = "lofi jazz rust python guitar cooking review live remix tutorial piano news chess trailer".split()
+
+
+def entry(i):
+    rnd = random.Random(i)
+    e = VideoEntry.from_info(fake_flat_entry(i))
+    e.title = " ".join(rnd.sample(WORDS, 3)) + f" {e.title}"
+    return e
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    ap.add_argument("--queries", type=int, default=500)
+    args = ap.parse_args()
+    rnd = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            index = SeenIndex(os.path.join(tmp, f"seen-{size}.db"), max_rows=size)
+            started = time.perf_counter()
+            for start in range(0, size, 15):
+                index.add([entry(i) for i in range(start, min(size, start + 15))])
+            fill = time.perf_counter() - started
+            times, hits = [], 0
+            for _ in range(args.queries):
+                query = " ".join(rnd.sample(WORDS, rnd.randint(1, 2)))
+                started = time.perf_counter()
+                hits += len(index.search(query))
+                times.append(time.perf_counter() - started)
+            q = statistics.quantiles(times, n=100)
+            print(f"{size:>6} rows  fill {fill * 1e6 / size:5.0f} us/row  query p50 {q[49] * 1000:5.2f} ms"
+                  f"  p99 {q[98] * 1000:5.2f} ms  {hits / args.queries:4.1f} hits/query")
+            index.close()
+
+
+if __name__ == "__main__":
+    main()
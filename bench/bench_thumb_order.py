@@ -0,0 +1,131 @@
+"""Time until on-screen thumbnails are painted, with and without viewport-ordered scheduling.
+
+Drives the Qt GUI offscreen with a long result page whose thumbnail downloads each take
+--latency seconds. It records how long the first screen takes to fill. It then jumps to the
+middle of the list, as someone skimming would, and records how long that screen takes to
+fill. "submit all" starts every row's download as the row is built, which is how rows
+worked before, so the service's thumbnail limit drains them in list order. "scheduled" goes
+through the list's ThumbnailScheduler.
+
+    python bench/bench_thumb_order.py [--rows 60] [--latency 0.2] [--scroll-after 0.3] [--runs 3]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def jpeg():
+    from PySide6.QtCore import QBuffer, QByteArray
+    from PySide6.QtGui import QImage
+    img = QImage(320, 180, QImage.Format_RGB32)
+    img.fill(0x336699)
+    data = QByteArray()
+    buf = QBuffer(data)
+    buf.open(QBuffer.WriteOnly)
+    img.save(buf, "JPG")
+    return bytes(data)
+
+
+class SlowHost:
+    # Stands in for the connection pool: every thumbnail takes `latency` seconds.
+    def __init__(self, latency, data):
+        self.latency, self.data = latency, data
+
+    def get(self, url, headers=None, timeout=None):
+        time.sleep(self.latency)
+        return self.data
+
+
+def unthrottled():
+    # Only the order of downloads is measured here, not the per-host request limits.
+    from app.ratelimit import LIMITS, RateLimiter
+    return RateLimiter({host: (1e6, 1e6) for host in LIMITS})
+
+
+def visible_rows(w):
+    port = w.results.viewport().rect()
+    return [w.results.item(i) for i in range(w.results.count())
+            if w.results.visualItemRect(w.results.item(i)).intersects(port)]
+
+
+def run(app, host, scheduled, rows, scroll_after, base):
+    from bench_entries import fake_flat_entry
+    from PySide6.QtWidgets import QAbstractItemView
+    from soak import FakeBackend
+
+    from app.gui import MainWindow
+    from app.models import VideoEntry
+    from app.widgets import PIXMAPS, THUMB_SIZE
+
+    w = MainWindow()
+    w.resize(900, 800)
+    w.service.backend = FakeBackend()
+    w.service.governor = unthrottled()
+    w.service.connections = host
+    if not scheduled:
+        w.thumb_queue.slots = 10 ** 6
+    w.show()
+
+    def painted():
+        return all(PIXMAPS.get((thumbs[w.results.row(it)], *THUMB_SIZE)) is not None for it in visible_rows(w))
+
+    def pump(until, timeout=30.0):
+        end = time.monotonic() + timeout
+        while not until() and time.monotonic() < end:
+            app.processEvents()
+            time.sleep(0.001)
+
+    entries = [VideoEntry.from_info(fake_flat_entry(base + i)) for i in range(rows)]
+    thumbs = [e.thumbnail for e in entries]
+    started = time.monotonic()
+    w._populate(entries)
+    pump(painted)
+    first = time.monotonic() - started
+    pump(lambda: time.monotonic() - started >= scroll_after)
+    w.results.scrollToItem(w.results.item(rows // 2), QAbstractItemView.PositionAtTop)
+    scrolled = time.monotonic()
+    pump(painted)
+    middle = time.monotonic() - scrolled
+    w._clear_results()
+    w.close()
+    return first, middle
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=60)
+    ap.add_argument("--latency", type=float, default=0.2, help="seconds per thumbnail download")
+    ap.add_argument("--scroll-after", type=float, default=0.3, help="seconds before jumping to the middle")
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="mpvtube-bench-")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    logging.getLogger("mpvtube.watchdog").setLevel(logging.ERROR)
+
+    from PySide6.QtWidgets import QApplication
+    app = QApplication([])
+    host = SlowHost(args.latency, jpeg())
+
+    base = 0
+    for label, scheduled in (("submit all", False), ("scheduled", True)):
+        firsts, middles = [], []
+        for _ in range(args.runs):
+            # Fresh ids every run: nothing may come out of the pixmap or disk cache.
+            base += args.rows
+            first, middle = run(app, host, scheduled, args.rows, args.scroll_after, base)
+            firsts.append(first)
+            middles.append(middle)
+        print(f"{label:<11} first screen {statistics.median(firsts):5.2f}s  "
+              f"after jumping to the middle {statistics.median(middles):5.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Populating and scrolling the Textual results list: one widget per row vs the virtual list.
+
+Runs the TUI widgets headless through Textual's pilot and times how long a list of N rows
+takes to be on screen (until the app goes idle again), and then 20 page-downs through it.
+
+    python bench/bench_tui_list.py [--sizes 50,1000,10000] [--legacy-max 1000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from textual.app import App
+from textual.widgets import Label, ListItem, ListView
+
+from app.models import VideoEntry
+from app.tui import ResultItem
+from app.virtual_list import VirtualList
+from bench_entries import fake_flat_entry
+
+PAGES = 20
+
+
+class LegacyItem(ListItem):
+    # The row widget the results list mounted before it was virtualized.
+    def __init__(self, entry):
+        super().__init__()
+        self.entry = entry
+
+    def compose(self):
+        yield Label(f"[b]{self.entry.title}[/b]")
+        yield Label(f"[dim]{self.entry.uploader} • {self.entry.duration_string}[/dim]")
+
+
+class ListApp(App):
+    CSS = "ListItem { padding: 1 1; height: auto; }"
+
+    def __init__(self, widget):
+        super().__init__()
+        self.widget = widget
+
+    def compose(self):
+        yield self.widget
+
+
+async def measure(widget, fill, entries):
+    app = ListApp(widget)
+    async with app.run_test(size=(120, 40)) as pilot:
+        widget.focus()
+        started = time.perf_counter()
+        fill(widget, entries)
+        await pilot.pause()
+        populate = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(PAGES):
+            await pilot.press("pagedown")
+        await pilot.pause()
+        scroll = time.perf_counter() - started
+    return populate, scroll
+
+
+def fill_legacy(widget, entries):
+    for e in entries:
+        widget.append(LegacyItem(e))
+
+
+def fill_virtual(widget, entries):
+    widget.set_rows(ResultItem(e) for e in entries)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="50,1000,10000")
+    ap.add_argument("--legacy-max", type=int, default=1000,
+                    help="skip the per-widget list above this many rows (it takes minutes at 10k)")
+    args = ap.parse_args()
+
+    print(f"{'rows':>7}  {'list':<8} {'populate':>10} {f'{PAGES} pgdn':>10}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        entries = [VideoEntry.from_info(fake_flat_entry(i), thumbnail="") for i in range(n)]
+        runs = [("virtual", VirtualList, fill_virtual)]
+        if n <= args.legacy_max:
+            runs.insert(0, ("ListView", ListView, fill_legacy))
+        for name, cls, fill in runs:
+            populate, scroll = asyncio.run(measure(cls(), fill, entries))
+            print(f"{n:7d}  {name:<8} {populate * 1000:8.0f} ms {scroll * 1000:8.0f} ms", flush=True)
+
+
+if __name__ == "__main__":
+    main()
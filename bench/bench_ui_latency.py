@@ -0,0 +1,75 @@
+"""UI event-loop lag while extractions run on the thread vs the process backend.
+
+An asyncio loop (the same kind Textual runs, and a stand-in for Qt's) schedules a
+5 ms tick and records how late each tick fires while N extractions are in flight.
+
+    python bench/bench_ui_latency.py                 # synthetic CPU-bound extraction
+    python bench/bench_ui_latency.py --query "lofi"  # real yt-dlp searches (network)
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import extract
+from app.workers import ProcessBackend, ThreadBackend
+
+TICK = 0.005
+_PAYLOAD = json.dumps({"contents": [{"videoRenderer": {"videoId": f"{i:011d}", "title": {"runs": [{"text": "x" * 80}]},
+                                                        "lengthText": {"simpleText": "12:34"}}} for i in range(4000)]})
+
+
+def synthetic_extract(_query, _n, _sort="RELEVANCE"):
+    # Roughly what yt-dlp does per search page: a large JSON parse plus regex scans.
+    data = json.loads(_PAYLOAD)
+    ids = re.findall(r'"videoId": "([\w-]{11})"', _PAYLOAD)
+    return len(data["contents"]) + len(ids)
+
+
+async def measure(backend, fn, args, concurrency, rounds):
+    loop = asyncio.get_running_loop()
+    lags, done = [], False
+
+    async def ticker():
+        while not done:
+            t = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - t - TICK)
+
+    tick_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    for _ in range(rounds):
+        futs = [asyncio.wrap_future(backend.submit(fn, *args), loop=loop) for _ in range(concurrency)]
+        await asyncio.gather(*futs)
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick_task
+    lags.sort()
+    return elapsed, statistics.median(lags), lags[int(len(lags) * 0.99) - 1], lags[-1]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--query", help="run real yt-dlp searches instead of the synthetic workload")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+    fn, fn_args = (extract.search, (args.query, 15)) if args.query else (synthetic_extract, ("q", 15))
+
+    for backend in (ThreadBackend(max_workers=args.concurrency), ProcessBackend(max_workers=min(args.concurrency, 2))):
+        backend.warm()
+        asyncio.run(measure(backend, fn, fn_args, 1, 1))  # make sure workers are up
+        elapsed, p50, p99, worst = asyncio.run(measure(backend, fn, fn_args, args.concurrency, args.rounds))
+        print(f"{backend.name:8s} wall {elapsed:6.2f}s  loop lag p50 {p50 * 1000:6.1f} ms  "
+              f"p99 {p99 * 1000:6.1f} ms  max {worst * 1000:6.1f} ms")
+        backend.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Stand-in mpv for benchmarks: speaks enough of the JSON IPC protocol for a launch.
+
+Reports the first frame after FAKE_MPV_FIRST_FRAME seconds (default 0.2), plays for
+FAKE_MPV_PLAY seconds (default: until terminated) and then exits with FAKE_MPV_EXIT
+(default 0). SIGTERM exits with 4 like mpv's "quit by signal". Format specs listed in
+FAKE_MPV_FAIL (comma separated) fail to open instead: end-file with reason "error", then
+exit status 2. With FAKE_MPV_NO_IPC set it ignores --input-ipc-server, like an mpv
+built without IPC support. POSIX only (unix socket).
+
+    python bench/fake_mpv.py --input-ipc-server=/tmp/x.sock --ytdl-format=18 URL
+"""
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+args = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+first_frame = float(os.environ.get("FAKE_MPV_FIRST_FRAME", 0.2))
+play = float(os.environ["FAKE_MPV_PLAY"]) if os.environ.get("FAKE_MPV_PLAY") else None
+path = None if os.environ.get("FAKE_MPV_NO_IPC") else args.get("input-ipc-server")
+props = {"ytdl-format": args.get("ytdl-format"), "start": "none", "time-pos": 0.0, "demuxer-cache-idle": True}
+started = time.monotonic()
+conn, lock = None, threading.Lock()
+
+
+def finish(code):
+    if path and os.path.exists(path):
+        os.unlink(path)
+    os._exit(code)
+
+
+def send(msg):
+    if conn is not None:
+        with lock:
+            try:
+                conn.sendall(json.dumps(msg).encode() + b"\n")
+            except OSError:
+                pass
+
+
+def playback():
+    time.sleep(first_frame)
+    if props["ytdl-format"] in os.environ.get("FAKE_MPV_FAIL", "").split(","):
+        send({"event": "end-file", "reason": "error", "file_error": "loading failed"})
+        finish(2)
+    send({"event": "playback-restart"})
+    if play is not None:
+        time.sleep(play)
+        send({"event": "end-file", "reason": "eof"})
+        finish(int(os.environ.get("FAKE_MPV_EXIT", 0)))
+
+
+signal.signal(signal.SIGTERM, lambda *_: finish(4))
+if not path:
+    playback()
+    threading.Event().wait()
+server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+server.bind(path)
+server.listen(1)
+conn, _ = server.accept()
+threading.Thread(target=playback, daemon=True).start()
+for line in conn.makefile("rb"):
+    cmd = json.loads(line)
+    name, rid = cmd["command"], cmd.get("request_id")
+    props["time-pos"] = time.monotonic() - started
+    if name[0] == "get_property":
+        send({"error": "success", "data": props.get(name[1]), "request_id": rid})
+    elif name[0] == "set_property":
+        props[name[1]] = name[2]
+        send({"error": "success", "request_id": rid})
+    elif name[0] == "observe_property":
+        send({"error": "success", "request_id": rid})
+        send({"event": "property-change", "id": name[1], "name": name[2], "data": props.get(name[2])})
+    elif name[0] == "loadfile":
+        send({"error": "success", "request_id": rid})
+        threading.Timer(first_frame, send, [{"event": "playback-restart"}]).start()
+    elif name[0] == "quit":
+        send({"error": "success", "request_id": rid})
+        finish(0)
+    else:
+        send({"error": "unknown command", "request_id": rid})
+# The client hung up; keep "playing" until the timer or a signal ends us.
+threading.Event().wait()
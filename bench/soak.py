@@ -0,0 +1,184 @@
+"""Memory soak test: hundreds of searches, quality dialogs and theme rebuilds against a fake extractor.
+
+Drives the Qt GUI offscreen and the Textual TUI through its headless pilot, samples RSS
+and the live Python object count after every iteration, and exits non-zero when either
+keeps growing past the allowed budget once warmed up.
+
+    python bench/soak.py [--iterations 300] [--ui gui|tui|both] [--max-rss-mb 40] [--max-objects-pct 5]
+"""
+import argparse
+import asyncio
+import collections
+import gc
+import logging
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+
+# Queries cycle through a small set so the bounded search/format caches saturate early
+# and any growth left afterwards is a leak rather than caching.
+DISTINCT_QUERIES = 20
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+FORMATS = [
+    {"format_id": "313", "height": 2160, "fps": 30, "vcodec": "vp9", "ext": "webm"},
+    {"format_id": "137", "height": 1080, "fps": 30, "vcodec": "avc1.640028", "ext": "mp4"},
+    {"format_id": "22", "height": 720, "vcodec": "avc1", "acodec": "mp4a", "ext": "mp4"},
+    {"format_id": "251", "abr": 160, "vcodec": "none", "acodec": "opus", "ext": "webm"},
+    {"format_id": "140", "abr": 128, "vcodec": "none", "acodec": "mp4a.40.2", "ext": "m4a"},
+]
+
+
+class FakeBackend:
+    # Stands in for the thread/process extraction backends; answers instantly.
+    name = "fake"
+
+    def submit(self, fn, *args):
+        from bench_entries import fake_flat_entry
+        from app.models import VideoEntry
+        fut = Future()
+        if fn.__name__ == "search":
+            query, n = args[0], int(args[1])
+            base = abs(hash(query)) % 100000
+            fut.set_result([VideoEntry.from_info(fake_flat_entry(base + i), thumbnail="") for i in range(n)])
+        elif fn.__name__ == "formats":
+            fut.set_result([dict(f) for f in FORMATS])
+        else:
+            fut.set_result(fn(*args))
+        return fut
+
+    def warm(self):
+        pass
+
+
+class Samples(list):
+    types = None
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def type_counts():
+    return collections.Counter(type(o).__name__ for o in gc.get_objects())
+
+
+def sample(samples, i):
+    gc.collect()
+    samples.append((rss_mb(), len(gc.get_objects())))
+    if i == len(samples) - 1 and i in (10, 100):
+        samples.types = type_counts()
+    if i % 50 == 0:
+        print(f"  iter {i:4d}  rss {samples[-1][0]:7.1f} MB  objects {samples[-1][1]:8d}", flush=True)
+
+
+def soak_gui(iterations, samples):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QTimer
+    from PySide6.QtWidgets import QApplication
+    from app.gui import MainWindow
+
+    app = QApplication.instance() or QApplication([])
+    w = MainWindow()
+    w.service.backend = FakeBackend()
+    w.show()
+
+    def pump(until, timeout=5.0):
+        end = time.monotonic() + timeout
+        while not until() and time.monotonic() < end:
+            app.processEvents()
+            time.sleep(0.001)
+
+    def close_dialog():
+        dlg = QApplication.activeModalWidget()
+        if dlg is not None:
+            dlg.reject()
+        else:
+            QTimer.singleShot(5, close_dialog)
+
+    for i in range(iterations):
+        w.search_in.setText(f"soak query {i % DISTINCT_QUERIES}")
+        w.start_search()
+        pump(lambda: w.results.count() == w.storage.get_setting("max_results", 15))
+        QTimer.singleShot(5, close_dialog)
+        w.play_selected(w.results.item(i % w.results.count()))
+        pump(lambda: w.spinner.isHidden())
+        if i % 10 == 9:
+            w._build_ui()
+        sample(samples, i)
+    w.close()
+
+
+def soak_tui(iterations, samples):
+    from app.tui import FormatSelectionModal, MpvTubeApp
+
+    async def run():
+        app = MpvTubeApp()
+        app.service.backend = FakeBackend()
+        async with app.run_test() as pilot:
+            for i in range(iterations):
+                app.query_one("#search-input").value = f"soak query {i % DISTINCT_QUERIES}"
+                await pilot.press("/", "enter")
+                await pilot.pause()
+                await pilot.press("enter")
+                await pilot.pause()
+                if isinstance(app.screen, FormatSelectionModal):
+                    await pilot.press("escape")
+                await pilot.press("h" if i % 2 else "b")
+                await pilot.pause()
+                sample(samples, i)
+
+    asyncio.run(run())
+
+
+def verdict(name, samples, max_rss_mb, max_objects_pct):
+    warm = max(1, len(samples) // 10)
+    rss0 = statistics.median(s[0] for s in samples[warm:2 * warm])
+    obj0 = statistics.median(s[1] for s in samples[warm:2 * warm])
+    rss1 = statistics.median(s[0] for s in samples[-warm:])
+    obj1 = statistics.median(s[1] for s in samples[-warm:])
+    rss_growth, obj_growth = rss1 - rss0, (obj1 - obj0) * 100 / obj0
+    ok = rss_growth <= max_rss_mb and obj_growth <= max_objects_pct
+    print(f"{name}: rss {rss0:.1f} -> {rss1:.1f} MB ({rss_growth:+.1f} MB), "
+          f"objects {obj0:.0f} -> {obj1:.0f} ({obj_growth:+.2f}%)  {'OK' if ok else 'FAIL'}")
+    if not ok and getattr(samples, "types", None):
+        grown = (type_counts() - samples.types).most_common(8)
+        print("  most grown types: " + ", ".join(f"{t} +{n}" for t, n in grown))
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--iterations", type=int, default=300)
+    ap.add_argument("--ui", choices=["gui", "tui", "both"], default="both")
+    ap.add_argument("--max-rss-mb", type=float, default=40)
+    ap.add_argument("--max-objects-pct", type=float, default=5)
+    args = ap.parse_args()
+
+    # Keep the soak away from the real config, caches and thumbnail pack.
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="mpvtube-soak-")
+    # The gc.collect() in every sample pauses the UI loop; that is not a stall worth logging.
+    logging.getLogger("mpvtube.watchdog").setLevel(logging.ERROR)
+    ok = True
+    for name, soak in (("gui", soak_gui), ("tui", soak_tui)):
+        if args.ui in (name, "both"):
+            print(f"{name}: {args.iterations} iterations")
+            samples = Samples()
+            soak(args.iterations, samples)
+            ok &= verdict(name, samples, args.max_rss_mb, args.max_objects_pct)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+import pytest
+
+# Cache paths under ~ are fixed when app modules are imported, before any fixture runs.
+os.environ["HOME"] = tempfile.mkdtemp(prefix="mpvtube-tests-")
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    # Config and caches live under ~; keep them out of the real one.
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app.backends import ApiSearch, LatencyTracker, hedged
+from app.connections import ConnectionPool
+
+
+def tracker_with(samples, **kw):
+    tracker = LatencyTracker(**kw)
+    for s in samples:
+        tracker.add(s)
+    return tracker
+
+
+def test_deadline_is_initial_until_enough_samples():
+    assert tracker_with([0.1] * 4, initial=2.0, min_samples=5).deadline() == 2.0
+    assert tracker_with([1.0] * 5, initial=2.0, min_samples=5).deadline() == pytest.approx(1.0)
+
+
+def test_deadline_tracks_percentile_above_floor():
+    samples = [i / 10 for i in range(1, 11)]
+    assert tracker_with(samples, percentile=50).deadline() == pytest.approx(0.55)
+    assert tracker_with([0.01] * 10, floor=0.3).deadline() == 0.3
+
+
+@pytest.mark.parametrize("percentile, clamped", [(0, 1), (100, 99), (250, 99), (99.5, 99)])
+def test_percentile_is_clamped(percentile, clamped):
+    tracker = tracker_with([i / 10 for i in range(1, 11)], percentile=percentile, floor=0)
+    assert tracker.percentile == clamped
+    assert tracker.deadline() == tracker_with([i / 10 for i in range(1, 11)], percentile=clamped, floor=0).deadline()
+
+
+class Backend:
+    # A coroutine factory that answers (or fails) after `delay` and counts its calls.
+    def __init__(self, name, delay, error=None):
+        self.name, self.delay, self.error = name, delay, error
+        self.calls = self.cancelled = self.finished = 0
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        self.finished += 1
+        if self.error:
+            raise self.error
+        return self.name
+
+
+def run_hedged(backends, tracker, hedge=True):
+    async def run():
+        result = await hedged([(b.name, b) for b in backends], tracker, hedge)
+        await asyncio.sleep(0.25)  # let a losing primary finish
+        return result
+    return asyncio.run(run())
+
+
+def test_fast_primary_sends_one_request():
+    primary, backup = Backend("primary", 0.01), Backend("backup", 0.01)
+    tracker = tracker_with([0.2] * 5, floor=0)
+    assert run_hedged([primary, backup], tracker) == "primary"
+    assert backup.calls == 0
+    assert len(tracker.samples) == 6
+
+
+def test_slow_primary_is_hedged_and_still_sampled():
+    primary, backup = Backend("primary", 0.2), Backend("backup", 0.01)
+    tracker = tracker_with([0.05] * 5, floor=0)
+    started = time.monotonic()
+    assert run_hedged([primary, backup], tracker) == "backup"
+    assert backup.calls == 1
+    # The primary was left running, and its latency went into the tracker.
+    assert primary.finished == 1 and primary.cancelled == 0
+    assert len(tracker.samples) == 6 and tracker.samples[-1] >= 0.2
+    assert time.monotonic() - started < 1.0
+
+
+def test_losing_backup_is_cancelled():
+    primary, backup = Backend("primary", 0.1), Backend("backup", 1.0)
+    assert run_hedged([primary, backup], tracker_with([0.02] * 5, floor=0)) == "primary"
+    assert backup.calls == 1 and backup.cancelled == 1
+
+
+def test_failed_primary_falls_over_without_waiting():
+    primary, backup = Backend("primary", 0.0, OSError("down")), Backend("backup", 0.01)
+    tracker = LatencyTracker(initial=5.0)
+    started = time.monotonic()
+    assert run_hedged([primary, backup], tracker) == "backup"
+    assert time.monotonic() - started < 1.0
+    assert len(tracker.samples) == 0
+
+
+def test_without_hedging_backup_only_runs_after_a_failure():
+    primary, backup = Backend("primary", 0.2), Backend("backup", 0.01)
+    assert run_hedged([primary, backup], tracker_with([0.01] * 5, floor=0), hedge=False) == "primary"
+    assert backup.calls == 0
+
+
+def test_all_failing_raises_the_last_error():
+    calls = [Backend("a", 0.0, OSError("a down")), Backend("b", 0.0, ValueError("b down"))]
+    with pytest.raises(ValueError, match="b down"):
+        run_hedged(calls, LatencyTracker())
+
+
+def stand_in(delay, tag):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(delay)
+            query = parse_qs(urlparse(self.path).query)["q"][0]
+            body = json.dumps([{"type": "video", "title": f"{query} {i}", "videoId": f"{tag}{i:010d}"}
+                               for i in range(5)]).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_api_search_hedges_across_local_stand_ins():
+    slow, quick = stand_in(1.0, "s"), stand_in(0.05, "q")
+    pool = ConnectionPool()
+    try:
+        backends = [ApiSearch(f"http://127.0.0.1:{s.server_port}", connections=pool) for s in (slow, quick)]
+        tracker = tracker_with([0.05] * 5, floor=0.1)
+
+        async def run():
+            calls = [(f"api{i}", lambda b=b: b.search("cats", 5)) for i, b in enumerate(backends)]
+            started = time.monotonic()
+            entries = await hedged(calls, tracker)
+            return entries, time.monotonic() - started
+
+        entries, took = asyncio.run(run())
+        assert [e.title for e in entries] == [f"cats {i}" for i in range(5)]
+        assert entries[0].id.startswith("q")
+        assert took < 0.6
+    finally:
+        pool.close()
+        for s in (slow, quick):
+            s.shutdown()
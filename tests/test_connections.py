@@ -0,0 +1,146 @@
+import asyncio
+import socket
+import threading
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.connections import ConnectionPool
+from app.ratelimit import RateLimiter
+from app.service import MediaService
+from app.storage import StorageManager
+from app.workers import ThreadBackend
+
+
+class StandIn(ThreadingHTTPServer):
+    # Local keep-alive server that counts the connections it accepts.
+    daemon_threads = True
+
+    def __init__(self, drop_after_response=False):
+        self.connections = 0
+        self.drop_after_response = drop_after_response
+        super().__init__(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+    @property
+    def base(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/moved"):
+            self.send_response(302)
+            self.send_header("Location", "/img/target")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Closed without saying so, like a server timing out an idle keep-alive connection.
+        self.close_connection = self.server.drop_after_response
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    s = StandIn()
+    yield s
+    s.shutdown()
+    s.server_close()
+
+
+@pytest.fixture
+def pool():
+    p = ConnectionPool()
+    yield p
+    p.close()
+
+
+def test_requests_reuse_one_connection(server, pool):
+    assert [pool.get(f"{server.base}/img/{i}") for i in range(3)] == [b"/img/0", b"/img/1", b"/img/2"]
+    assert server.connections == 1
+    assert pool.stats == {"opened": 1, "reused": 2}
+
+
+def test_warmed_connection_serves_the_first_request(server, pool):
+    assert pool.warm(server.base)
+    assert server.connections == 1
+    assert pool.get(f"{server.base}/img/a") == b"/img/a"
+    assert server.connections == 1
+    assert pool.stats == {"warmed": 1, "reused": 1}
+
+
+def test_warm_failures_are_quiet(pool):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]  # nothing listens here once closed
+    assert pool.warm(f"http://127.0.0.1:{port}") is False
+    assert pool.warm("ftp://example.com/") is False
+    assert pool.stats["warmed"] == 0
+
+
+def test_idle_connections_expire(server):
+    pool = ConnectionPool(idle_ttl=0)
+    try:
+        pool.get(f"{server.base}/img/1")
+        pool.get(f"{server.base}/img/2")
+        assert server.connections == 2 and pool.stats["reused"] == 0
+    finally:
+        pool.close()
+
+
+def test_connection_dropped_by_server_is_replaced(pool):
+    server = StandIn(drop_after_response=True)
+    try:
+        assert pool.get(f"{server.base}/img/1") == b"/img/1"
+        # The idle connection is dead; the request is retried once on a fresh one.
+        assert pool.get(f"{server.base}/img/2") == b"/img/2"
+        assert server.connections == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_redirects_and_http_errors(server, pool):
+    assert pool.get(f"{server.base}/moved") == b"/img/target"
+    with pytest.raises(urllib.error.HTTPError) as e:
+        pool.get(f"{server.base}/missing")
+    assert e.value.code == 404
+    # The error response left its connection usable.
+    assert pool.get(f"{server.base}/img/after") == b"/img/after"
+    assert server.connections == 1
+
+
+def test_preconnect_warms_connections_thumbnails_then_reuse(server, pool):
+    service = MediaService(StorageManager(), ThreadBackend(), governor=RateLimiter({"127.0.0.1": (1e6, 1e6)}),
+                           connections=pool)
+
+    async def run():
+        warmed = await service.preconnect([(server.base, 3)])
+        images = await asyncio.gather(*(service.thumbnail(f"{server.base}/vi/{i}/mqdefault.jpg") for i in range(3)))
+        return warmed, images
+
+    warmed, images = asyncio.run(run())
+    assert warmed == 3
+    assert images == [f"/vi/{i}/mqdefault.jpg".encode() for i in range(3)]
+    assert server.connections == 3
+    assert pool.stats["opened"] == 0 and pool.stats["reused"] == 3
@@ -0,0 +1,115 @@
+import asyncio
+import collections
+import os
+
+import pytest
+
+from app.service import MediaService
+from app.storage import StorageManager
+from app.workers import ThreadBackend
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="the fake mpv speaks IPC over a unix socket")
+
+FAKE_MPV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "fake_mpv.py")
+FORMATS = [
+    {"format_id": "137", "height": 1080, "vcodec": "avc1", "ext": "mp4"},
+    {"format_id": "136", "height": 720, "vcodec": "avc1", "ext": "mp4"},
+    {"format_id": "140", "abr": 128, "vcodec": "none", "acodec": "mp4a", "ext": "m4a"},
+]
+
+
+@pytest.fixture
+def fake_mpv(monkeypatch):
+    monkeypatch.setenv("FAKE_MPV_FIRST_FRAME", "0.1")
+    monkeypatch.setenv("FAKE_MPV_PLAY", "0.4")
+    for name in ("FAKE_MPV_FAIL", "FAKE_MPV_NO_IPC", "FAKE_MPV_EXIT"):
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+def make_service(**settings):
+    storage = StorageManager()
+    storage.data["mpv_path"] = FAKE_MPV
+    storage.data["settings"].update(fast_start=False, **settings)
+    return MediaService(storage, ThreadBackend())
+
+
+def zombies(pids):
+    # Exited but never waited on: still in the process table as state Z.
+    count = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                count += f.read().rsplit(")", 1)[1].split()[0] == "Z"
+        except OSError:
+            pass
+    return count
+
+
+async def burst(service, launches):
+    peak = 0
+
+    async def watch():
+        nonlocal peak
+        while True:
+            peak = max(peak, len(service.players.running()))
+            await asyncio.sleep(0.01)
+
+    watcher = asyncio.ensure_future(watch())
+    playbacks = await asyncio.gather(*(service.launch(f"https://www.youtube.com/watch?v=burst{i:06d}", "18")
+                                       for i in range(launches)))
+    codes = await asyncio.gather(*(p.exited for p in playbacks))
+    watcher.cancel()
+    return playbacks, codes, peak
+
+
+@pytest.mark.parametrize("policy", ["replace", "queue"])
+def test_policy_caps_players_and_reaps_them(fake_mpv, policy):
+    service = make_service(max_players=2, player_policy=policy)
+    playbacks, codes, peak = asyncio.run(burst(service, 5))
+
+    assert peak == 2
+    assert service.players.players == []
+    assert zombies(p.proc.pid for p in playbacks) == 0
+    stopped = collections.Counter(p.stopped for p in playbacks)
+    if policy == "replace":
+        # Every launch past the cap closed the oldest player; the last two played out.
+        assert stopped == {True: 3, False: 2}
+    else:
+        assert stopped == {False: 5}
+        assert codes == [0] * 5
+    # A player closed to make room may go before its first frame; the others all got one.
+    assert all(p.first_frame is not None for p in playbacks if not p.stopped)
+
+
+def test_launch_without_ipc_is_still_supervised(fake_mpv):
+    fake_mpv.setenv("FAKE_MPV_NO_IPC", "1")
+    service = make_service(max_players=2)
+
+    async def run():
+        playback = await service.launch("https://www.youtube.com/watch?v=noipc000001", "18")
+        return playback, await playback.exited
+
+    playback, code = asyncio.run(run())
+    # No first frame to measure, but no error either, and the exit is reaped.
+    assert playback.first_frame is None and playback.error is None
+    assert code == 0
+    assert zombies([playback.proc.pid]) == 0
+
+
+def test_unplayable_format_falls_back_over_ipc(fake_mpv):
+    fake_mpv.setenv("FAKE_MPV_FAIL", "137+140")
+    service = make_service(max_players=0)
+    url = "https://www.youtube.com/watch?v=fallback001"
+    service.format_cache.put(url, FORMATS)
+
+    async def run():
+        playback = await service.launch(url, "137+140")
+        await playback.exited
+        return playback
+
+    playback = asyncio.run(run())
+    assert playback.error is None
+    assert playback.fmt == "136+140"
+    assert [bad for bad, _ in playback.fallbacks] == ["137+140"]
+    assert "137+140" in service.storage.failed_formats("fallback001")
@@ -0,0 +1,49 @@
+import json
+import os
+import threading
+
+from app.storage import StorageManager
+
+
+def test_load_keeps_new_setting_defaults():
+    storage = StorageManager()
+    with open(storage.config_path, "w", encoding="utf-8") as f:
+        json.dump({"mpv_path": "/opt/mpv", "settings": {"theme": "DARK", "max_results": 30}}, f)
+
+    loaded = StorageManager()
+    assert loaded.data["mpv_path"] == "/opt/mpv"
+    assert loaded.get_setting("theme") == "DARK"
+    assert loaded.get_setting("max_results") == 30
+    # Written before these existed: the defaults fill in.
+    assert loaded.get_setting("max_players") == 2
+    assert loaded.get_setting("extract_profile") == "fast-playback"
+    assert loaded.data["failed_formats"] == {}
+
+
+def test_concurrent_updates_are_neither_lost_nor_torn():
+    storage = StorageManager()
+    storage.add_subscription("UC1", "one")
+    errors = []
+
+    def run(fn):
+        try:
+            fn()
+        except Exception as e:
+            errors.append(e)
+
+    jobs = [lambda n=n: [storage.add_favorite(f"t{n}-{i}", f"u{n}-{i}", "") for i in range(10)] for n in range(4)]
+    jobs += [lambda n=n: [storage.record_failed_format(f"v{n}-{i}", "22") for i in range(100)] for n in range(4)]
+    jobs += [lambda: [storage.set_last_seen({"UC1": f"vid{i}"}) for i in range(100)]]
+    threads = [threading.Thread(target=run, args=(job,)) for job in jobs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(storage.data["favorites"]) == 40
+    assert len(storage.data["failed_formats"]) == 400
+    with open(storage.config_path, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["subscriptions"] == [{"id": "UC1", "title": "one", "last_seen": "vid99"}]
+    assert not [n for n in os.listdir(os.path.dirname(storage.config_path)) if n.endswith(".tmp")]
@@ -0,0 +1,32 @@
+from app import subscriptions
+from app.models import VideoEntry
+from app.subscriptions import FeedIndex
+
+
+class FakeYdl:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def extract_info(self, url, download=False, process=False):
+        return {"channel": "Channel", "entries": self.entries}
+
+
+def entry(vid, timestamp=None):
+    return {"id": vid, "url": f"https://www.youtube.com/watch?v={vid}", "title": vid, "timestamp": timestamp}
+
+
+def test_undated_entries_rank_below_dated_ones(home, monkeypatch):
+    monkeypatch.setattr(subscriptions, "_ydl", lambda: FakeYdl([entry("new1"), entry("new2"), entry("a3", 300)]))
+    fresh = subscriptions.fetch_new_entries("UC1")
+    assert [e.timestamp for e in fresh] == [None, None, 300]
+
+    index = FeedIndex(str(home / "feed.json"))
+    index.merge("UC1", fresh)
+    index.merge("UC2", [VideoEntry.from_info(entry(v, t), channel_id="UC2")
+                        for v, t in (("b2", 200), ("b1", 100))])
+    assert [e.id for e in index.rebuild()] == ["a3", "b2", "b1", "new1", "new2"]
+
+
+def test_refresh_stops_at_last_seen(monkeypatch):
+    monkeypatch.setattr(subscriptions, "_ydl", lambda: FakeYdl([entry("c", 3), entry("b", 2), entry("a", 1)]))
+    assert [e.id for e in subscriptions.fetch_new_entries("UC1", last_seen="b")] == ["c"]
@@ -0,0 +1,21 @@
+import sys
+
+import pytest
+
+from app import workers
+
+pytestmark = pytest.mark.skipif(workers.QObject is None, reason="PySide6 not installed")
+
+
+def test_emit_keeps_bool_refcounts():
+    # PySide6 6.12.0 drops a reference to True on every emit; workers puts it back.
+    signals = workers.WorkerSignals()
+    got = []
+    signals.results.connect(got.append)
+    signals.finished.connect(lambda: got.append(None))
+    before = sys.getrefcount(True), sys.getrefcount(False)
+    for i in range(2000):
+        signals.results.emit(i)
+        signals.finished.emit()
+    assert (sys.getrefcount(True), sys.getrefcount(False)) == before
+    assert len(got) == 4000 and got[-2:] == [1999, None]